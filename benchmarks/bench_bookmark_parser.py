@@ -0,0 +1,118 @@
+"""Benchmark Chrome bookmark parsing on a synthetic tree.
+
+Compares the original recursive extractor against the explicit-stack
+generator, with both the ``json.load`` and the incremental ``ijson`` readers.
+Run with ``python benchmarks/bench_bookmark_parser.py [nodes]`` (default 1M).
+"""
+
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bookmark_app.bookmarks import iter_chrome_bookmarks  # noqa: E402
+
+
+def make_tree(total: int, fanout: int = 20, seed: int = 0) -> dict:
+    """Build a Chrome-shaped Bookmarks document with about *total* nodes."""
+    rng = random.Random(seed)
+    counter = 0
+
+    def node(depth: int) -> dict:
+        nonlocal counter
+        counter += 1
+        base = {
+            "id": str(counter),
+            "guid": f"00000000-0000-4000-8000-{counter:012d}",
+            "date_added": str(13_300_000_000_000_000 + counter),
+            "date_last_used": "0",
+            "name": f"node {counter}",
+        }
+        if depth < 4 and rng.random() < 0.15:
+            base["type"] = "folder"
+            base["children"] = []
+            return base
+        base["type"] = "url"
+        base["url"] = f"https://example{counter % 997}.com/page/{counter}"
+        return base
+
+    bar = {"children": [], "name": "Bookmarks bar", "type": "folder"}
+    frontier = [(bar, 0)]
+    while counter < total:
+        parent, depth = frontier[rng.randrange(len(frontier))]
+        for _ in range(fanout):
+            child = node(depth + 1)
+            parent["children"].append(child)
+            if "children" in child:
+                frontier.append((child, depth + 1))
+            if counter >= total:
+                break
+    return {"roots": {"bookmark_bar": bar, "other": {"children": []}}, "version": 1}
+
+
+def legacy_extract(nodes: list, parent_folder: str = "") -> list[dict]:
+    """The previous recursive implementation, for comparison."""
+    extracted: list[dict] = []
+    for item in nodes:
+        if "children" in item:
+            folder_path = f"{parent_folder}/{item['name']}"
+            extracted.extend(legacy_extract(item["children"], folder_path))
+        elif "url" in item:
+            extracted.append({
+                "folder": parent_folder,
+                "name": item["name"],
+                "url": item["url"],
+            })
+    return extracted
+
+
+def legacy_load(path: Path) -> list[dict]:
+    with path.open("r", encoding="utf-8") as f:
+        data = json.load(f)
+    out: list[dict] = []
+    for root in ("bookmark_bar", "other", "synced"):
+        if root in data["roots"]:
+            out.extend(legacy_extract(data["roots"][root]["children"]))
+    return out
+
+
+def _measure(label: str, fn) -> None:
+    """Time one run untraced, then record peak memory in a second run."""
+    start = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {count:>9,} bookmarks  {elapsed:7.2f} s  peak {peak / 2**20:8.1f} MiB")
+
+
+def main() -> None:
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "Bookmarks"
+        path.write_text(json.dumps(make_tree(total)), encoding="utf-8")
+        print(f"{total:,} nodes, {path.stat().st_size / 2**20:.0f} MiB on disk")
+
+        _measure("legacy (list of dicts)", lambda: len(legacy_load(path)))
+        _measure("generator, json.load", lambda: sum(
+            1 for _ in iter_chrome_bookmarks(path, incremental=False)
+        ))
+        try:
+            import ijson  # noqa: F401
+        except ImportError:
+            print("ijson not installed; skipping incremental parse")
+        else:
+            _measure("generator, incremental", lambda: sum(
+                1 for _ in iter_chrome_bookmarks(path, incremental=True)
+            ))
+
+
+if __name__ == "__main__":
+    main()
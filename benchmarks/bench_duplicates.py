@@ -0,0 +1,61 @@
+"""Time near-duplicate detection on a synthetic collection.
+
+Builds a flat index of random embedding-sized vectors with planted
+near-duplicate pairs (cosine ~0.96), runs :func:`find_duplicates` and
+reports the time and how many planted pairs were recovered.  Random vectors
+have no cluster structure, which is the worst case for the approximate
+join.  Run with ``python benchmarks/bench_duplicates.py [documents]``
+(default 100000).
+"""
+
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import faiss  # noqa: E402
+import numpy as np  # noqa: E402
+
+from bookmark_app.duplicates import EXACT_JOIN_LIMIT, find_duplicates  # noqa: E402
+
+DIM = 3072  # text-embedding-3-large
+PLANTED = 500
+
+
+class _Store:
+    def __init__(self, index):
+        self.index = index
+        self.index_to_docstore_id = {i: str(i) for i in range(index.ntotal)}
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = np.random.default_rng(0)
+    index = faiss.IndexFlatL2(DIM)
+    planted = set()
+    for start in range(0, n, 10_000):
+        block = rng.standard_normal((min(10_000, n - start), DIM), dtype=np.float32)
+        count = min(PLANTED * len(block) // n, len(block) // 2)
+        src = rng.choice(len(block), count, replace=False)
+        dst = rng.choice(np.setdiff1d(np.arange(len(block)), src), count, replace=False)
+        block[dst] = block[src] + 0.3 * rng.standard_normal((count, DIM), dtype=np.float32)
+        planted |= {tuple(sorted((start + a, start + b))) for a, b in zip(src, dst)}
+        index.add(block)
+
+    start = time.perf_counter()
+    clusters = find_duplicates(_Store(index), 0.95)
+    elapsed = time.perf_counter() - start
+    found = {
+        tuple(sorted(int(i) for i in pair))
+        for c in clusters for pair in zip(c.ids, c.ids[1:])
+    }
+    join = "exact" if n <= EXACT_JOIN_LIMIT else "approximate"
+    print(f"{n} documents ({join} join): {elapsed:.2f}s, "
+          f"{len(found & planted)}/{len(planted)} planted pairs found, "
+          f"{len(clusters)} clusters")
+
+
+if __name__ == "__main__":
+    main()
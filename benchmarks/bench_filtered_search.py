@@ -0,0 +1,99 @@
+"""Compare filtered and unfiltered search latency.
+
+Builds a random-vector index with folder, domain and date metadata, then
+times plain ``similarity_search`` against prefiltered searches of varying
+selectivity, and against the post-filtering alternative (oversized k, then
+drop non-matching results).  Run with
+``python benchmarks/bench_filtered_search.py [documents]`` (default 20000).
+"""
+
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+from langchain_community.docstore.in_memory import InMemoryDocstore  # noqa: E402
+from langchain_community.vectorstores import FAISS  # noqa: E402
+from langchain_core.documents import Document  # noqa: E402
+from langchain_core.embeddings import Embeddings  # noqa: E402
+
+import faiss  # noqa: E402
+
+from bookmark_app.search import SearchFilters, filtered_search, get_filter_index  # noqa: E402
+
+DIM = 3072  # text-embedding-3-large
+QUERIES = 50
+
+
+class RandomEmbeddings(Embeddings):
+    def __init__(self, dim: int):
+        self.rng = np.random.default_rng(1)
+        self.dim = dim
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text):
+        return self.rng.standard_normal(self.dim, dtype=np.float32).tolist()
+
+
+def make_store(n: int) -> FAISS:
+    rng = np.random.default_rng(0)
+    index = faiss.IndexFlatL2(DIM)
+    index.add(rng.standard_normal((n, DIM), dtype=np.float32))
+    docs = {}
+    for i in range(n):
+        docs[str(i)] = Document(id=str(i), page_content=f"Page {i}", metadata={
+            "source": f"https://site{i % 200}.com/{i}",
+            "folder": f"/Bar/Topic{i % 20}/Sub{i % 5}",
+            "added": f"{2015 + i % 10}-{1 + i % 12:02d}-01",
+        })
+    return FAISS(
+        RandomEmbeddings(DIM), index, InMemoryDocstore(docs),
+        {i: str(i) for i in range(n)},
+    )
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    for _ in range(QUERIES):
+        fn()
+    return (time.perf_counter() - start) / QUERIES * 1000
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    store = make_store(n)
+    start = time.perf_counter()
+    get_filter_index(store)
+    print(f"{n} documents, filter index built in {time.perf_counter() - start:.2f}s")
+
+    print(f"{'search':<34}{'matches':>9}{'ms/query':>10}")
+    print(f"{'unfiltered':<34}{n:>9}{timed(lambda: store.similarity_search('q', k=10)):>10.2f}")
+    cases = {
+        "folder /Bar/Topic3": SearchFilters(folder="/Bar/Topic3"),
+        "domain site7.com": SearchFilters(domain="site7.com"),
+        "added 2018-2020": SearchFilters(added_after="2018-01-01", added_before="2021-01-01"),
+        "folder + date": SearchFilters(
+            folder="/Bar/Topic3", added_after="2018-01-01", added_before="2021-01-01",
+        ),
+    }
+    for label, filters in cases.items():
+        matches = len(get_filter_index(store).select(filters))
+        ms = timed(lambda: filtered_search(store, "q", 10, filters))
+        print(f"{label:<34}{matches:>9}{ms:>10.2f}")
+
+    # Post-filtering needs k ~ 10 / selectivity to fill the page.
+    wanted = "/bar/topic3"
+    ms = timed(lambda: [
+        d for d in store.similarity_search("q", k=200)
+        if d.metadata["folder"].lower().startswith(wanted)
+    ][:10])
+    print(f"{'post-filter folder, k=200':<34}{'':>9}{ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark staged vs pipelined first import with fake model servers.
+
+The fake LLM and embedding clients only sleep, modelling API latency, so
+the numbers isolate how well the stages overlap.  Run with
+``python benchmarks/bench_ingest.py [bookmarks]`` (default 500).
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings  # noqa: E402
+
+from bookmark_app import ingest as ingest_module  # noqa: E402
+from bookmark_app.descriptions import MAX_CONCURRENT, _generate_all  # noqa: E402
+from bookmark_app.ingest import EMBED_BATCH_SIZE, ingest  # noqa: E402
+from bookmark_app.vectorstore import IndexUpdater, bookmarks_to_documents  # noqa: E402
+
+LLM_LATENCY = 0.05          # seconds per description
+EMBED_LATENCY = 0.15        # seconds per embedding request
+EMBED_PER_TEXT = 0.002      # extra seconds per text in a request
+
+
+class FakeLLM:
+    async def ainvoke(self, prompt: str):
+        await asyncio.sleep(LLM_LATENCY)
+        return SimpleNamespace(content="A generated description.")
+
+
+class FakeEmbeddings(Embeddings):
+    def __init__(self):
+        self._fake = DeterministicFakeEmbedding(size=64)
+
+    def embed_documents(self, texts):
+        return self._fake.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self._fake.embed_query(text)
+
+    async def aembed_documents(self, texts):
+        await asyncio.sleep(EMBED_LATENCY + EMBED_PER_TEXT * len(texts))
+        return self.embed_documents(texts)
+
+
+def _bookmarks(n: int) -> list[dict]:
+    return [
+        {"guid": str(i), "name": f"Page {i}", "url": f"https://example.com/{i}",
+         "folder": "/Bench"}
+        for i in range(n)
+    ]
+
+
+async def staged(n: int, store: Path) -> None:
+    """Every description first, then every embedding, then indexing."""
+    bookmarks = _bookmarks(n)
+    await _generate_all(bookmarks, FakeLLM())
+    updater = IndexUpdater(store, FakeEmbeddings())
+    docs = bookmarks_to_documents(bookmarks)
+    for start in range(0, len(docs), EMBED_BATCH_SIZE):
+        batch = docs[start:start + EMBED_BATCH_SIZE]
+        vectors = await updater.embeddings.aembed_documents([d.page_content for d in batch])
+        updater.add(batch, vectors)
+
+
+async def pipelined(n: int, store: Path) -> None:
+    updater = IndexUpdater(store, FakeEmbeddings())
+    await ingest(_bookmarks(n), FakeLLM(), updater)
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    ingest_module.open_default_cache = lambda: None
+    llm_time = n / MAX_CONCURRENT * LLM_LATENCY
+    batches = -(-n // EMBED_BATCH_SIZE)
+    embed_time = batches * EMBED_LATENCY + n * EMBED_PER_TEXT
+    print(f"{n} bookmarks; ideal stage times: describe {llm_time:.2f} s, "
+          f"embed {embed_time:.2f} s (serial requests)")
+    for label, fn in (("staged", staged), ("pipelined", pipelined)):
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            asyncio.run(fn(n, Path(tmp)))
+            print(f"{label:<10} {time.perf_counter() - start:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Measure MCP server process start to first tool response.
+
+Builds a synthetic profile (Chrome file, description cache and index with
+random vectors, so no API calls are made), then times ``run_mcp.py`` with a
+full state build and with ``--snapshot``.  Run with
+``python benchmarks/bench_mcp_startup.py [bookmarks]`` (default 5000).
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+
+from bookmark_app.vectorstore import IndexUpdater, bookmarks_to_documents  # noqa: E402
+
+DIM = 3072  # text-embedding-3-large
+
+
+def make_profile(tmp: Path, n: int) -> dict[str, str]:
+    children = [
+        {"id": str(i), "guid": f"guid-{i}", "date_added": str(13_300_000_000_000_000 + i),
+         "name": f"Page {i}", "type": "url", "url": f"https://example{i % 50}.com/{i}"}
+        for i in range(n)
+    ]
+    chrome = tmp / "Bookmarks"
+    chrome.write_text(json.dumps({"roots": {"bookmark_bar": {"children": children}}}))
+
+    bookmarks = [
+        {"folder": "", "name": c["name"], "url": c["url"], "id": c["id"],
+         "guid": c["guid"], "date_added": c["date_added"], "date_last_used": "",
+         "description": f"A page about topic {i % 97}."}
+        for i, c in enumerate(children)
+    ]
+    cache = tmp / "all_bookmarks.json"
+    cache.write_text(json.dumps(bookmarks))
+
+    docs = bookmarks_to_documents(bookmarks)
+    vectors = np.random.default_rng(0).standard_normal((len(docs), DIM), dtype=np.float32)
+    updater = IndexUpdater(tmp / "vector_store", DeterministicFakeEmbedding(size=DIM))
+    updater.add(docs, vectors.tolist())
+    updater.save()
+
+    return {
+        "OPENAI_API_KEY": "sk-benchmark",
+        "BOOKMARKS_PATH": str(chrome),
+        "BOOKMARKS_CACHE_PATH": str(cache),
+        "VECTOR_STORE_DIR": str(tmp / "vector_store"),
+        "SNAPSHOT_PATH": str(tmp / "bookmarks.snapshot"),
+        "LLM_CACHE_PATH": "",
+        "LOG_LEVEL": "WARNING",
+    }
+
+
+def _send(proc: subprocess.Popen, message: dict) -> None:
+    proc.stdin.write(json.dumps(message) + "\n")
+    proc.stdin.flush()
+
+
+def _wait_for(proc: subprocess.Popen, msg_id: int) -> dict:
+    for line in proc.stdout:
+        message = json.loads(line)
+        if message.get("id") == msg_id:
+            return message
+    raise RuntimeError("server exited before responding")
+
+
+def time_first_response(args: list[str], env: dict[str, str]) -> float:
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, str(ROOT / "run_mcp.py"), *args],
+        cwd=ROOT, env={**os.environ, **env}, text=True,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    try:
+        _send(proc, {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+            "protocolVersion": "2024-11-05", "capabilities": {},
+            "clientInfo": {"name": "bench", "version": "0"},
+        }})
+        _wait_for(proc, 1)
+        _send(proc, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        _send(proc, {"jsonrpc": "2.0", "id": 2, "method": "tools/call", "params": {
+            "name": "get_bookmark_stats", "arguments": {},
+        }})
+        _wait_for(proc, 2)
+        return time.perf_counter() - start
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.TemporaryDirectory() as tmp:
+        env = make_profile(Path(tmp), n)
+        print(f"{n} bookmarks, {DIM}-dim vectors; process start -> first tool response")
+        # The full build also writes the snapshot used by the second mode.
+        for label, args in (("full build", []), ("--snapshot", ["--snapshot"])):
+            times = [time_first_response(args, env) for _ in range(3)]
+            print(f"{label:<12} best {min(times):6.2f} s   median {sorted(times)[1]:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Measure the per-query overhead of MMR reranking.
+
+Times :func:`bookmark_app.search.mmr_rerank` on random candidate pools of
+embedding-sized vectors (the FAISS search and query embedding are the same
+with or without MMR), and the reconstruction of the pool from a flat index.
+Run with ``python benchmarks/bench_mmr.py [pool] [k]`` (defaults 100, 10).
+"""
+
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import faiss  # noqa: E402
+import numpy as np  # noqa: E402
+
+from bookmark_app.search import mmr_rerank  # noqa: E402
+
+DIM = 3072  # text-embedding-3-large
+REPEATS = 1000
+
+
+def main() -> None:
+    pool = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    rng = np.random.default_rng(0)
+    index = faiss.IndexFlatL2(DIM)
+    index.add(rng.standard_normal((20_000, DIM), dtype=np.float32))
+    query = rng.standard_normal((1, DIM), dtype=np.float32)
+    rows = rng.choice(index.ntotal, pool, replace=False).astype(np.int64)
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        candidates = index.reconstruct_batch(rows)
+    reconstruct_ms = (time.perf_counter() - start) / REPEATS * 1000
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        mmr_rerank(query, candidates, k, 0.5)
+    rerank_ms = (time.perf_counter() - start) / REPEATS * 1000
+
+    print(f"pool={pool} k={k} dim={DIM}")
+    print(f"reconstruct pool   {reconstruct_ms:.3f} ms")
+    print(f"mmr rerank         {rerank_ms:.3f} ms")
+    print(f"total overhead     {reconstruct_ms + rerank_ms:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
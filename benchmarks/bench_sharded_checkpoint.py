@@ -0,0 +1,98 @@
+"""Time index checkpoints, single-file versus sharded.
+
+Imports random embedding-sized vectors in batches with a checkpoint after
+each one (as the ingest pipeline does every ``CHECKPOINT_EVERY`` documents),
+then times a full rewrite of every shard, a checkpoint after editing a few
+documents, and loading the result.  Runs once with sharding disabled and
+then with the default shard size for each number of writer threads (1 and
+``INDEX_WORKERS``, default one per CPU, at least 2).  The gain from sharding
+is incremental: only changed shards are rewritten.  Extra writer threads
+only overlap the faiss writes and fsyncs of a full rewrite; pickling the
+documents stays serial.
+Run with ``python benchmarks/bench_sharded_checkpoint.py [documents] [edits]``
+(default 50000 and 10).
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+from langchain_core.documents import Document  # noqa: E402
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+
+from bookmark_app import config, shards  # noqa: E402
+from bookmark_app.vectorstore import IndexUpdater, load_vectorstore  # noqa: E402
+
+DIM = 3072  # text-embedding-3-large
+BATCH = 1_000  # ingest.CHECKPOINT_EVERY
+
+
+def _docs(start: int, count: int, text: str = "About page") -> list[Document]:
+    return [
+        Document(
+            id=f"doc-{i}",
+            page_content=f"Page {i}\nFolder: /Bench\n\n{text} {i}, " + "words " * 30,
+            metadata={"source": f"https://example.com/{i}", "folder": "/Bench"},
+        )
+        for i in range(start, start + count)
+    ]
+
+
+def _run(store: Path, n: int, edits: int, shard_size: int, workers: int) -> None:
+    shards.SHARD_SIZE = shard_size
+    config.INDEX_WORKERS = workers
+    rng = np.random.default_rng(0)
+    embeddings = DeterministicFakeEmbedding(size=DIM)
+    updater = IndexUpdater(store, embeddings)
+    importing = 0.0
+    for start in range(0, n, BATCH):
+        count = min(BATCH, n - start)
+        updater.add(_docs(start, count), rng.standard_normal((count, DIM), dtype=np.float32))
+        begin = time.perf_counter()
+        updater.checkpoint(complete=start + count == n)
+        importing += time.perf_counter() - begin
+
+    updater._layout.dirty.update(range(len(updater._layout.sizes)))
+    begin = time.perf_counter()
+    updater.checkpoint(complete=True)
+    rewrite = time.perf_counter() - begin
+
+    updater = IndexUpdater(store, embeddings)
+    for i in rng.choice(n, edits, replace=False):
+        updater.add(_docs(int(i), 1, "Edited page"), rng.standard_normal((1, DIM), dtype=np.float32))
+    begin = time.perf_counter()
+    updater.checkpoint(complete=True)
+    incremental = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    load_vectorstore(str(store))
+    load = time.perf_counter() - begin
+    files = len(list(store.glob("index-*.faiss")))
+    print(f"  {files:3d} file(s): import checkpoints {importing:6.2f}s, "
+          f"full rewrite {rewrite:5.2f}s, after {edits} edits {incremental:5.2f}s, "
+          f"load {load:5.2f}s")
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    edits = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    threads = max(2, config.INDEX_WORKERS or os.cpu_count() or 1)
+    print(f"{n} documents x {DIM} dims, {os.cpu_count()} CPU(s)")
+    default_size = shards.SHARD_SIZE
+    with tempfile.TemporaryDirectory() as tmp:
+        print("single file:")
+        _run(Path(tmp) / "single", n, edits, shard_size=n + 1, workers=1)
+    for workers in (1, threads):
+        with tempfile.TemporaryDirectory() as tmp:
+            print(f"sharded ({default_size} documents per shard), {workers} writer thread(s):")
+            _run(Path(tmp) / "sharded", n, edits, shard_size=default_size, workers=workers)
+
+
+if __name__ == "__main__":
+    main()
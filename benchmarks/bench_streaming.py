@@ -0,0 +1,76 @@
+"""Benchmark bytes sent and CPU per chat response for the Gradio stream.
+
+Compares the old per-token full-string yield against the coalesced async
+generator in ``bookmark_app.ui``.  Run with ``python benchmarks/bench_streaming.py``.
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from langchain_core.messages import AIMessageChunk  # noqa: E402
+
+from bookmark_app import config  # noqa: E402
+from bookmark_app.ui import _build_bot_response  # noqa: E402
+
+TOKENS = 1500
+TOKEN_DELAY = 0.004  # ~250 tokens/s, a fast model
+
+
+class FakeAgent:
+    """Streams ``TOKENS`` short chunks with a fixed inter-token delay."""
+
+    async def astream(self, *args, **kwargs):
+        for i in range(TOKENS):
+            await asyncio.sleep(TOKEN_DELAY)
+            yield AIMessageChunk(content=f"tok{i} "), {}
+
+
+async def per_token_response(agent):
+    """The previous behaviour: yield the full string on every token."""
+    accumulated = ""
+    async for chunk, _ in agent.astream():
+        accumulated += chunk.content
+        yield accumulated
+
+
+async def _consume(responses) -> tuple[int, int]:
+    """Serialize each update the way it would go over the websocket."""
+    sent = updates = 0
+    async for text in responses:
+        sent += len(json.dumps({"msg": "process_generating", "data": [text]}).encode())
+        updates += 1
+    return sent, updates
+
+
+def run_per_token() -> tuple[int, int]:
+    return asyncio.run(_consume(per_token_response(FakeAgent())))
+
+
+def run_coalesced() -> tuple[int, int]:
+    bot_response = _build_bot_response(FakeAgent())
+    return asyncio.run(_consume(bot_response("hi", [], 10)))
+
+
+def _measure(label: str, fn) -> None:
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    sent, updates = fn()
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+    print(
+        f"{label:<12} updates={updates:>6}  bytes={sent:>12,}  "
+        f"cpu={cpu * 1000:8.1f} ms  wall={wall:6.2f} s"
+    )
+
+
+def main() -> None:
+    print(f"{TOKENS} tokens, flush every {config.STREAM_FLUSH_MS} ms")
+    _measure("per-token", run_per_token)
+    _measure("coalesced", run_coalesced)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,20 @@
 """LangGraph ReAct agent with system prompt and streaming."""
 
 import logging
+import time
+from uuid import UUID
 
 from langchain_community.vectorstores import FAISS
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
 from langchain_openai import ChatOpenAI
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.prebuilt import create_react_agent
 
 from . import config
+from .search import SearchFilters, diverse_search, filtered_search
+from .tracing import Trace, activate, payload_size, span
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +24,10 @@ their personal Chrome bookmark collection.
 
 **Instructions:**
 - ALWAYS use the `retrieve` tool to search the bookmark database before answering.
+- When the user mentions a folder, a website or a time period, pass it to \
+`retrieve` as a filter instead of putting it in the query.
+- If results are dominated by near-identical pages, search again with \
+`diverse=True` rather than asking for more results.
 - Present results as a numbered markdown list with clickable links: \
 `[Name](url)` followed by a brief description.
 - If the retrieve tool returns no relevant results, say so honestly — do not \
@@ -27,36 +37,114 @@ context.
 - Be concise and helpful.\
 """
 
-# Mutable default so the UI slider can update it at runtime.
-_retrieval_k: dict[str, int] = {}
 
+def create_retrieve_tool(vector_store: FAISS):
+    """Build a retrieval tool bound to *vector_store*."""
+
+    @tool(response_format="content_and_artifact")
+    def retrieve(
+        query: str,
+        folder: str = "",
+        domain: str = "",
+        added_after: str = "",
+        added_before: str = "",
+        diverse: bool = False,
+        run_config: RunnableConfig = None,
+    ):
+        """Retrieve bookmarks related to a query.
+
+        Args:
+            query: What to search for.
+            folder: Only search this folder and its subfolders.
+            domain: Only search this site and its subdomains (e.g. "github.com").
+            added_after: Only bookmarks added on or after this date (YYYY-MM-DD).
+            added_before: Only bookmarks added before this date (YYYY-MM-DD).
+            diverse: Trade some relevance for variety, e.g. when earlier
+                results were near-duplicates.
+        """
+        filters = SearchFilters(folder, domain, added_after, added_before)
+        search = diverse_search if diverse else filtered_search
+        # Per-run settings: each chat passes its own k (and trace), so
+        # concurrent chats never see each other's values.
+        configurable = (run_config or {}).get("configurable") or {}
+        k = int(configurable.get("retrieval_k") or config.RETRIEVAL_K)
+        trace = configurable.get("trace")
+        with activate(trace), span(
+            "retrieve", input_bytes=payload_size(query), filtered=bool(filters), diverse=diverse,
+        ) as attrs:
+            try:
+                retrieved_docs = search(vector_store, query, k, filters)
+            except ValueError as exc:
+                return f"Invalid filter: {exc}", []
+            with span("format", docs=len(retrieved_docs)):
+                serialized = "\n\n".join(
+                    f"Source: {doc.metadata}\nContent: {doc.page_content}"
+                    for doc in retrieved_docs
+                )
+            attrs["output_bytes"] = payload_size(serialized)
+        return serialized, retrieved_docs
 
-def _get_retrieval_k() -> int:
-    """Return the current retrieval k, defaulting to the config value."""
-    return _retrieval_k.get("value", config.RETRIEVAL_K)
+    return retrieve
 
 
-def set_retrieval_k(k: int) -> None:
-    """Update the number of results returned by the retrieve tool."""
-    _retrieval_k["value"] = k
+class TraceCallbackHandler(BaseCallbackHandler):
+    """Record the agent's graph steps and LLM calls as spans of *trace*.
 
+    Each LangGraph node run becomes a ``step.<node>`` span and each chat
+    model call an ``llm`` span with prompt and reply sizes and the time to
+    the first streamed token.  Pass the trace itself as ``configurable.trace``
+    so the ``retrieve`` tool can add its spans too.
+    """
 
-def create_retrieve_tool(vector_store: FAISS):
-    """Build a retrieval tool bound to *vector_store*."""
+    run_inline = True
 
-    @tool(response_format="content_and_artifact")
-    def retrieve(query: str):
-        """Retrieve bookmarks related to a query."""
-        retrieved_docs = vector_store.similarity_search(
-            query, k=_get_retrieval_k(),
-        )
-        serialized = "\n\n".join(
-            f"Source: {doc.metadata}\nContent: {doc.page_content}"
-            for doc in retrieved_docs
+    def __init__(self, trace: Trace):
+        self.trace = trace
+        self._runs: dict[UUID, tuple[str, float, dict]] = {}
+
+    def _open(self, run_id: UUID, name: str, **attrs) -> None:
+        self._runs[run_id] = (name, time.perf_counter(), attrs)
+
+    def _close(self, run_id: UUID, **attrs) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            name, start, opened = run
+            self.trace.add(name, start, time.perf_counter(), **opened, **attrs)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        if node and node == kwargs.get("name"):
+            self._open(run_id, f"step.{node}", step=metadata.get("langgraph_step"))
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._close(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._close(run_id, error=type(error).__name__)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._open(
+            run_id, "llm",
+            input_bytes=sum(payload_size(m.content) for batch in messages for m in batch),
         )
-        return serialized, retrieved_docs
 
-    return retrieve
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run is not None and "first_token_ms" not in run[2]:
+            run[2]["first_token_ms"] = round((time.perf_counter() - run[1]) * 1000, 3)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        output = 0
+        for generations in response.generations:
+            for generation in generations:
+                output += payload_size(generation.text)
+                message = getattr(generation, "message", None)
+                if getattr(message, "tool_calls", None):
+                    output += payload_size([call["args"] for call in message.tool_calls])
+        self._close(run_id, output_bytes=output)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._close(run_id, error=type(error).__name__)
 
 
 def get_llm() -> ChatOpenAI:
@@ -74,5 +162,5 @@ def create_agent(llm: ChatOpenAI, vector_store: FAISS):
         checkpointer=memory,
         prompt=SYSTEM_PROMPT,
     )
-    logger.info("Agent created with model=%s, k=%d", config.LLM_MODEL, _get_retrieval_k())
+    logger.info("Agent created with model=%s, k=%d", config.LLM_MODEL, config.RETRIEVAL_K)
     return agent
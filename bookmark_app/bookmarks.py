@@ -2,47 +2,153 @@
 
 import json
 import logging
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 from .config import get_bookmarks_path
+from .storage import atomic_write_json
 
 logger = logging.getLogger(__name__)
 
+CHROME_ROOTS = ("bookmark_bar", "other", "synced", "workspaces")
+
+# Files larger than this are parsed incrementally when ``ijson`` is installed.
+INCREMENTAL_PARSE_BYTES = 64 * 1024 * 1024
+
 
 # ---------------------------------------------------------------------------
 # Chrome extraction
 # ---------------------------------------------------------------------------
 
+class ChromeBookmark(NamedTuple):
+    """A single Chrome bookmark with the stable keys needed for diffing."""
+
+    folder: str
+    name: str
+    url: str
+    id: str = ""
+    guid: str = ""
+    date_added: str = ""
+    date_last_used: str = ""
+
+
+def iter_bookmarks(
+    nodes: Iterable[dict], parent_folder: str = "",
+) -> Iterator[ChromeBookmark]:
+    """Yield bookmarks from Chrome *nodes* in document order.
+
+    Walks the tree with an explicit stack, so deep folder nesting cannot hit
+    the recursion limit and no intermediate lists are built.
+    """
+    stack: list[tuple[Iterator[dict], str]] = [(iter(nodes), parent_folder)]
+    while stack:
+        items, folder = stack[-1]
+        for item in items:
+            if "children" in item:
+                stack.append((iter(item["children"]), f"{folder}/{item['name']}"))
+                break
+            if "url" in item:
+                yield ChromeBookmark(
+                    folder=folder,
+                    name=item["name"],
+                    url=item["url"],
+                    id=item.get("id", ""),
+                    guid=item.get("guid", ""),
+                    date_added=item.get("date_added", ""),
+                    date_last_used=item.get("date_last_used", ""),
+                )
+        else:
+            stack.pop()
+
+
+# Seconds between Chrome's epoch (1601-01-01) and the Unix epoch.
+_CHROME_EPOCH_OFFSET = 11_644_473_600
+
+
+def chrome_date(value: str) -> str:
+    """Convert a Chrome timestamp (microseconds since 1601) to ``YYYY-MM-DD``.
+
+    Returns ``""`` for missing or zero timestamps.
+    """
+    if not value.isdigit() or int(value) == 0:
+        return ""
+    seconds = int(value) // 1_000_000 - _CHROME_EPOCH_OFFSET
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).date().isoformat()
+
+
 def extract_bookmarks(nodes: list, parent_folder: str = "") -> list[dict]:
-    """Recursively flatten Chrome bookmark nodes into a list of dicts."""
-    extracted: list[dict] = []
-    for item in nodes:
-        if "children" in item:
-            folder_path = f"{parent_folder}/{item['name']}"
-            extracted.extend(extract_bookmarks(item["children"], folder_path))
-        elif "url" in item:
-            extracted.append({
-                "folder": parent_folder,
-                "name": item["name"],
-                "url": item["url"],
-            })
-    return extracted
-
-
-def load_chrome_bookmarks(path: Path | None = None) -> list[dict]:
-    """Read the Chrome Bookmarks JSON and return a flat bookmark list."""
-    path = path or get_bookmarks_path()
-    logger.info("Reading Chrome bookmarks from %s", path)
+    """Flatten Chrome bookmark nodes into a list of dicts."""
+    return [bm._asdict() for bm in iter_bookmarks(nodes, parent_folder)]
+
 
+def _iter_roots_incremental(path: Path) -> Iterator[ChromeBookmark]:
+    """Stream bookmarks with ``ijson``, one top-level node at a time.
+
+    Only a single child of a root (e.g. one folder on the bookmark bar) is
+    materialized at once, instead of the whole document.  Each root is read
+    in its own pass so the C backend can build the nodes.
+    """
+    try:
+        import ijson
+    except ImportError as exc:
+        raise ImportError(
+            "Incremental bookmark parsing requires ijson: pip install ijson"
+        ) from exc
+
+    with path.open("rb") as f:
+        for root in CHROME_ROOTS:
+            f.seek(0)
+            yield from iter_bookmarks(
+                ijson.items(f, f"roots.{root}.children.item")
+            )
+
+
+def _iter_roots(path: Path) -> Iterator[ChromeBookmark]:
+    """Load the whole Bookmarks file and yield from each root."""
     with path.open("r", encoding="utf-8") as f:
         data = json.load(f)
-
-    all_bookmarks: list[dict] = []
-    for root in ("bookmark_bar", "other", "synced"):
+    for root in CHROME_ROOTS:
         if root in data["roots"]:
-            all_bookmarks.extend(
-                extract_bookmarks(data["roots"][root]["children"])
-            )
+            yield from iter_bookmarks(data["roots"][root].get("children", []))
+
+
+def iter_chrome_bookmarks(
+    path: Path | None = None, incremental: bool | None = None,
+) -> Iterator[ChromeBookmark]:
+    """Yield every bookmark in the Chrome Bookmarks file at *path*.
+
+    *incremental* selects the streaming ``ijson`` parser; when ``None`` it is
+    used automatically for files above ``INCREMENTAL_PARSE_BYTES`` if ijson
+    is installed.
+    """
+    path = path or get_bookmarks_path()
+    if incremental is None:
+        incremental = False
+        if path.stat().st_size > INCREMENTAL_PARSE_BYTES:
+            try:
+                import ijson  # noqa: F401
+                incremental = True
+            except ImportError:
+                pass
+    if incremental:
+        return _iter_roots_incremental(path)
+    return _iter_roots(path)
+
+
+def load_chrome_bookmarks(
+    path: Path | None = None, incremental: bool | None = None,
+) -> list[dict]:
+    """Read the Chrome Bookmarks JSON and return a flat bookmark list."""
+    path = path or get_bookmarks_path()
+    logger.info("Reading Chrome bookmarks from %s", path)
+
+    all_bookmarks = [
+        bm._asdict() for bm in iter_chrome_bookmarks(path, incremental)
+    ]
 
     logger.info("Extracted %d bookmarks from Chrome", len(all_bookmarks))
     return all_bookmarks
@@ -66,10 +172,9 @@ def load_cache(path: str) -> list[dict]:
 
 
 def save_cache(bookmarks: list[dict], path: str) -> None:
-    """Persist bookmarks to a JSON file."""
+    """Persist bookmarks to a JSON file (atomically, via a temp file)."""
     json_path = Path(path)
-    with json_path.open("w", encoding="utf-8") as f:
-        json.dump(bookmarks, f, ensure_ascii=False, indent=2)
+    atomic_write_json(json_path, bookmarks, ensure_ascii=False, indent=2)
     logger.info("Saved %d bookmarks to %s", len(bookmarks), json_path)
 
 
@@ -77,28 +182,162 @@ def save_cache(bookmarks: list[dict], path: str) -> None:
 # Merge
 # ---------------------------------------------------------------------------
 
-def merge_bookmarks(fresh: list[dict], cached: list[dict]) -> list[dict]:
-    """Merge freshly extracted bookmarks with the cached list.
+def bookmark_key(bookmark: dict) -> str:
+    """Return the stable identity of *bookmark*.
 
-    Cached bookmarks that still exist in *fresh* keep their descriptions.
-    New bookmarks (present in *fresh* but not in *cached*) are appended
-    without a description so the description generator picks them up.
-    Bookmarks removed from Chrome (in *cached* but not in *fresh*) are dropped.
+    Chrome's ``guid`` survives renames, moves and URL edits; ``id`` is used
+    when it is missing, and the URL only for caches written before either
+    was recorded.
     """
-    cached_by_url: dict[str, dict] = {b["url"]: b for b in cached}
-    merged: list[dict] = []
+    return bookmark.get("guid") or bookmark.get("id") or bookmark["url"]
 
-    for bookmark in fresh:
-        url = bookmark["url"]
-        if url in cached_by_url:
-            # Preserve existing entry (keeps description if present)
-            merged.append(cached_by_url[url])
+
+@dataclass
+class BookmarkDiff:
+    """Classified changes between a fresh Chrome extract and the cache.
+
+    A bookmark that was both renamed and moved appears in both lists.
+    """
+
+    merged: list[dict] = field(default_factory=list)
+    added: list[dict] = field(default_factory=list)
+    removed: list[dict] = field(default_factory=list)
+    renamed: list[dict] = field(default_factory=list)
+    moved: list[dict] = field(default_factory=list)
+    url_changed: list[dict] = field(default_factory=list)
+    unchanged: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.merged)} total, {len(self.added)} added, "
+            f"{len(self.removed)} removed, {len(self.renamed)} renamed, "
+            f"{len(self.moved)} moved, {len(self.url_changed)} URL changed"
+        )
+
+
+def diff_bookmarks(fresh: list[dict], cached: list[dict]) -> BookmarkDiff:
+    """Match *fresh* against *cached* by :func:`bookmark_key` and classify.
+
+    Matched entries take their folder, name and URL from *fresh* and keep
+    everything else (notably the description) from *cached*, so renames,
+    moves and URL edits never cost a new LLM call.  Legacy cache entries
+    without a guid are matched on URL instead.
+    """
+    diff = BookmarkDiff()
+    cached_by_key: dict[str, dict] = {}
+    legacy_by_url: dict[str, dict] = {}
+    for bm in cached:
+        if bm.get("guid") or bm.get("id"):
+            cached_by_key[bookmark_key(bm)] = bm
         else:
-            merged.append(bookmark)
+            legacy_by_url.setdefault(bm["url"], bm)
+
+    for bookmark in fresh:
+        old = cached_by_key.pop(bookmark_key(bookmark), None)
+        if old is None:
+            old = legacy_by_url.pop(bookmark["url"], None)
+        if old is None:
+            diff.merged.append(bookmark)
+            diff.added.append(bookmark)
+            continue
+
+        entry = {**old, **bookmark}
+        diff.merged.append(entry)
+        changed = False
+        if old["name"] != bookmark["name"]:
+            diff.renamed.append(entry)
+            changed = True
+        if old.get("folder", "") != bookmark.get("folder", ""):
+            diff.moved.append(entry)
+            changed = True
+        if old["url"] != bookmark["url"]:
+            diff.url_changed.append(entry)
+            changed = True
+        if not changed:
+            diff.unchanged += 1
+
+    diff.removed.extend(cached_by_key.values())
+    diff.removed.extend(legacy_by_url.values())
+    return diff
+
+
+def merge_bookmarks(fresh: list[dict], cached: list[dict]) -> list[dict]:
+    """Merge freshly extracted bookmarks with the cached list.
 
-    new_count = sum(1 for b in merged if "description" not in b)
+    Cached bookmarks that still exist in *fresh* keep their descriptions,
+    even if they were renamed, moved or pointed at a new URL.  New bookmarks
+    are added without a description so the description generator picks
+    them up.  Bookmarks removed from Chrome are dropped.
+    """
+    diff = diff_bookmarks(fresh, cached)
+    new_count = sum(1 for b in diff.merged if "description" not in b)
     logger.info(
-        "Merged bookmarks: %d total, %d new (need descriptions)",
-        len(merged), new_count,
+        "Merged bookmarks: %s; %d need descriptions", diff.summary(), new_count,
     )
-    return merged
+    return diff.merged
+
+
+# ---------------------------------------------------------------------------
+# URL canonicalization
+# ---------------------------------------------------------------------------
+
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid",
+    "mc_eid", "_hsenc", "_hsmi", "ref_src", "ref_url", "spm",
+})
+TRACKING_PREFIXES = ("utm_",)
+
+
+def canonical_url(url: str) -> str:
+    """Normalize *url* so trivially different links to one page compare equal.
+
+    ``http``/``https``, ``www.`` prefixes, default ports, tracking query
+    parameters, parameter order and trailing slashes are ignored.  Non-web
+    URLs (``chrome://``, ``javascript:``, ...) are returned unchanged.
+    """
+    parts = urlsplit(url.strip())
+    if parts.scheme.lower() not in ("http", "https"):
+        return url
+    try:
+        port = parts.port
+    except ValueError:
+        return url
+
+    host = (parts.hostname or "").rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    if ":" in host:
+        host = f"[{host}]"
+    if port not in (None, 80, 443):
+        host = f"{host}:{port}"
+    if parts.username:
+        host = f"{parts.username}@{host}"
+
+    query = urlencode(sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+        and not key.lower().startswith(TRACKING_PREFIXES)
+    ))
+    return urlunsplit(("https", host, parts.path.rstrip("/"), query, parts.fragment))
+
+
+def _age_key(bookmark: dict) -> tuple[int, str]:
+    date_added = bookmark.get("date_added", "")
+    return int(date_added) if date_added.isdigit() else 0, bookmark_key(bookmark)
+
+
+def group_by_canonical_url(bookmarks: list[dict]) -> dict[str, list[int]]:
+    """Group indices of *bookmarks* by :func:`canonical_url`.
+
+    Within each group the oldest bookmark comes first; it is the primary
+    copy whose key identifies the shared document in the vector store (and
+    whose name and folder are embedded).
+    """
+    groups: dict[str, list[int]] = {}
+    for i, bm in enumerate(bookmarks):
+        groups.setdefault(canonical_url(bm["url"]), []).append(i)
+    for indices in groups.values():
+        if len(indices) > 1:
+            indices.sort(key=lambda i: _age_key(bookmarks[i]))
+    return groups
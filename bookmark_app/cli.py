@@ -0,0 +1,139 @@
+"""Maintenance commands -- run with ``python -m bookmark_app.cli``."""
+
+import argparse
+import json
+import sys
+from dataclasses import asdict
+from pathlib import Path
+
+from . import config
+from .llm_cache import LLMResponseCache
+
+
+def _cmd_cache(args: argparse.Namespace) -> int:
+    if not config.LLM_CACHE_PATH:
+        print("LLM response cache is disabled (LLM_CACHE_PATH is empty).")
+        return 1
+    with LLMResponseCache(config.LLM_CACHE_PATH) as cache:
+        if args.action == "export":
+            count = cache.export_entries(args.path)
+            print(f"Exported {count} responses to {args.path}")
+        elif args.action == "import":
+            count = cache.import_entries(args.path)
+            print(f"Imported {count} new responses from {args.path}")
+        else:
+            print(f"{config.LLM_CACHE_PATH}: {len(cache)} responses "
+                  f"(limit {cache.max_entries})")
+    return 0
+
+
+def _cmd_duplicates(args: argparse.Namespace) -> int:
+    from .duplicates import find_duplicates
+    from .vectorstore import load_vectorstore
+
+    vector_store = load_vectorstore()
+    if vector_store is None:
+        print(f"No vector store at {config.VECTOR_STORE_DIR}; run the app first.")
+        return 1
+    try:
+        clusters = find_duplicates(
+            vector_store, args.threshold, Path(config.VECTOR_STORE_DIR),
+        )
+    except ValueError as exc:  # DUPLICATE_THRESHOLD out of range
+        print(f"Invalid threshold: {exc}", file=sys.stderr)
+        return 2
+    if args.json:
+        json.dump([asdict(c) for c in clusters], sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return 0
+    for cluster in clusters[:args.limit]:
+        print(f"{len(cluster.ids)} bookmarks, similarity {cluster.similarity:.3f}")
+        for doc_id in cluster.ids:
+            doc = vector_store.docstore.search(doc_id)
+            name = doc.page_content.split("\n")[0]
+            print(f"  {doc.metadata.get('source', '')}  ({name})")
+    print(f"{len(clusters)} duplicate groups among {vector_store.index.ntotal} pages")
+    return 0
+
+
+def _cmd_traces(args: argparse.Namespace) -> int:
+    from .tracing import read_log, summarize
+
+    path = args.path or config.SLOW_QUERY_LOG
+    if not path or not Path(path).exists():
+        print(f"No slow-query log at {path}; run with TRACING=1 first.")
+        return 1
+    traces = [t for t in read_log(path) if not args.trace or t.get("trace") == args.trace]
+    stats = summarize(traces)
+    if args.json:
+        json.dump([asdict(s) for s in stats], sys.stdout, indent=2)
+        print()
+        return 0
+    if traces and all(t.get("slow_query_ms") == 0 for t in traces):
+        scope = "every request was logged"
+    else:
+        scope = "slow requests only; faster ones are not logged"
+    print(f"{len(traces)} traces from {path} ({scope})")
+    print(f"{'span':<28} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} "
+          f"{'total s':>8} {'p50 out':>8}")
+    for s in stats:
+        size = "" if s.p50_output_bytes is None else str(s.p50_output_bytes)
+        print(f"{s.name:<28} {s.count:>6} {s.p50_ms:>9.1f} {s.p95_ms:>9.1f} "
+              f"{s.max_ms:>9.1f} {s.total_ms / 1000:>8.2f} {size:>8}")
+    return 0
+
+
+def _similarity(value: str) -> float:
+    """argparse type for a duplicate similarity threshold."""
+    from .duplicates import MIN_THRESHOLD
+
+    try:
+        threshold = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a number: {value!r}") from None
+    if not MIN_THRESHOLD <= threshold <= 1:
+        raise argparse.ArgumentTypeError(f"must be in [{MIN_THRESHOLD}, 1], got {value}")
+    return threshold
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m bookmark_app.cli", description=__doc__.split(" --")[0],
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cache = commands.add_parser("cache", help="Inspect, export or import the LLM response cache")
+    cache.add_argument("action", choices=["info", "export", "import"])
+    cache.add_argument("path", nargs="?", help="JSONL file for export/import")
+    cache.set_defaults(func=_cmd_cache)
+
+    duplicates = commands.add_parser("duplicates", help="List groups of near-duplicate bookmarks")
+    duplicates.add_argument(
+        "--threshold", type=_similarity, default=None,
+        help="Cosine similarity for a duplicate (default DUPLICATE_THRESHOLD)",
+    )
+    duplicates.add_argument("--limit", type=int, default=50, help="Groups to print (default 50)")
+    duplicates.add_argument("--json", action="store_true", help="Print every group as JSON")
+    duplicates.set_defaults(func=_cmd_duplicates)
+
+    traces = commands.add_parser("traces", help="Summarize span latencies in the slow-query log")
+    traces.add_argument("path", nargs="?", help="JSONL log (default SLOW_QUERY_LOG)")
+    traces.add_argument("--trace", help="Only traces with this root name (e.g. bot_response)")
+    traces.add_argument("--json", action="store_true", help="Print the statistics as JSON")
+    traces.set_defaults(func=_cmd_traces)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    config.load_env()
+    config.setup_logging()
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "action", None) in ("export", "import") and not args.path:
+        parser.error(f"cache {args.action} requires a path")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
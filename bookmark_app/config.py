@@ -16,8 +16,26 @@ LLM_MODEL = "gpt-4.1"
 EMBEDDING_MODEL = "text-embedding-3-large"
 VECTOR_STORE_DIR = "vector_store"
 BOOKMARKS_CACHE_PATH = "all_bookmarks.json"
+LLM_CACHE_PATH = "llm_cache.sqlite3"
+SNAPSHOT_PATH = "bookmarks.snapshot"
+INDEX_WORKERS = 0  # 0 = one per CPU
+LLM_CACHE_MAX_ENTRIES = 200_000
 RETRIEVAL_K = 10
+MMR_LAMBDA = 0.5
+MMR_POOL_SIZE = 50
+DUPLICATE_THRESHOLD = 0.95
+TOPIC_COUNT = 0  # 0 = about sqrt(documents / 2)
+FETCH_PAGES = False
+PAGE_CACHE_PATH = "page_cache.sqlite3"
+FETCH_CONCURRENCY = 16
+FETCH_TIMEOUT = 10.0
 LOG_LEVEL = "INFO"
+STREAM_FLUSH_MS = 50
+UI_CONCURRENCY_LIMIT = 32
+UI_QUEUE_MAX_SIZE = 256
+TRACING = False
+SLOW_QUERY_MS = 1000
+SLOW_QUERY_LOG = "slow_queries.jsonl"
 
 
 def load_env() -> None:
@@ -26,14 +44,43 @@ def load_env() -> None:
 
     # Re-read tunables from env so that .env values take effect.
     global LLM_MODEL, EMBEDDING_MODEL, VECTOR_STORE_DIR, BOOKMARKS_CACHE_PATH
-    global RETRIEVAL_K, LOG_LEVEL
+    global LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, SNAPSHOT_PATH, INDEX_WORKERS
+    global RETRIEVAL_K, MMR_LAMBDA, MMR_POOL_SIZE, DUPLICATE_THRESHOLD, TOPIC_COUNT
+    global FETCH_PAGES, PAGE_CACHE_PATH, FETCH_CONCURRENCY, FETCH_TIMEOUT
+    global LOG_LEVEL
+    global STREAM_FLUSH_MS, UI_CONCURRENCY_LIMIT, UI_QUEUE_MAX_SIZE
+    global TRACING, SLOW_QUERY_MS, SLOW_QUERY_LOG
 
     LLM_MODEL = os.getenv("LLM_MODEL", LLM_MODEL)
     EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", EMBEDDING_MODEL)
     VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", VECTOR_STORE_DIR)
     BOOKMARKS_CACHE_PATH = os.getenv("BOOKMARKS_CACHE_PATH", BOOKMARKS_CACHE_PATH)
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", LLM_CACHE_PATH)
+    SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", SNAPSHOT_PATH)
+    INDEX_WORKERS = int(os.getenv("INDEX_WORKERS", str(INDEX_WORKERS)))
+    LLM_CACHE_MAX_ENTRIES = int(
+        os.getenv("LLM_CACHE_MAX_ENTRIES", str(LLM_CACHE_MAX_ENTRIES))
+    )
     RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", str(RETRIEVAL_K)))
+    MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", str(MMR_LAMBDA)))
+    MMR_POOL_SIZE = int(os.getenv("MMR_POOL_SIZE", str(MMR_POOL_SIZE)))
+    DUPLICATE_THRESHOLD = float(
+        os.getenv("DUPLICATE_THRESHOLD", str(DUPLICATE_THRESHOLD))
+    )
+    TOPIC_COUNT = int(os.getenv("TOPIC_COUNT", str(TOPIC_COUNT)))
+    FETCH_PAGES = os.getenv("FETCH_PAGES", str(FETCH_PAGES)).lower() in ("1", "true", "yes")
+    PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", PAGE_CACHE_PATH)
+    FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", str(FETCH_CONCURRENCY)))
+    FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", str(FETCH_TIMEOUT)))
     LOG_LEVEL = os.getenv("LOG_LEVEL", LOG_LEVEL)
+    STREAM_FLUSH_MS = int(os.getenv("STREAM_FLUSH_MS", str(STREAM_FLUSH_MS)))
+    UI_CONCURRENCY_LIMIT = int(
+        os.getenv("UI_CONCURRENCY_LIMIT", str(UI_CONCURRENCY_LIMIT))
+    )
+    UI_QUEUE_MAX_SIZE = int(os.getenv("UI_QUEUE_MAX_SIZE", str(UI_QUEUE_MAX_SIZE)))
+    TRACING = os.getenv("TRACING", str(TRACING)).lower() in ("1", "true", "yes")
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", str(SLOW_QUERY_MS)))
+    SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", SLOW_QUERY_LOG)
 
 
 def setup_logging() -> None:
@@ -2,24 +2,39 @@
 
 import asyncio
 import logging
-from typing import Callable
+from typing import Awaitable, Callable
 
 from langchain_openai import ChatOpenAI
 
 from . import config
+from .bookmarks import group_by_canonical_url
+from .fetcher import PageContent, PageFetcher, open_default_fetcher
+from .llm_cache import LLMResponseCache, open_default_cache
 
 logger = logging.getLogger(__name__)
 
 MAX_CONCURRENT = 5
 
+# Bump whenever PROMPT_TEMPLATE changes so cached responses are not reused.
+PROMPT_VERSION = 2
+
 PROMPT_TEMPLATE = (
     "Generate a concise description (2-3 sentences) for the following bookmark.\n"
     "Folder: {folder}\n"
     "Name: {name}\n"
-    "URL: {url}\n\n"
-    "If you cannot access the URL, infer the description from the name and folder "
-    "context. Do NOT mention that you cannot access the URL."
+    "URL: {url}\n"
+    "{page}\n"
+    "Base the description on the page content if it is given; otherwise infer "
+    "it from the name and folder context. Do NOT mention whether the page "
+    "could be accessed."
+)
+
+PAGE_TEMPLATE = (
+    "Page title: {title}\n"
+    "Page summary: {description}\n"
+    "Page text: {text}\n"
 )
+PAGE_TEXT_CHARS = 1500  # of extracted page text included in the prompt
 
 
 class _ProgressCounter:
@@ -27,6 +42,7 @@ class _ProgressCounter:
 
     def __init__(self, total: int, on_progress: Callable[[], None] | None = None):
         self.completed = 0
+        self.cached = 0
         self.total = total
         self._on_progress = on_progress
 
@@ -40,21 +56,50 @@ class _ProgressCounter:
                 self._on_progress()
 
 
+def _render_prompt(bookmark: dict, page: PageContent | None = None) -> str:
+    page_section = ""
+    if page is not None and (page.title or page.description or page.text):
+        page_section = PAGE_TEMPLATE.format(
+            title=page.title,
+            description=page.description,
+            text=page.text[:PAGE_TEXT_CHARS],
+        )
+    return PROMPT_TEMPLATE.format(
+        folder=bookmark.get("folder", ""),
+        name=bookmark["name"],
+        url=bookmark["url"],
+        page=page_section,
+    )
+
+
 async def _generate_one(
     bookmark: dict,
     llm: ChatOpenAI,
     semaphore: asyncio.Semaphore,
     progress: _ProgressCounter,
+    cache: LLMResponseCache | None = None,
+    page: PageContent | None = None,
 ) -> str:
-    """Generate a description for a single bookmark."""
-    prompt = PROMPT_TEMPLATE.format(
-        folder=bookmark.get("folder", ""),
-        name=bookmark["name"],
-        url=bookmark["url"],
-    )
+    """Generate a description for a single bookmark.
+
+    *page* is the fetched page content, if any.  A hit in *cache* skips
+    the LLM call; only successful responses are stored.
+    """
+    prompt = _render_prompt(bookmark, page)
+    model = getattr(llm, "model_name", "")
+    key = LLMResponseCache.make_key(model, PROMPT_VERSION, prompt)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            progress.cached += 1
+            progress.increment()
+            return cached
+
     async with semaphore:
         try:
             response = await llm.ainvoke(prompt)
+            if cache is not None:
+                cache.put(key, model, response.content)
             return response.content
         except Exception:
             logger.exception("Failed to generate description for %s", bookmark["url"])
@@ -63,42 +108,125 @@ async def _generate_one(
             progress.increment()
 
 
+def _pending_groups(
+    bookmarks: list[dict],
+) -> tuple[list[list[int]], list[list[int]], int]:
+    """Group bookmarks by canonical URL and split by description status.
+
+    Duplicates of a page that already has a description reuse it directly.
+    Returns ``(pending, ready, saved)``: groups that still need one LLM call
+    each, groups whose description is already known, and the number of
+    calls saved by deduplication.
+    """
+    pending: list[list[int]] = []
+    ready: list[list[int]] = []
+    saved = 0
+    for indices in group_by_canonical_url(bookmarks).values():
+        missing = [i for i in indices if "description" not in bookmarks[i]]
+        if not missing:
+            ready.append(indices)
+            continue
+        known = next(
+            (bookmarks[i]["description"] for i in indices if "description" in bookmarks[i]),
+            None,
+        )
+        if known is not None:
+            for i in missing:
+                bookmarks[i]["description"] = known
+            ready.append(indices)
+            saved += len(missing)
+        else:
+            pending.append(indices)
+            saved += len(indices) - 1
+    return pending, ready, saved
+
+
 async def _generate_all(
     bookmarks: list[dict],
     llm: ChatOpenAI,
     on_progress: Callable[[], None] | None = None,
+    cache: LLMResponseCache | None = None,
+    on_described: Callable[[list[int]], Awaitable[None]] | None = None,
+    fetcher: PageFetcher | None = None,
 ) -> list[dict]:
-    """Generate missing descriptions concurrently."""
+    """Generate missing descriptions concurrently, once per canonical URL.
+
+    ``MAX_CONCURRENT`` workers pull groups of duplicate bookmarks from a
+    shared iterator.  With a *fetcher*, pages are first fetched by a
+    separate pool of workers feeding a bounded queue, so page downloads
+    overlap LLM calls.  *on_described* is awaited with the indices of every
+    group as soon as its description is known -- right away for groups that
+    need no LLM call.  A slow callback holds back the workers, which lets a
+    downstream stage apply backpressure.
+    """
     semaphore = asyncio.Semaphore(MAX_CONCURRENT)
-    indices: list[int] = [
-        i for i, bm in enumerate(bookmarks) if "description" not in bm
-    ]
+    groups, ready, saved = _pending_groups(bookmarks)
+    if saved:
+        logger.info("Duplicate URLs share descriptions: %d LLM calls saved", saved)
 
-    if not indices:
+    async def feed_ready() -> None:
+        if on_described is not None:
+            for group in ready:
+                await on_described(group)
+
+    if not groups:
         logger.info("All bookmarks already have descriptions")
+        await feed_ready()
         return bookmarks
 
-    total = len(indices)
+    total = len(groups)
     logger.info("Generating descriptions for %d bookmarks ...", total)
     progress = _ProgressCounter(total, on_progress)
+    pending = iter(groups)
+    workers = min(MAX_CONCURRENT, total)
+    fetched: asyncio.Queue | None = None
+
+    async def fetch_worker() -> None:
+        for group in pending:
+            try:
+                page = await fetcher.fetch(bookmarks[group[0]]["url"])
+            except Exception:
+                logger.exception("Fetching %s failed", bookmarks[group[0]]["url"])
+                page = None
+            await fetched.put((group, page))
 
-    tasks = [
-        asyncio.create_task(
-            _generate_one(bookmarks[idx], llm, semaphore, progress)
+    async def fetch_all() -> None:
+        await asyncio.gather(
+            *(fetch_worker() for _ in range(min(fetcher.concurrency, total))),
         )
-        for idx in indices
-    ]
+        for _ in range(workers):
+            await fetched.put(None)
 
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    async def next_group() -> tuple[list[int], PageContent | None] | None:
+        if fetched is not None:
+            return await fetched.get()
+        group = next(pending, None)
+        return None if group is None else (group, None)
 
-    for idx, result in zip(indices, results):
-        if isinstance(result, Exception):
-            logger.error("Description failed for index %d: %s", idx, result)
-            bookmarks[idx]["description"] = f"Bookmark: {bookmarks[idx]['name']}"
-        else:
-            bookmarks[idx]["description"] = result
+    async def worker() -> None:
+        while (item := await next_group()) is not None:
+            group, page = item
+            first = bookmarks[group[0]]
+            try:
+                result = await _generate_one(first, llm, semaphore, progress, cache, page)
+            except Exception as exc:
+                logger.error("Description failed for %s: %s", first["url"], exc)
+                result = f"Bookmark: {first['name']}"
+            for idx in group:
+                bookmarks[idx]["description"] = result
+            if on_described is not None:
+                await on_described(group)
+
+    stages = [feed_ready(), *(worker() for _ in range(workers))]
+    if fetcher is not None:
+        fetched = asyncio.Queue(MAX_CONCURRENT * 4)
+        stages.append(fetch_all())
+    await asyncio.gather(*stages)
 
-    logger.info("Description generation complete")
+    logger.info(
+        "Description generation complete (%d/%d from response cache)",
+        progress.cached, total,
+    )
     return bookmarks
 
 
@@ -111,8 +239,22 @@ def generate_all_descriptions_sync(
 
     If *llm* is not provided, a new ``ChatOpenAI`` instance is created using
     the configured model.  *on_progress* is called every 10 completions so the
-    caller can persist intermediate results.
+    caller can persist intermediate results.  Responses are looked up in and
+    saved to the persistent cache at ``LLM_CACHE_PATH``.  Pages are fetched
+    first when ``FETCH_PAGES`` is on.
     """
     if llm is None:
         llm = ChatOpenAI(model=config.LLM_MODEL)
-    return asyncio.run(_generate_all(bookmarks, llm, on_progress))
+    cache = open_default_cache()
+
+    async def run() -> list[dict]:
+        async with open_default_fetcher() as fetcher:
+            return await _generate_all(
+                bookmarks, llm, on_progress, cache, fetcher=fetcher,
+            )
+
+    try:
+        return asyncio.run(run())
+    finally:
+        if cache is not None:
+            cache.close()
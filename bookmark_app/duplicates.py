@@ -0,0 +1,262 @@
+"""Near-duplicate detection by a similarity self-join over the stored vectors.
+
+Pairs of documents whose embeddings have cosine similarity at or above a
+threshold are linked, and linked documents are grouped into clusters with
+union-find.  No text is embedded and no LLM is called.
+
+Small collections are joined exactly, tile by tile.  Larger ones first find
+candidate pairs with an inverted-file (IVF) self-join over a 64-dimensional
+random projection of the vectors, and confirm each tile's candidates against
+the full vectors straight away.  Either way working memory is bounded by
+the tile or batch size; only confirmed pairs are kept.
+
+Thresholds below ``MIN_THRESHOLD`` are rejected: they link merely related
+pages, so the number of pairs (and the join time) would grow with the
+square of the collection.
+"""
+
+import json
+import logging
+import math
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from . import config
+from .shards import stored_vectors
+from .storage import atomic_write_json, index_generation
+
+logger = logging.getLogger(__name__)
+
+# Collections up to this size are joined exactly (~1 s for 5k x 3072).
+EXACT_JOIN_LIMIT = 5_000
+TILE_SIZE = 2048
+PROJECTION_DIM = 64
+NPROBE = 8
+VERIFY_BATCH = 4096
+MIN_THRESHOLD = 0.8
+
+_DUPLICATES_FILE = "duplicates.json"
+
+
+@dataclass
+class DuplicateCluster:
+    """Documents whose embeddings are near-identical."""
+
+    ids: list[str]
+    similarity: float  # of the closest pair in the cluster
+
+
+# ---------------------------------------------------------------------------
+# Vector access
+# ---------------------------------------------------------------------------
+
+
+def _inverse_norms(vectors: np.ndarray) -> np.ndarray:
+    inv = np.empty(len(vectors), dtype=np.float32)
+    for start in range(0, len(vectors), TILE_SIZE):
+        block = vectors[start:start + TILE_SIZE]
+        inv[start:start + TILE_SIZE] = 1 / np.maximum(
+            np.sqrt(np.einsum("ij,ij->i", block, block)), 1e-12,
+        )
+    return inv
+
+
+# ---------------------------------------------------------------------------
+# Self-joins -- both return (rows_a, rows_b, similarities) with a < b
+# ---------------------------------------------------------------------------
+
+
+def _exact_pairs(vectors: np.ndarray, inv: np.ndarray, threshold: float):
+    """All pairs at or above *threshold*, one upper-triangle tile at a time."""
+    found_a, found_b, found_s = [], [], []
+    n = len(vectors)
+    for i in range(0, n, TILE_SIZE):
+        left = vectors[i:i + TILE_SIZE] * inv[i:i + TILE_SIZE, None]
+        for j in range(i, n, TILE_SIZE):
+            right = vectors[j:j + TILE_SIZE] * inv[j:j + TILE_SIZE, None]
+            sims = left @ right.T
+            if i == j:
+                sims = np.triu(sims, k=1)
+            a, b = np.nonzero(sims >= threshold)
+            if len(a):
+                found_a.append(a + i)
+                found_b.append(b + j)
+                found_s.append(sims[a, b])
+    return _concat(found_a, found_b, found_s)
+
+
+def _approximate_pairs(vectors: np.ndarray, inv: np.ndarray, threshold: float):
+    """Pairs from an IVF self-join in a random projection, verified per tile.
+
+    The vectors are projected to ``PROJECTION_DIM`` dimensions and clustered
+    with FAISS k-means.  Each cluster's members are then compared, as one
+    BLAS product per chunk, with every vector that has the cluster among its
+    ``NPROBE`` nearest centroids.  The projection keeps cosine similarities
+    of near-identical vectors to within a few hundredths, so candidates are
+    taken with a margin below *threshold* and checked against the full
+    vectors as soon as each tile is compared.
+    """
+    n, dim = vectors.shape
+    rng = np.random.default_rng(0)
+    projection = rng.standard_normal((dim, PROJECTION_DIM), dtype=np.float32)
+    projected = np.empty((n, PROJECTION_DIM), dtype=np.float32)
+    for start in range(0, n, TILE_SIZE):
+        projected[start:start + TILE_SIZE] = vectors[start:start + TILE_SIZE] @ projection
+    faiss.normalize_L2(projected)
+
+    nlist = max(1, int(math.sqrt(n)))
+    nprobe = min(NPROBE, nlist)
+    kmeans = faiss.Kmeans(PROJECTION_DIM, nlist, niter=10, spherical=True, seed=0)
+    kmeans.train(projected[rng.choice(n, min(n, 40 * nlist), replace=False)])
+    _, probes = kmeans.index.search(projected, nprobe)
+
+    # Rows grouped by nearest centroid, and by every probed centroid.
+    members_order = np.argsort(probes[:, 0], kind="stable")
+    members_bounds = np.searchsorted(probes[members_order, 0], np.arange(nlist + 1))
+    probed = probes.ravel()
+    probes_order = np.argsort(probed, kind="stable")
+    probes_bounds = np.searchsorted(probed[probes_order], np.arange(nlist + 1))
+
+    margin = 0.02 + 3 * (1 - threshold * threshold) / math.sqrt(PROJECTION_DIM)
+    found_a, found_b, found_s = [], [], []
+    checked = 0
+    for cell in range(nlist):
+        members = members_order[members_bounds[cell]:members_bounds[cell + 1]]
+        if not len(members):
+            continue
+        member_vectors = projected[members]
+        queries = probes_order[probes_bounds[cell]:probes_bounds[cell + 1]] // nprobe
+        for start in range(0, len(queries), TILE_SIZE):
+            rows = queries[start:start + TILE_SIZE]
+            a, b = np.nonzero(projected[rows] @ member_vectors.T >= threshold - margin)
+            a, b = rows[a], members[b]
+            keep = a != b
+            a, b = np.minimum(a, b)[keep], np.maximum(a, b)[keep]
+            checked += len(a)
+            for verify in range(0, len(a), VERIFY_BATCH):
+                va, vb = a[verify:verify + VERIFY_BATCH], b[verify:verify + VERIFY_BATCH]
+                sims = np.einsum("ij,ij->i", vectors[va], vectors[vb]) * inv[va] * inv[vb]
+                keep = sims >= threshold
+                found_a.append(va[keep])
+                found_b.append(vb[keep])
+                found_s.append(sims[keep])
+    logger.debug("Verified %d candidate pairs", checked)
+    rows_a, rows_b, sims = _concat(found_a, found_b, found_s)
+    # A pair can be confirmed from both ends and from several probed cells.
+    _, first = np.unique(np.stack([rows_a, rows_b], axis=1), axis=0, return_index=True)
+    return rows_a[first], rows_b[first], sims[first]
+
+
+def _concat(a, b, s):
+    if not a:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float32)
+    return np.concatenate(a), np.concatenate(b), np.concatenate(s)
+
+
+def _clusters(n: int, rows_a, rows_b, sims) -> list[tuple[list[int], float]]:
+    """Union-find the linked rows into ``(sorted rows, best similarity)``."""
+    parent = list(range(n))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in zip(rows_a.tolist(), rows_b.tolist()):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+
+    members: dict[int, list[int]] = {}
+    best: dict[int, float] = {}
+    for a, b, s in zip(rows_a.tolist(), rows_b.tolist(), sims.tolist()):
+        root = find(a)
+        best[root] = max(best.get(root, -1.0), s)
+        members.setdefault(root, []).extend((a, b))
+    return [(sorted(set(rows)), best[root]) for root, rows in members.items()]
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+
+def find_duplicates(
+    vector_store,
+    threshold: float | None = None,
+    store_path: Path | None = None,
+    exact_limit: int | None = None,
+) -> list[DuplicateCluster]:
+    """Group near-duplicate documents of *vector_store*, largest groups first.
+
+    *threshold* is a cosine similarity (default ``DUPLICATE_THRESHOLD``).
+    When *store_path* holds the committed index, results are cached there
+    until the index generation changes.
+    """
+    threshold = config.DUPLICATE_THRESHOLD if threshold is None else threshold
+    if not MIN_THRESHOLD <= threshold <= 1:
+        raise ValueError(f"threshold must be in [{MIN_THRESHOLD}, 1], got {threshold}")
+    exact_limit = EXACT_JOIN_LIMIT if exact_limit is None else exact_limit
+    index = vector_store.index
+    generation = index_generation(store_path) if store_path is not None else None
+
+    cached = _load_cached(store_path, generation, threshold, vector_store)
+    if cached is not None:
+        return cached
+
+    vectors = stored_vectors(index)
+    inv = _inverse_norms(vectors)
+    join = _exact_pairs if index.ntotal <= exact_limit else _approximate_pairs
+    rows_a, rows_b, sims = join(vectors, inv, threshold)
+    clusters = [
+        DuplicateCluster(
+            ids=[vector_store.index_to_docstore_id[row] for row in rows],
+            similarity=round(float(similarity), 4),
+        )
+        for rows, similarity in _clusters(index.ntotal, rows_a, rows_b, sims)
+    ]
+    clusters.sort(key=lambda c: (-len(c.ids), -c.similarity))
+    logger.info(
+        "Found %d duplicate clusters among %d documents (threshold %.2f, %s join)",
+        len(clusters), index.ntotal, threshold,
+        "exact" if join is _exact_pairs else "approximate",
+    )
+
+    if generation is not None:
+        atomic_write_json(store_path / _DUPLICATES_FILE, {
+            "generation": generation,
+            "threshold": threshold,
+            "ntotal": index.ntotal,
+            "clusters": [asdict(c) for c in clusters],
+        }, ensure_ascii=False)
+    return clusters
+
+
+def _load_cached(
+    store_path: Path | None, generation: int | None, threshold: float, vector_store,
+) -> list[DuplicateCluster] | None:
+    if generation is None:
+        return None
+    path = store_path / _DUPLICATES_FILE
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (
+        data.get("generation") != generation
+        or data.get("threshold") != threshold
+        or data.get("ntotal") != vector_store.index.ntotal
+    ):
+        return None
+    clusters = [DuplicateCluster(**c) for c in data["clusters"]]
+    # The in-memory store may lag the index on disk (e.g. a stale snapshot).
+    known = set(vector_store.index_to_docstore_id.values())
+    if any(doc_id not in known for c in clusters for doc_id in c.ids):
+        return None
+    logger.debug("Using cached duplicate clusters for generation %d", generation)
+    return clusters
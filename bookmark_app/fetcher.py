@@ -0,0 +1,384 @@
+"""Bounded-concurrency page fetcher that enriches bookmarks before description.
+
+Pages are fetched with a pooled ``httpx.AsyncClient`` under a global and a
+per-host concurrency limit, a timeout and a download size cap.  Responses
+are streamed through an incremental decoder into :class:`PageText`, an
+``HTMLParser`` that keeps only the title, meta description and a bounded
+amount of main text, so whole pages are never held in memory.
+
+Extracted text is kept in an on-disk SQLite cache along with the ``ETag``
+and ``Last-Modified`` validators.  Recent entries are used without a
+request; older ones are revalidated with a conditional GET, and a
+``304 Not Modified`` reuses the cached text.
+"""
+
+import asyncio
+import codecs
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import httpx
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+PER_HOST_LIMIT = 2
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+MAX_TEXT_CHARS = 4000
+MIN_MAIN_CHARS = 200  # shorter <main>/<article> text falls back to the body
+REVALIDATE_AFTER = 7 * 24 * 3600  # seconds a cached page is used as is
+USER_AGENT = "Mozilla/5.0 (compatible; BookmarkAI/1.0; +https://github.com/pouriamrt/Bookmark_AI)"
+
+_HTML_TYPES = ("text/html", "application/xhtml+xml")
+_SKIP_TAGS = frozenset({
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+    "nav", "header", "footer", "aside", "form", "button", "select",
+})
+_MAIN_TAGS = frozenset({"main", "article"})
+_BREAK_TAGS = frozenset({
+    "p", "div", "br", "li", "tr", "section", "blockquote", "pre",
+    "h1", "h2", "h3", "h4", "h5", "h6", "dt", "dd",
+})
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class PageContent:
+    """What the description prompt needs from a fetched page."""
+
+    title: str
+    description: str
+    text: str
+
+
+# ---------------------------------------------------------------------------
+# Streaming HTML-to-text
+# ---------------------------------------------------------------------------
+
+
+class _TextBuffer:
+    """Append-only text with a character budget."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.parts: list[str] = []
+        self.size = 0
+
+    @property
+    def full(self) -> bool:
+        return self.size >= self.limit
+
+    def add(self, text: str) -> None:
+        if not self.full:
+            text = text[:self.limit - self.size]
+            self.parts.append(text)
+            self.size += len(text)
+
+    def value(self) -> str:
+        return _WHITESPACE.sub(" ", "".join(self.parts)).strip()
+
+
+class PageText(HTMLParser):
+    """Incremental HTML-to-text extractor with bounded memory.
+
+    Feed it chunks with :meth:`feed`; scripts, styles and page chrome
+    (navigation, headers, footers, forms) are skipped.  Text inside
+    ``<main>`` or ``<article>`` is preferred when there is enough of it.
+    Once :attr:`full` is true, reading more input cannot change the result.
+    """
+
+    def __init__(self, max_chars: int = MAX_TEXT_CHARS):
+        super().__init__(convert_charrefs=True)
+        self._title = _TextBuffer(300)
+        self._body = _TextBuffer(max_chars)
+        self._main = _TextBuffer(max_chars)
+        self.description = ""
+        self._in_title = False
+        self._skip = 0
+        self._in_main = 0
+        self._seen_main = False
+
+    @property
+    def full(self) -> bool:
+        return self._main.full or (self._body.full and not self._seen_main)
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in _MAIN_TAGS:
+            self._in_main += 1
+            self._seen_main = True
+        elif tag == "meta" and not self.description:
+            attrs = dict(attrs)
+            name = (attrs.get("name") or attrs.get("property") or "").lower()
+            if name in ("description", "og:description"):
+                self.description = _WHITESPACE.sub(" ", attrs.get("content") or "").strip()
+        if tag in _BREAK_TAGS:
+            self._add(" ")
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        # Self-closing tags never get an end tag, so must not open a section.
+        if tag == "meta" or tag in _BREAK_TAGS:
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in _SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag == "title":
+            self._in_title = False
+        elif tag in _MAIN_TAGS:
+            self._in_main = max(0, self._in_main - 1)
+        if tag in _BREAK_TAGS:
+            self._add(" ")
+
+    def handle_data(self, data: str) -> None:
+        if self._in_title:
+            self._title.add(data)
+        elif not self._skip:
+            self._add(data)
+
+    def _add(self, text: str) -> None:
+        self._body.add(text)
+        if self._in_main:
+            self._main.add(text)
+
+    def result(self) -> PageContent:
+        main = self._main.value()
+        return PageContent(
+            title=self._title.value(),
+            description=self.description,
+            text=main if len(main) >= MIN_MAIN_CHARS else self._body.value(),
+        )
+
+
+# ---------------------------------------------------------------------------
+# On-disk cache
+# ---------------------------------------------------------------------------
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    text TEXT NOT NULL,
+    checked REAL NOT NULL
+);
+"""
+
+
+class PageCache:
+    """Extracted page content and HTTP validators, keyed by URL (SQLite)."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def __enter__(self) -> "PageCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, url: str) -> tuple[PageContent, dict, float] | None:
+        """Return ``(content, validators, last checked)`` for *url*, or ``None``."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, title, description, text, checked "
+                "FROM pages WHERE url = ?", (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, title, description, text, checked = row
+        validators = {"etag": etag, "last_modified": last_modified}
+        return PageContent(title, description, text), validators, checked
+
+    def put(
+        self, url: str, content: PageContent,
+        etag: str | None = None, last_modified: str | None = None,
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, etag, last_modified, title, description, text, checked) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, content.title, content.description,
+                 content.text, time.time()),
+            )
+
+    def touch(self, url: str) -> None:
+        """Record that the cached copy of *url* was just revalidated."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET checked = ? WHERE url = ?", (time.time(), url),
+            )
+
+
+# ---------------------------------------------------------------------------
+# Fetcher
+# ---------------------------------------------------------------------------
+
+
+class PageFetcher:
+    """Fetch and extract pages concurrently; use as an async context manager.
+
+    At most *concurrency* requests run at once, and at most *per_host*
+    against any single host.  :meth:`fetch` never raises: failures, non-HTML
+    responses and non-HTTP URLs return the cached copy if there is one,
+    else ``None``.
+    """
+
+    def __init__(
+        self,
+        cache: PageCache | None = None,
+        concurrency: int | None = None,
+        per_host: int = PER_HOST_LIMIT,
+        timeout: float | None = None,
+        max_bytes: int = MAX_PAGE_BYTES,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.cache = cache
+        self.concurrency = concurrency or config.FETCH_CONCURRENCY
+        self.per_host = per_host
+        self.timeout = timeout or config.FETCH_TIMEOUT
+        self.max_bytes = max_bytes
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+        self.stats = {"fetched": 0, "not_modified": 0, "cached": 0, "failed": 0}
+
+    async def __aenter__(self) -> "PageFetcher":
+        self._client = httpx.AsyncClient(
+            transport=self._transport,
+            timeout=httpx.Timeout(self.timeout),
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+            ),
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT, "Accept": "text/html,*/*;q=0.5"},
+        )
+        self._slots = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._client.aclose()
+        logger.info(
+            "Page fetches: %(fetched)d fetched, %(not_modified)d not modified, "
+            "%(cached)d from cache, %(failed)d failed", self.stats,
+        )
+
+    async def fetch(self, url: str) -> PageContent | None:
+        """Return the extracted content of *url*, or ``None``."""
+        try:
+            parts = urlsplit(url)
+            host = (parts.hostname or "").lower()
+        except ValueError:  # such as an unbalanced IPv6 bracket
+            return None
+        if not host or parts.scheme not in ("http", "https"):
+            return None
+        cached = self.cache.get(url) if self.cache is not None else None
+        if cached is not None and time.time() - cached[2] < REVALIDATE_AFTER:
+            self.stats["cached"] += 1
+            return cached[0]
+
+        headers = {}
+        if cached is not None:
+            if cached[1]["etag"]:
+                headers["If-None-Match"] = cached[1]["etag"]
+            if cached[1]["last_modified"]:
+                headers["If-Modified-Since"] = cached[1]["last_modified"]
+
+        host_slots = self._hosts.setdefault(host, asyncio.Semaphore(self.per_host))
+        # Take the host slot first, so requests queued behind a busy host do
+        # not hold global slots that other hosts could use.
+        async with host_slots, self._slots:
+            try:
+                return await self._get(url, headers, cached)
+            except (httpx.HTTPError, httpx.InvalidURL, UnicodeError, ValueError) as exc:
+                logger.debug("Fetching %s failed: %s", url, exc)
+                self.stats["failed"] += 1
+                return cached[0] if cached is not None else None
+
+    async def _get(self, url: str, headers: dict, cached) -> PageContent | None:
+        async with self._client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and cached is not None:
+                self.stats["not_modified"] += 1
+                self.cache.touch(url)
+                return cached[0]
+            if response.status_code != 200:
+                raise httpx.HTTPStatusError(
+                    f"HTTP {response.status_code}", request=response.request, response=response,
+                )
+            content_type = response.headers.get("content-type", "text/html").lower()
+            if not content_type.startswith(_HTML_TYPES):
+                raise ValueError(f"not HTML ({content_type})")
+
+            try:
+                decoder = codecs.getincrementaldecoder(response.charset_encoding or "utf-8")(
+                    errors="replace",
+                )
+            except LookupError:
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            parser = PageText()
+            received = 0
+            async for chunk in response.aiter_bytes():
+                received += len(chunk)
+                parser.feed(decoder.decode(chunk))
+                if parser.full or received >= self.max_bytes:
+                    break
+            parser.feed(decoder.decode(b"", final=True))
+            parser.close()
+
+            content = parser.result()
+            self.stats["fetched"] += 1
+            if self.cache is not None:
+                self.cache.put(
+                    url, content,
+                    etag=response.headers.get("etag"),
+                    last_modified=response.headers.get("last-modified"),
+                )
+            return content
+
+
+@asynccontextmanager
+async def open_default_fetcher() -> AsyncIterator[PageFetcher | None]:
+    """Yield a :class:`PageFetcher` if ``FETCH_PAGES`` is on, else ``None``.
+
+    The fetcher uses the page cache at ``PAGE_CACHE_PATH`` unless that is
+    empty.
+    """
+    if not config.FETCH_PAGES:
+        yield None
+        return
+    cache = PageCache(config.PAGE_CACHE_PATH) if config.PAGE_CACHE_PATH else None
+    try:
+        async with PageFetcher(cache) as fetcher:
+            yield fetcher
+    finally:
+        if cache is not None:
+            cache.close()
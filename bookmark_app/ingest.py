@@ -0,0 +1,216 @@
+"""Pipelined ingest: descriptions stream into embedding and FAISS indexing.
+
+Three stages run concurrently, connected by bounded queues::
+
+    describe (LLM) --docs--> embed (micro-batches) --vectors--> index (FAISS)
+
+A full queue blocks the stage feeding it, so a slow embedder throttles the
+LLM workers instead of piling up documents in memory.  Total import time
+approaches that of the slowest stage rather than the sum of all three.
+"""
+
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import Callable
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_openai import ChatOpenAI
+
+from . import config
+from .bookmarks import bookmark_key, group_by_canonical_url
+from .descriptions import _generate_all
+from .fetcher import PageFetcher, open_default_fetcher
+from .llm_cache import LLMResponseCache, open_default_cache
+from .vectorstore import IndexUpdater, get_embeddings, group_to_document
+
+logger = logging.getLogger(__name__)
+
+EMBED_BATCH_SIZE = 64
+EMBED_BATCH_WAIT = 0.2  # seconds to wait for a partial batch to fill
+EMBED_CONCURRENCY = 2
+QUEUE_SIZE = 256
+
+# Persist the index (and bookmark cache) after this many new documents or
+# this many seconds, whichever comes first, so an interrupted import resumes.
+CHECKPOINT_EVERY = 1000
+CHECKPOINT_INTERVAL = 60.0
+# Between checkpoints, progress (the bookmark cache) is saved at most this
+# often.  Descriptions lost to a crash are still in the LLM response cache.
+PROGRESS_INTERVAL = 15.0
+
+_DONE = object()
+
+
+def _throttle(callback: Callable[[], None], interval: float) -> Callable[[], None]:
+    """Wrap *callback* so calls less than *interval* seconds apart are dropped.
+
+    The bookmark cache is written on the event loop: it cannot be serialized
+    in a thread while descriptions are still being added to it.
+    """
+    last = time.monotonic()
+
+    def throttled() -> None:
+        nonlocal last
+        if time.monotonic() - last >= interval:
+            callback()
+            last = time.monotonic()
+
+    return throttled
+
+
+async def _next_batch(queue: asyncio.Queue) -> tuple[list[Document], bool]:
+    """Collect up to ``EMBED_BATCH_SIZE`` documents from *queue*.
+
+    Waits for the first document, then at most ``EMBED_BATCH_WAIT`` seconds
+    for the batch to fill.  Returns the batch and whether the end-of-stream
+    marker was seen.
+    """
+    first = await queue.get()
+    if first is _DONE:
+        return [], True
+    batch = [first]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + EMBED_BATCH_WAIT
+    while len(batch) < EMBED_BATCH_SIZE:
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            break
+        try:
+            item = await asyncio.wait_for(queue.get(), timeout)
+        except asyncio.TimeoutError:
+            break
+        if item is _DONE:
+            return batch, True
+        batch.append(item)
+    return batch, False
+
+
+async def _embed_worker(
+    docs: asyncio.Queue, embedded: asyncio.Queue, embeddings: Embeddings,
+) -> None:
+    """Embed micro-batches from *docs* and pass them on to *embedded*."""
+    while True:
+        batch, done = await _next_batch(docs)
+        if batch:
+            vectors = await embeddings.aembed_documents([d.page_content for d in batch])
+            await embedded.put((batch, vectors))
+        if done:
+            return
+
+
+async def _index_worker(
+    embedded: asyncio.Queue,
+    updater: IndexUpdater,
+    on_checkpoint: Callable[[], None] | None = None,
+    lock: asyncio.Lock | None = None,
+) -> None:
+    """Add embedded batches to the FAISS index, checkpointing periodically.
+
+    *on_checkpoint* runs just before each index checkpoint so the caller can
+    persist the descriptions that went into it.  Checkpoints are written in
+    a worker thread while holding *lock*, which every other task changing
+    *updater* must also hold.
+    """
+    loop = asyncio.get_running_loop()
+    lock = lock or asyncio.Lock()
+    last_count, last_time = updater.embedded, loop.time()
+    while (item := await embedded.get()) is not _DONE:
+        updater.add(*item)
+        if (
+            updater.embedded - last_count >= CHECKPOINT_EVERY
+            or loop.time() - last_time >= CHECKPOINT_INTERVAL
+        ):
+            if on_checkpoint is not None:
+                on_checkpoint()
+            async with lock:
+                await asyncio.to_thread(updater.checkpoint)
+            last_count, last_time = updater.embedded, loop.time()
+
+
+async def ingest(
+    bookmarks: list[dict],
+    llm: ChatOpenAI,
+    updater: IndexUpdater,
+    on_progress: Callable[[], None] | None = None,
+    cache: LLMResponseCache | None = None,
+    fetcher: PageFetcher | None = None,
+) -> None:
+    """Describe, embed and index *bookmarks* as one pipeline.
+
+    With a *fetcher*, pages are fetched ahead of the LLM as an extra stage.
+    Descriptions are written into *bookmarks* in place.  The index held by
+    *updater* is checkpointed periodically (after calling *on_progress*) but
+    the final save is left to the caller.  Between checkpoints *on_progress*
+    runs at most every ``PROGRESS_INTERVAL`` seconds.
+    """
+    groups = group_by_canonical_url(bookmarks)
+    updater.remove_stale({bookmark_key(bookmarks[g[0]]) for g in groups.values()})
+
+    docs: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+    embedded: asyncio.Queue = asyncio.Queue(EMBED_CONCURRENCY * 2)
+    # needs_embedding may patch the docstore; not while a checkpoint writes it.
+    index_lock = asyncio.Lock()
+
+    async def on_described(indices: list[int]) -> None:
+        doc = group_to_document(bookmarks, indices)
+        async with index_lock:
+            needed = updater.needs_embedding(doc)
+        if needed:
+            await docs.put(doc)
+
+    progress = _throttle(on_progress, PROGRESS_INTERVAL) if on_progress else None
+
+    async def describe() -> None:
+        await _generate_all(bookmarks, llm, progress, cache, on_described, fetcher)
+        for _ in range(EMBED_CONCURRENCY):
+            await docs.put(_DONE)
+
+    async def embed() -> None:
+        await asyncio.gather(*(
+            _embed_worker(docs, embedded, updater.embeddings)
+            for _ in range(EMBED_CONCURRENCY)
+        ))
+        await embedded.put(_DONE)
+
+    await asyncio.gather(
+        describe(), embed(), _index_worker(embedded, updater, on_progress, index_lock),
+    )
+
+
+def ingest_bookmarks_sync(
+    bookmarks: list[dict],
+    on_progress: Callable[[], None] | None = None,
+    store_dir: str | None = None,
+    llm: ChatOpenAI | None = None,
+    embeddings: Embeddings | None = None,
+) -> FAISS:
+    """Synchronous wrapper -- run the ingest pipeline and save the index.
+
+    Missing descriptions are generated (through the persistent response
+    cache) and new or changed documents embedded and indexed as they become
+    available.  *on_progress* is called every ``PROGRESS_INTERVAL`` seconds
+    at most and before each checkpoint, so the caller can persist
+    intermediate results.  Pages are fetched first when
+    ``FETCH_PAGES`` is on.
+    """
+    if llm is None:
+        llm = ChatOpenAI(model=config.LLM_MODEL)
+    updater = IndexUpdater(
+        Path(store_dir or config.VECTOR_STORE_DIR), embeddings or get_embeddings(),
+    )
+    cache = open_default_cache()
+
+    async def run() -> None:
+        async with open_default_fetcher() as fetcher:
+            await ingest(bookmarks, llm, updater, on_progress, cache, fetcher)
+
+    try:
+        asyncio.run(run())
+    finally:
+        if cache is not None:
+            cache.close()
+    return updater.save()
@@ -0,0 +1,166 @@
+"""Persistent, content-addressed cache of LLM responses (SQLite)."""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from . import config
+from .storage import atomic_open
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+class LLMResponseCache:
+    """Map ``(model, template version, rendered prompt)`` to a response.
+
+    Entries are evicted least-recently-used once more than *max_entries*
+    are stored.  The cache is safe to share between threads.
+    """
+
+    def __init__(self, path: str | Path, max_entries: int | None = None):
+        self.path = Path(path)
+        self.max_entries = max_entries or config.LLM_CACHE_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        self._last_used = 0.0
+
+    @staticmethod
+    def make_key(model: str, template_version: int | str, prompt: str) -> str:
+        """Return the content address for a rendered prompt."""
+        digest = hashlib.sha256()
+        for part in (model, str(template_version), prompt):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _now(self) -> float:
+        """Strictly increasing timestamp, so LRU order survives coarse clocks."""
+        self._last_used = max(time.time(), self._last_used + 1e-6)
+        return self._last_used
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self) -> "LLMResponseCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, key: str) -> str | None:
+        """Return the cached response for *key*, or ``None``."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?",
+                (self._now(), key),
+            )
+        return row[0]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        """Store *response* under *key*, evicting old entries if needed."""
+        with self._lock:
+            exists = self._conn.execute(
+                "SELECT 1 FROM responses WHERE key = ?", (key,),
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, model, response, self._now()),
+            )
+            if not exists:
+                self._count += 1
+                self._evict()
+
+    def _evict(self) -> None:
+        excess = self._count - self.max_entries
+        if excess <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._count -= excess
+        logger.debug("Evicted %d cached LLM responses", excess)
+
+    def export_entries(self, path: str | Path) -> int:
+        """Write all entries to *path* as JSON lines; return the count."""
+        count = 0
+        with self._lock, atomic_open(path, "w") as f:
+            rows = self._conn.execute(
+                "SELECT key, model, response FROM responses ORDER BY last_used"
+            )
+            for key, model, response in rows:
+                f.write(json.dumps(
+                    {"key": key, "model": model, "response": response},
+                    ensure_ascii=False,
+                ) + "\n")
+                count += 1
+        logger.info("Exported %d cached LLM responses to %s", count, path)
+        return count
+
+    def import_entries(self, path: str | Path) -> int:
+        """Load entries exported by :meth:`export_entries`; return the count added.
+
+        Existing entries are kept; imported ones count as freshly used.  The
+        import is all or nothing: a malformed line rolls it back and raises.
+        """
+        added = 0
+        now = self._now()
+        with self._lock, Path(path).open("r", encoding="utf-8") as f:
+            self._conn.execute("BEGIN")
+            try:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO responses (key, model, response, last_used) "
+                        "VALUES (?, ?, ?, ?)",
+                        (entry["key"], entry["model"], entry["response"], now),
+                    )
+                    added += cursor.rowcount
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self._count += added
+            self._evict()
+        logger.info("Imported %d cached LLM responses from %s", added, path)
+        return added
+
+
+def open_default_cache() -> LLMResponseCache | None:
+    """Open the cache at ``LLM_CACHE_PATH``, or ``None`` if it is disabled."""
+    if not config.LLM_CACHE_PATH:
+        return None
+    return LLMResponseCache(config.LLM_CACHE_PATH)
@@ -7,27 +7,37 @@ import logging
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
 
-from langchain_community.vectorstores import FAISS
 from mcp.server.fastmcp import Context, FastMCP
 
 from . import config
-from .bookmarks import (
-    load_cache,
-    load_chrome_bookmarks,
-    merge_bookmarks,
-    save_cache,
-)
-from .descriptions import generate_all_descriptions_sync
-from .vectorstore import (
-    bookmarks_to_documents,
-    load_or_create_vectorstore,
-)
+from .bookmarks import group_by_canonical_url
+from .tracing import traced
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+    from .topics import TopicModel
 
 logger = logging.getLogger(__name__)
 
 MAX_LIST_LIMIT = 100
 
+# Set by ``use_snapshot`` (``run_mcp.py --snapshot``) before the server starts.
+_snapshot_mode: dict[str, str | None] = {}
+
+
+def use_snapshot(path: str | None = None) -> None:
+    """Start from the prebuilt snapshot at *path* (default ``SNAPSHOT_PATH``)."""
+    _snapshot_mode["path"] = path
+
+
+# Builds share the index directory: each checkpoint deletes index files that
+# are not in its own manifest, so two concurrent builds would corrupt it.
+_build_lock = asyncio.Lock()
+
 
 @dataclass
 class AppContext:
@@ -36,14 +46,52 @@ class AppContext:
     bookmarks: list[dict] = field(default_factory=list)
     vector_store: FAISS | None = None
     folders: list[str] = field(default_factory=list)
+    stats: dict = field(default_factory=dict)
+    topics: TopicModel | None = None
+
+    def replace_with(self, other: AppContext) -> None:
+        """Swap in freshly built state (e.g. after a refresh)."""
+        self.bookmarks = other.bookmarks
+        self.vector_store = other.vector_store
+        self.folders = other.folders
+        self.stats = other.stats
+        self.topics = other.topics
+
+
+def _compute_stats(bookmarks: list[dict]) -> dict:
+    """Aggregate the numbers reported by get_bookmark_stats."""
+    folders: dict[str, int] = {}
+    for bm in bookmarks:
+        f = bm.get("folder", "(no folder)")
+        folders[f] = folders.get(f, 0) + 1
+    top_folders = sorted(folders.items(), key=lambda x: x[1], reverse=True)[
+        :10
+    ]
+    return {
+        "total": len(bookmarks),
+        "with_descriptions": sum(1 for bm in bookmarks if bm.get("description")),
+        "unique_folders": len(folders),
+        "unique_pages": len(group_by_canonical_url(bookmarks)),
+        "top_folders": top_folders,
+    }
 
 
-def _build_app_state() -> tuple[list[dict], FAISS, list[str]]:
+def _build_app_state() -> AppContext:
     """Load bookmarks, generate descriptions, build vector store.
 
     Extracted so both the lifespan and refresh_bookmarks share one pipeline.
-    Saves cache incrementally every 10 descriptions via the on_progress callback.
+    Descriptions stream straight into embedding and indexing; the cache is
+    saved periodically via the on_progress callback.  Topic clusters
+    are then updated, and the result is written to the snapshot file for
+    fast ``--snapshot`` starts unless it already holds this index generation.
     """
+    # Imported here so snapshot starts never load LangChain's OpenAI stack.
+    from .bookmarks import load_cache, load_chrome_bookmarks, merge_bookmarks, save_cache
+    from .ingest import ingest_bookmarks_sync
+    from .snapshot import snapshot_is_current, write_snapshot
+    from .storage import index_generation
+    from .topics import refresh_topics
+
     fresh = load_chrome_bookmarks()
     cached = load_cache(config.BOOKMARKS_CACHE_PATH)
     bookmarks = merge_bookmarks(fresh, cached)
@@ -51,23 +99,110 @@ def _build_app_state() -> tuple[list[dict], FAISS, list[str]]:
     def _save_progress():
         save_cache(bookmarks, config.BOOKMARKS_CACHE_PATH)
 
-    bookmarks = generate_all_descriptions_sync(
-        bookmarks, on_progress=_save_progress,
-    )
-    save_cache(bookmarks, config.BOOKMARKS_CACHE_PATH)
-
-    documents = bookmarks_to_documents(bookmarks)
-    vector_store = load_or_create_vectorstore(documents)
+    try:
+        vector_store = ingest_bookmarks_sync(bookmarks, on_progress=_save_progress)
+    finally:
+        save_cache(bookmarks, config.BOOKMARKS_CACHE_PATH)
 
     folders = sorted(
         {bm.get("folder", "") for bm in bookmarks if bm.get("folder")}
     )
-    return bookmarks, vector_store, folders
+    state = AppContext(
+        bookmarks=bookmarks,
+        vector_store=vector_store,
+        folders=folders,
+        stats=_compute_stats(bookmarks),
+        topics=refresh_topics(vector_store, Path(config.VECTOR_STORE_DIR)),
+    )
+    generation = index_generation(Path(config.VECTOR_STORE_DIR))
+    chrome_path = config.get_bookmarks_path()
+    if config.SNAPSHOT_PATH and not snapshot_is_current(
+        config.SNAPSHOT_PATH, generation, chrome_path,
+    ):
+        write_snapshot(
+            config.SNAPSHOT_PATH, bookmarks, folders, state.stats, vector_store,
+            chrome_path, generation=generation,
+        )
+    return state
+
+
+async def _rebuild_app_state(current: AppContext | None = None) -> AppContext:
+    """Run :func:`_build_app_state` in a thread, one build at a time.
+
+    If *current* is served from a snapshot, its store is detached from the
+    snapshot file first, since the build may rewrite that file.
+    """
+    from .snapshot import SnapshotStore
+
+    async with _build_lock:
+        if current is not None and isinstance(current.vector_store, SnapshotStore):
+            await asyncio.to_thread(current.vector_store.detach)
+        # asyncio.to_thread avoids "asyncio.run() inside running loop" crash
+        return await asyncio.to_thread(_build_app_state)
+
+
+def _load_snapshot_state(path: str):
+    """Return ``(AppContext, Snapshot)`` from *path*, or ``None`` if unusable.
+
+    Topics come from the model saved next to the index, aligned with the
+    snapshot's documents unless both come from the same index generation;
+    they are rebuilt by the next refresh if missing.
+    """
+    from .snapshot import read_snapshot
+    from .topics import load_topics, update_topics
+
+    if not Path(path).exists():
+        logger.warning("Snapshot %s not found; building state from scratch", path)
+        return None
+    try:
+        snapshot = read_snapshot(path)
+    except (OSError, ValueError):
+        logger.warning("Could not read snapshot %s", path, exc_info=True)
+        return None
+    if snapshot.embedding_model != config.EMBEDDING_MODEL:
+        logger.warning(
+            "Snapshot was built with %s, not %s; rebuilding",
+            snapshot.embedding_model, config.EMBEDDING_MODEL,
+        )
+        return None
+    state = AppContext(
+        bookmarks=snapshot.bookmarks,
+        vector_store=snapshot.vector_store,
+        folders=snapshot.folders,
+        stats=snapshot.stats,
+        topics=load_topics(Path(config.VECTOR_STORE_DIR)),
+    )
+    if state.topics is not None and (
+        snapshot.generation is None or state.topics.generation != snapshot.generation
+    ):
+        update_topics(state.topics, state.vector_store)
+    return state, snapshot
+
+
+async def _refresh_if_stale(app: AppContext, snapshot) -> None:
+    """Rebuild in the background if Chrome's bookmarks changed since *snapshot*."""
+    from .snapshot import chrome_fingerprint
+
+    try:
+        if chrome_fingerprint(config.get_bookmarks_path()) == snapshot.chrome:
+            logger.info("Snapshot is up to date with Chrome bookmarks")
+        else:
+            logger.info("Chrome bookmarks changed since snapshot; refreshing")
+            app.replace_with(await _rebuild_app_state(app))
+            logger.info("Background refresh complete: %d bookmarks", len(app.bookmarks))
+        # Load the embedding client off the request path before the first search
+        await asyncio.to_thread(lambda: app.vector_store.embedding_function)
+    except Exception:
+        logger.exception("Background snapshot refresh failed")
 
 
 @asynccontextmanager
 async def app_lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
-    """Initialize bookmarks and vector store once at startup."""
+    """Initialize bookmarks and vector store once at startup.
+
+    In snapshot mode the state is loaded from the snapshot file and checked
+    for freshness against Chrome in the background.
+    """
     config.load_env()
     config.setup_logging()
     logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -76,28 +211,39 @@ async def app_lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
 
     config.validate_config()
 
-    # asyncio.to_thread avoids "asyncio.run() inside running loop" crash
-    bookmarks, vector_store, folders = await asyncio.to_thread(
-        _build_app_state,
-    )
+    loaded = None
+    if "path" in _snapshot_mode:
+        loaded = _load_snapshot_state(_snapshot_mode["path"] or config.SNAPSHOT_PATH)
+
+    refresh_task = None
+    if loaded is not None:
+        app, snapshot = loaded
+        refresh_task = asyncio.create_task(_refresh_if_stale(app, snapshot))
+    else:
+        app = await _rebuild_app_state()
 
     logger.info(
         "MCP server ready: %d bookmarks, %d folders",
-        len(bookmarks),
-        len(folders),
+        len(app.bookmarks),
+        len(app.folders),
     )
 
-    yield AppContext(
-        bookmarks=bookmarks, vector_store=vector_store, folders=folders,
-    )
+    try:
+        yield app
+    finally:
+        if refresh_task is not None:
+            refresh_task.cancel()
 
 
 mcp = FastMCP(
     "Bookmark AI",
     instructions=(
         "Search and explore the user's Chrome bookmarks using semantic search. "
-        "Use search_bookmarks to find relevant bookmarks by meaning, "
+        "Use search_bookmarks to find relevant bookmarks by meaning "
+        "(optionally limited to a folder, domain or date range), "
         "list_bookmarks to browse by folder or keyword, "
+        "the bookmarks://topics resource and list_topic to browse by topic, "
+        "find_duplicate_bookmarks to spot near-identical pages, "
         "and get_bookmark_stats for a high-level summary."
     ),
     lifespan=app_lifespan,
@@ -107,16 +253,40 @@ mcp = FastMCP(
 # -- Pure logic (testable without MCP runtime) ---------------------------
 
 
-def _search_bookmarks_logic(app: AppContext, query: str, k: int = 10) -> str:
-    """Search bookmarks by semantic similarity (pure logic)."""
+def _search_bookmarks_logic(
+    app: AppContext,
+    query: str,
+    k: int = 10,
+    folder: str = "",
+    domain: str = "",
+    added_after: str = "",
+    added_before: str = "",
+    diverse: bool = False,
+) -> str:
+    """Search bookmarks by semantic similarity (pure logic).
+
+    The filters restrict the candidate set before the vector search;
+    *diverse* reranks the nearest candidates with maximal marginal relevance.
+    """
+    from .search import SearchFilters, diverse_search, filtered_search
+
     k = max(1, min(30, k))
-    docs = app.vector_store.similarity_search(query, k=k)
+    filters = SearchFilters(folder, domain, added_after, added_before)
+    search = diverse_search if diverse else filtered_search
+    try:
+        docs = search(app.vector_store, query, k, filters)
+    except ValueError as exc:
+        return f"Invalid filter: {exc}"
     if not docs:
+        if filters:
+            return "No bookmarks found matching your query and filters."
         return "No bookmarks found matching your query."
     lines = []
     for i, doc in enumerate(docs, 1):
         url = doc.metadata.get("source", "")
-        folder = doc.metadata.get("folder", "")
+        folder = ", ".join(
+            doc.metadata.get("folders") or [doc.metadata.get("folder", "")]
+        )
         name = doc.page_content.split("\n")[0]
         description = "\n".join(doc.page_content.split("\n")[2:]).strip()
         lines.append(
@@ -159,27 +329,85 @@ def _list_bookmarks_logic(
     return "\n\n".join(lines)
 
 
+def _find_duplicate_bookmarks_logic(
+    app: AppContext, threshold: float | None = None, limit: int = 20,
+) -> str:
+    """Cluster near-duplicate bookmarks by embedding similarity (pure logic)."""
+    from .duplicates import find_duplicates
+
+    limit = max(1, min(MAX_LIST_LIMIT, limit))
+    try:
+        clusters = find_duplicates(
+            app.vector_store, threshold, Path(config.VECTOR_STORE_DIR),
+        )
+    except ValueError as exc:
+        return f"Invalid threshold: {exc}"
+    if not clusters:
+        return "No near-duplicate bookmarks found."
+    lines = [
+        f"{len(clusters)} groups of near-duplicate bookmarks"
+        + (f" (showing {limit})" if len(clusters) > limit else "") + ":",
+    ]
+    for i, cluster in enumerate(clusters[:limit], 1):
+        lines.append(f"\n{i}. {len(cluster.ids)} bookmarks, similarity {cluster.similarity:.3f}")
+        for doc_id in cluster.ids:
+            doc = app.vector_store.docstore.search(doc_id)
+            name = doc.page_content.split("\n")[0]
+            folder = ", ".join(doc.metadata.get("folders") or [doc.metadata.get("folder", "")])
+            lines.append(f"   - [{name}]({doc.metadata.get('source', '')}) in {folder}")
+    return "\n".join(lines)
+
+
+def _list_topics_logic(app: AppContext) -> str:
+    """List topic clusters with their sizes (pure logic)."""
+    if app.topics is None or not app.topics.topics:
+        return "No topics available yet."
+    return "\n".join(
+        f"{t.id}. {t.label} ({t.size} bookmarks)"
+        for t in sorted(app.topics.topics, key=lambda t: -t.size)
+    )
+
+
+def _list_topic_logic(app: AppContext, topic: int, limit: int = 20) -> str:
+    """List the bookmarks of one topic, most central first (pure logic)."""
+    if app.topics is None:
+        return "No topics available yet."
+    if not 0 <= topic < len(app.topics.topics):
+        return (
+            f"Unknown topic {topic}; see the bookmarks://topics resource "
+            f"(0-{len(app.topics.topics) - 1})."
+        )
+    limit = max(1, min(MAX_LIST_LIMIT, limit))
+    members = app.topics.members(topic)
+    lines = [
+        f"Topic {topic}: {app.topics.topics[topic].label} "
+        f"({len(members)} bookmarks, showing {min(limit, len(members))})",
+    ]
+    for i, doc_id in enumerate(members[:limit], 1):
+        doc = app.vector_store.docstore.search(doc_id)
+        name = doc.page_content.split("\n")[0]
+        description = "\n".join(doc.page_content.split("\n")[2:]).strip()
+        lines.append(f"\n{i}. [{name}]({doc.metadata.get('source', '')})\n   {description}")
+    return "\n".join(lines)
+
+
 def _get_bookmark_stats_logic(app: AppContext) -> str:
     """Get summary statistics (pure logic)."""
-    bookmarks = app.bookmarks
-    total = len(bookmarks)
-    with_desc = sum(1 for bm in bookmarks if bm.get("description"))
-    folders: dict[str, int] = {}
-    for bm in bookmarks:
-        f = bm.get("folder", "(no folder)")
-        folders[f] = folders.get(f, 0) + 1
-    top_folders = sorted(folders.items(), key=lambda x: x[1], reverse=True)[
-        :10
-    ]
+    stats = app.stats or _compute_stats(app.bookmarks)
+    total = stats["total"]
+    with_desc = stats["with_descriptions"]
+    unique_pages = stats["unique_pages"]
     lines = [
         f"Total bookmarks: {total}",
         f"With descriptions: {with_desc}/{total}"
         f" ({100 * with_desc // max(total, 1)}%)",
-        f"Unique folders: {len(folders)}",
+        f"Unique folders: {stats['unique_folders']}",
+        f"Unique pages: {unique_pages}"
+        f" ({total - unique_pages} duplicates share a description and embedding)",
         "",
         "Top folders:",
     ]
-    for f, count in top_folders:
+    for f, count in stats["top_folders"]:
         lines.append(f"  - {f}: {count} bookmarks")
     return "\n".join(lines)
 
@@ -188,18 +416,36 @@ def _get_bookmark_stats_logic(app: AppContext) -> str:
 
 
 @mcp.tool()
-def search_bookmarks(query: str, k: int = 10, ctx: Context = None) -> str:
-    """Search bookmarks by semantic similarity.
+@traced("search_bookmarks")
+def search_bookmarks(
+    query: str,
+    k: int = 10,
+    folder: str = "",
+    domain: str = "",
+    added_after: str = "",
+    added_before: str = "",
+    diverse: bool = False,
+    ctx: Context = None,
+) -> str:
+    """Search bookmarks by semantic similarity, optionally within filters.
 
     Args:
         query: Natural language search query (e.g. "machine learning tutorials")
         k: Number of results to return (1-30, default 10)
+        folder: Only search this folder and its subfolders (e.g. "/Dev")
+        domain: Only search this site and its subdomains (e.g. "github.com")
+        added_after: Only bookmarks added on or after this date (YYYY-MM-DD)
+        added_before: Only bookmarks added before this date (YYYY-MM-DD)
+        diverse: Prefer varied results over near-identical pages from one site
     """
     app: AppContext = ctx.request_context.lifespan_context
-    return _search_bookmarks_logic(app, query, k)
+    return _search_bookmarks_logic(
+        app, query, k, folder, domain, added_after, added_before, diverse,
+    )
 
 
 @mcp.tool()
+@traced("list_bookmarks")
 def list_bookmarks(
     folder: str = "",
     keyword: str = "",
@@ -218,6 +464,7 @@ def list_bookmarks(
 
 
 @mcp.tool()
+@traced("get_bookmark_stats")
 def get_bookmark_stats(ctx: Context = None) -> str:
     """Get summary statistics about the bookmark collection.
 
@@ -228,6 +475,40 @@ def get_bookmark_stats(ctx: Context = None) -> str:
 
 
 @mcp.tool()
+@traced("list_topic")
+def list_topic(topic: int, limit: int = 20, ctx: Context = None) -> str:
+    """List the bookmarks in one topic cluster, most representative first.
+
+    Topics are precomputed; see the bookmarks://topics resource for ids.
+
+    Args:
+        topic: Topic id from bookmarks://topics
+        limit: Maximum number of results (1-100, default 20)
+    """
+    app: AppContext = ctx.request_context.lifespan_context
+    return _list_topic_logic(app, topic, limit)
+
+
+@mcp.tool()
+@traced("find_duplicate_bookmarks")
+async def find_duplicate_bookmarks(
+    threshold: float | None = None, limit: int = 20, ctx: Context = None,
+) -> str:
+    """Find groups of near-duplicate bookmarks (mirrors, moved or versioned pages).
+
+    Compares the stored embeddings of every bookmark; no search query is
+    needed.  Results are cached until the index changes.
+
+    Args:
+        threshold: Cosine similarity at which two bookmarks count as duplicates (0.8-1, default 0.95)
+        limit: Maximum number of groups to list (1-100, default 20)
+    """
+    app: AppContext = ctx.request_context.lifespan_context
+    return await asyncio.to_thread(_find_duplicate_bookmarks_logic, app, threshold, limit)
+
+
+@mcp.tool()
+@traced("refresh_bookmarks")
 async def refresh_bookmarks(ctx: Context = None) -> str:
     """Re-extract bookmarks from Chrome and update the vector store.
 
@@ -235,23 +516,23 @@ async def refresh_bookmarks(ctx: Context = None) -> str:
     """
     app: AppContext = ctx.request_context.lifespan_context
 
-    # Run in thread to avoid asyncio.run() crash inside running loop
-    bookmarks, vector_store, folders = await asyncio.to_thread(
-        _build_app_state,
-    )
+    # Waits for a background refresh that is already running
+    fresh = await _rebuild_app_state(app)
 
     # Update shared state
-    app.bookmarks = bookmarks
-    app.vector_store = vector_store
-    app.folders = folders
+    app.replace_with(fresh)
 
-    return f"Refreshed: {len(bookmarks)} bookmarks across {len(folders)} folders."
+    return (
+        f"Refreshed: {len(app.bookmarks)} bookmarks across "
+        f"{len(app.folders)} folders."
+    )
 
 
 # -- MCP Resources ---------------------------------------------------------
 
 
 @mcp.resource("bookmarks://folders")
+@traced("bookmarks://folders")
 def list_folders(ctx: Context = None) -> str:
     """List all bookmark folder paths."""
     app: AppContext = ctx.request_context.lifespan_context
@@ -260,6 +541,14 @@ def list_folders(ctx: Context = None) -> str:
     return "\n".join(app.folders)
 
 
+@mcp.resource("bookmarks://topics")
+@traced("bookmarks://topics")
+def list_topics(ctx: Context = None) -> str:
+    """List topic clusters (id, label, size), largest first."""
+    app: AppContext = ctx.request_context.lifespan_context
+    return _list_topics_logic(app)
+
+
 # -- MCP Prompts -----------------------------------------------------------
 
 
@@ -0,0 +1,303 @@
+"""Metadata-prefiltered and diversity-reranked search over the bookmark index."""
+
+import logging
+import weakref
+from dataclasses import dataclass
+from datetime import date
+from urllib.parse import urlsplit
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+
+from . import config
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+_MISSING_DAY = np.iinfo(np.int64).max
+
+
+@dataclass
+class SearchFilters:
+    """Optional restrictions applied before the vector search.
+
+    *folder* selects a folder subtree (``/Tools`` matches ``/Tools/Dev``),
+    *domain* a host and its subdomains (``github.com`` matches
+    ``gist.github.com``).  *added_after* is inclusive and *added_before*
+    exclusive; both are ``YYYY-MM-DD`` dates.
+    """
+
+    folder: str = ""
+    domain: str = ""
+    added_after: str = ""
+    added_before: str = ""
+
+    def __bool__(self) -> bool:
+        return bool(self.folder or self.domain or self.added_after or self.added_before)
+
+
+def _normalize_folder(folder: str) -> str:
+    folder = folder.strip().rstrip("/").lower()
+    if folder and not folder.startswith("/"):
+        folder = "/" + folder
+    return folder
+
+
+def _normalize_domain(domain: str) -> str:
+    domain = domain.strip().lower()
+    if "://" in domain:
+        domain = urlsplit(domain).hostname or ""
+    domain = domain.rstrip(".")
+    return domain[4:] if domain.startswith("www.") else domain
+
+
+def _folder_prefixes(folder: str) -> list[str]:
+    """``/a/b/c`` -> ``['/a', '/a/b', '/a/b/c']`` (lower-cased)."""
+    parts = [p for p in folder.lower().split("/") if p]
+    return ["/" + "/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+def _domain_suffixes(url: str) -> list[str]:
+    """``https://gist.github.com/x`` -> ``['gist.github.com', 'github.com']``."""
+    host = _normalize_domain(urlsplit(url).hostname or "")
+    labels = host.split(".")
+    if len(labels) < 2:
+        return [host] if host else []
+    return [".".join(labels[i:]) for i in range(len(labels) - 1)]
+
+
+def _parse_day(value: str, name: str) -> int:
+    try:
+        return (date.fromisoformat(value.strip()) - date(1970, 1, 1)).days
+    except ValueError:
+        raise ValueError(f"{name} must be a YYYY-MM-DD date, got {value!r}") from None
+
+
+class FilterIndex:
+    """Precomputed id arrays for prefiltering the FAISS index.
+
+    Built once per vector store: every folder prefix and domain suffix maps
+    to a sorted array of FAISS row ids, and rows are kept sorted by the day
+    they were added so a date range is two binary searches.
+    """
+
+    def __init__(self, vector_store):
+        self.ntotal = vector_store.index.ntotal
+        folders: dict[str, list[int]] = {}
+        domains: dict[str, list[int]] = {}
+        days = np.full(self.ntotal, _MISSING_DAY, dtype=np.int64)
+
+        for row in range(self.ntotal):
+            doc = vector_store.docstore.search(vector_store.index_to_docstore_id[row])
+            if not isinstance(doc, Document):
+                continue
+            meta = doc.metadata
+            prefixes = {
+                prefix
+                for folder in meta.get("folders") or [meta.get("folder", "")]
+                for prefix in _folder_prefixes(folder)
+            }
+            for prefix in prefixes:
+                folders.setdefault(prefix, []).append(row)
+            for suffix in _domain_suffixes(meta.get("source", "")):
+                domains.setdefault(suffix, []).append(row)
+            if meta.get("added"):
+                days[row] = _parse_day(meta["added"], "added")
+
+        self.folders = {k: np.asarray(v, dtype=np.int64) for k, v in folders.items()}
+        self.domains = {k: np.asarray(v, dtype=np.int64) for k, v in domains.items()}
+        self._by_day = np.argsort(days, kind="stable")
+        self._sorted_days = days[self._by_day]
+
+    def select(self, filters: SearchFilters) -> np.ndarray:
+        """Return the sorted row ids matching every filter in *filters*."""
+        empty = np.empty(0, dtype=np.int64)
+        selected: np.ndarray | None = None
+
+        def narrow(ids: np.ndarray) -> None:
+            nonlocal selected
+            selected = ids if selected is None else np.intersect1d(
+                selected, ids, assume_unique=True,
+            )
+
+        if filters.folder:
+            narrow(self.folders.get(_normalize_folder(filters.folder), empty))
+        if filters.domain:
+            narrow(self.domains.get(_normalize_domain(filters.domain), empty))
+        if filters.added_after or filters.added_before:
+            lo = (
+                np.searchsorted(self._sorted_days, _parse_day(filters.added_after, "added_after"))
+                if filters.added_after else 0
+            )
+            hi = np.searchsorted(
+                self._sorted_days,
+                _parse_day(filters.added_before, "added_before")
+                if filters.added_before else _MISSING_DAY,
+            )
+            narrow(np.sort(self._by_day[lo:hi]))
+        return selected if selected is not None else np.arange(self.ntotal, dtype=np.int64)
+
+
+_filter_indexes: "weakref.WeakKeyDictionary[object, FilterIndex]" = weakref.WeakKeyDictionary()
+
+
+def get_filter_index(vector_store) -> FilterIndex:
+    """Return the (cached) :class:`FilterIndex` for *vector_store*.
+
+    The cache is dropped by :func:`invalidate_filter_index` (called by
+    ``IndexUpdater`` on every change) and rebuilt if the index size changed.
+    """
+    cached = _filter_indexes.get(vector_store)
+    if cached is None or cached.ntotal != vector_store.index.ntotal:
+        cached = FilterIndex(vector_store)
+        _filter_indexes[vector_store] = cached
+        logger.debug(
+            "Built filter index: %d folders, %d domains",
+            len(cached.folders), len(cached.domains),
+        )
+    return cached
+
+
+def invalidate_filter_index(vector_store) -> None:
+    """Forget the cached :class:`FilterIndex` of *vector_store* after a change.
+
+    Needed when documents are patched or replaced without changing the
+    index size, which :func:`get_filter_index` cannot detect.
+    """
+    _filter_indexes.pop(vector_store, None)
+
+
+def embed_query(vector_store, query: str) -> np.ndarray:
+    """Embed *query* with the store's embedding model as a ``(1, d)`` array."""
+    embedding = vector_store.embedding_function
+    with span("embed_query", query_chars=len(query)):
+        vector = embedding.embed_query(query) if hasattr(embedding, "embed_query") else embedding(query)
+    return np.asarray([vector], dtype=np.float32)
+
+
+def search_rows(
+    vector_store, query_vector: np.ndarray, k: int, rows: np.ndarray | None = None,
+) -> list[int]:
+    """Return up to *k* nearest FAISS rows, restricted to *rows* if given.
+
+    The restriction is passed to FAISS as an ``IDSelectorBitmap``, so rows
+    outside it are skipped during the scan rather than filtered afterwards.
+    """
+    index = vector_store.index
+    params = None
+    if rows is not None:
+        if len(rows) == 0:
+            return []
+        k = min(k, len(rows))
+        mask = np.zeros(index.ntotal, dtype=bool)
+        mask[rows] = True
+        bitmap = np.packbits(mask, bitorder="little")
+        params = faiss.SearchParameters(
+            sel=faiss.IDSelectorBitmap(index.ntotal, faiss.swig_ptr(bitmap)),
+        )
+    with span("faiss_search", k=k, candidates=index.ntotal if rows is None else len(rows)):
+        _, found = index.search(query_vector, k, params=params)
+    return [int(i) for i in found[0] if i != -1]
+
+
+def rows_to_documents(vector_store, rows: list[int]) -> list[Document]:
+    return [
+        vector_store.docstore.search(vector_store.index_to_docstore_id[row])
+        for row in rows
+    ]
+
+
+def filtered_search(
+    vector_store, query: str, k: int, filters: SearchFilters | None = None,
+) -> list[Document]:
+    """Semantic search restricted to documents matching *filters*.
+
+    Without filters every row is searched.  Either way the query embedding
+    and the FAISS scan are timed as their own spans.  Raises ``ValueError``
+    for malformed dates.
+    """
+    with span("similarity_search", k=k, filtered=bool(filters)) as attrs:
+        rows = get_filter_index(vector_store).select(filters) if filters else None
+        if rows is not None and not len(rows):
+            docs = []
+        else:
+            found = search_rows(vector_store, embed_query(vector_store, query), k, rows)
+            docs = rows_to_documents(vector_store, found)
+        attrs["results"] = len(docs)
+    return docs
+
+
+# ---------------------------------------------------------------------------
+# Maximal marginal relevance
+# ---------------------------------------------------------------------------
+
+
+def mmr_rerank(
+    query_vector: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float,
+) -> list[int]:
+    """Pick *k* rows of *candidates* by maximal marginal relevance.
+
+    Each step takes the candidate maximising ``lambda * sim(query) -
+    (1 - lambda) * max sim(already picked)`` under cosine similarity.  The
+    running maximum is updated with one matrix-vector product per pick, so
+    the cost is ``O(k * pool * dim)`` with no pairwise matrix.  Returns
+    positions into *candidates*, best first.
+    """
+    if len(candidates) == 0 or k <= 0:
+        return []
+    # Divide dot products by the norms instead of normalizing a copy of the
+    # pool; for 100 x 3072 floats that copy alone would cost ~0.5 ms.
+    norms = np.maximum(np.sqrt(np.einsum("ij,ij->i", candidates, candidates)), 1e-12)
+    query = query_vector.reshape(-1)
+    query_norm = max(float(np.linalg.norm(query)), 1e-12)
+    relevance = lambda_mult * (candidates @ query) / (norms * query_norm)
+    redundancy = np.full(len(candidates), -np.inf, dtype=np.float32)
+    picked = [int(np.argmax(relevance))]
+    available = np.ones(len(candidates), dtype=bool)
+    available[picked[0]] = False
+    for _ in range(min(k, len(candidates)) - 1):
+        last = picked[-1]
+        similarity = (candidates @ candidates[last]) / (norms * norms[last])
+        np.maximum(redundancy, similarity, out=redundancy)
+        scores = relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        picked.append(int(np.argmax(scores)))
+        available[picked[-1]] = False
+    return picked
+
+
+def diverse_search(
+    vector_store,
+    query: str,
+    k: int,
+    filters: SearchFilters | None = None,
+    lambda_mult: float | None = None,
+    pool_size: int | None = None,
+) -> list[Document]:
+    """Like :func:`filtered_search`, reranked for diversity with MMR.
+
+    The *pool_size* nearest candidates (default ``MMR_POOL_SIZE``, at least
+    *k*) are reranked using their stored vectors, so only the query itself
+    is embedded.
+    """
+    lambda_mult = config.MMR_LAMBDA if lambda_mult is None else lambda_mult
+    pool_size = max(k, config.MMR_POOL_SIZE if pool_size is None else pool_size)
+    with span("similarity_search", k=k, filtered=bool(filters), diverse=True) as attrs:
+        docs = _diverse_search(vector_store, query, k, filters, lambda_mult, pool_size)
+        attrs["results"] = len(docs)
+    return docs
+
+
+def _diverse_search(vector_store, query, k, filters, lambda_mult, pool_size):
+    rows = get_filter_index(vector_store).select(filters) if filters else None
+    if rows is not None and len(rows) == 0:
+        return []
+    query_vector = embed_query(vector_store, query)
+    pool = search_rows(vector_store, query_vector, pool_size, rows)
+    if not pool:
+        return []
+    with span("mmr_rerank", pool=len(pool)):
+        candidates = vector_store.index.reconstruct_batch(np.asarray(pool, dtype=np.int64))
+        order = mmr_rerank(query_vector, candidates, k, lambda_mult)
+    return rows_to_documents(vector_store, [pool[i] for i in order])
@@ -0,0 +1,215 @@
+"""Incremental sharded checkpoints of the FAISS index.
+
+Large indexes are saved as several shards instead of one file.  Shards are
+segments in insertion order: new documents are appended to the last shard
+until it holds ``SHARD_SIZE`` documents, and an edited document moves to
+the end like a new one.  The rows of the in-memory index therefore stay in
+shard order, each shard is a contiguous slice of the index's vectors, and a
+checkpoint only rewrites the shards that gained or lost documents -- during
+a large import that is just the last one or two.
+
+Dirty shards are written by a small thread pool.  Each thread reads its
+slice straight from the index's vector buffer; faiss serialization and
+fsync release the GIL, so the file writes of several shards overlap, while
+pickling their documents still runs one at a time.  Threads rather than
+processes keep this safe to call from a thread that also runs an event loop
+or holds open database and HTTP connections.  On load, the shards are merged
+back into one in-memory index.
+"""
+
+import logging
+import os
+import pickle
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+SHARD_SIZE = 10_000  # documents appended to a shard before starting the next
+
+# Shards are copied into the merged index straight from the page cache when
+# faiss supports memory-mapping flat codes (1.10+).
+_MMAP_FLAT_CODES = getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+
+
+def stored_vectors(index) -> np.ndarray:
+    """Return the index's vectors, as a zero-copy view for flat indexes."""
+    if isinstance(index, faiss.IndexFlat) and index.ntotal:
+        flat = faiss.rev_swig_ptr(index.get_xb(), index.ntotal * index.d)
+        return flat.reshape(index.ntotal, index.d)
+    return index.reconstruct_n(0, index.ntotal)
+
+
+class ShardLayout:
+    """Which shard each indexed document belongs to, and which changed.
+
+    *shards* lists ``(name, size)`` in row order; *doc_ids* are the indexed
+    document ids in row order.  A shard without a name has not been written
+    yet.
+    """
+
+    def __init__(
+        self,
+        shards: Iterable[tuple[str | None, int]] = (),
+        doc_ids: Iterable[str] = (),
+    ):
+        self.names: list[str | None] = []
+        self.sizes: list[int] = []
+        self.shard_of: dict[str, int] = {}
+        self.dirty: set[int] = set()
+        doc_ids = iter(doc_ids)
+        for name, size in shards:
+            shard = len(self.sizes)
+            self.names.append(name)
+            self.sizes.append(size)
+            for _ in range(size):
+                self.shard_of[next(doc_ids)] = shard
+
+    def remove(self, doc_ids: Iterable[str]) -> None:
+        """Record that *doc_ids* were deleted from the index."""
+        for doc_id in doc_ids:
+            shard = self.shard_of.pop(doc_id)
+            self.sizes[shard] -= 1
+            self.dirty.add(shard)
+
+    def append(self, doc_ids: Iterable[str]) -> None:
+        """Record that *doc_ids* were added at the end of the index."""
+        for doc_id in doc_ids:
+            if not self.sizes or self.sizes[-1] >= SHARD_SIZE:
+                self.names.append(None)
+                self.sizes.append(0)
+            shard = len(self.sizes) - 1
+            self.shard_of[doc_id] = shard
+            self.sizes[shard] += 1
+            self.dirty.add(shard)
+
+    def touch(self, doc_id: str) -> None:
+        """Record that the stored document *doc_id* changed in place."""
+        self.dirty.add(self.shard_of[doc_id])
+
+    def ranges(self) -> list[tuple[int, int]]:
+        """Row range ``[start, stop)`` of each shard."""
+        bounds = np.cumsum([0, *self.sizes]).tolist()
+        return list(zip(bounds, bounds[1:]))
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+
+def _write_shard(
+    vector_store: FAISS, store_path: Path, name: str, start: int, stop: int,
+) -> dict[str, int]:
+    """Save rows ``[start, stop)`` of *vector_store* as *name*; fsync it.
+
+    Uses the same file layout as ``FAISS.save_local``.  Returns the size of
+    each file written.
+    """
+    source = vector_store.index
+    if start == 0 and stop == source.ntotal:
+        vector_store.save_local(store_path, index_name=name)
+    else:
+        index = faiss.IndexFlat(source.d, source.metric_type)
+        index.add(stored_vectors(source)[start:stop])
+        ids = [vector_store.index_to_docstore_id[row] for row in range(start, stop)]
+        docstore = InMemoryDocstore({i: vector_store.docstore.search(i) for i in ids})
+        faiss.write_index(index, str(store_path / f"{name}.faiss"))
+        with (store_path / f"{name}.pkl").open("wb") as f:
+            pickle.dump((docstore, dict(enumerate(ids))), f)
+    sizes = {}
+    for file_name in (f"{name}.faiss", f"{name}.pkl"):
+        path = store_path / file_name
+        with path.open("rb") as f:
+            os.fsync(f.fileno())
+        sizes[file_name] = path.stat().st_size
+    return sizes
+
+
+def write_shards(
+    vector_store: FAISS,
+    store_path: Path,
+    plan: dict[str, tuple[int, int]],
+    workers: int | None = None,
+) -> dict[str, int]:
+    """Write each shard of *plan* (name -> row range) to *store_path*.
+
+    Up to *workers* shards (``INDEX_WORKERS``, default one per CPU) are
+    written at once.  *vector_store* must not be modified until this
+    returns.  Returns the file sizes.
+    """
+    workers = min(workers or config.INDEX_WORKERS or os.cpu_count() or 1, len(plan))
+    files: dict[str, int] = {}
+    if workers <= 1:
+        for name, (start, stop) in plan.items():
+            files.update(_write_shard(vector_store, store_path, name, start, stop))
+        return files
+
+    with ThreadPoolExecutor(workers, thread_name_prefix="index-shard") as pool:
+        futures = [
+            pool.submit(_write_shard, vector_store, store_path, name, start, stop)
+            for name, (start, stop) in plan.items()
+        ]
+        for future in futures:
+            files.update(future.result())
+    logger.debug("Wrote %d index shards with %d threads", len(plan), workers)
+    return files
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+
+def load_shards(
+    store_path: Path, shards: list[tuple[str, int]], embeddings: Embeddings | None,
+) -> FAISS:
+    """Load *shards* (``(name, size)`` pairs) from *store_path*, merged in order.
+
+    Flat shards are memory-mapped and copied one at a time into a buffer
+    allocated once for all of them, which is much cheaper than growing the
+    index with repeated ``merge_from`` calls.
+    """
+    if len(shards) == 1:
+        return FAISS.load_local(
+            store_path, embeddings,
+            index_name=shards[0][0],
+            allow_dangerous_deserialization=True,
+        )
+    total = sum(size for _, size in shards)
+    index = vectors = None
+    documents: dict = {}
+    doc_ids: list[str] = []
+    for name, size in shards:
+        shard = faiss.read_index(str(store_path / f"{name}.faiss"), _MMAP_FLAT_CODES)
+        with (store_path / f"{name}.pkl").open("rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        if shard.ntotal != size or len(index_to_docstore_id) != size:
+            raise ValueError(f"Index shard {name} does not have {size} documents")
+        if index is None:
+            if isinstance(shard, faiss.IndexFlat):
+                index = faiss.IndexFlat(shard.d, shard.metric_type)
+                index.codes.resize(total * index.code_size)
+                index.ntotal = total
+                vectors = stored_vectors(index)
+            else:
+                index = faiss.clone_index(shard)
+                index.reset()
+        if vectors is not None:
+            vectors[len(doc_ids):len(doc_ids) + size] = stored_vectors(shard)
+        else:
+            index.merge_from(shard)
+        documents.update(docstore._dict)
+        doc_ids.extend(index_to_docstore_id[row] for row in range(size))
+    return FAISS(
+        embeddings, index, InMemoryDocstore(documents), dict(enumerate(doc_ids)),
+    )
@@ -0,0 +1,281 @@
+"""Single-file snapshot of the server state for instant cold starts.
+
+Layout (little-endian)::
+
+    magic "BMAISNAP" | u32 version | u32 reserved
+    u64 meta length | u64 state length | u64 documents length
+    meta JSON (creation time, embedding model, Chrome fingerprint,
+               index generation, vector count and dimension)
+    state JSON (bookmarks, folders, stats, document ids in index order)
+    documents JSON (text and metadata in index order)
+    zero padding to a 64-byte boundary
+    float32 vectors, count x dim, row-major
+
+On load only the meta and state sections are parsed.  The documents and the
+vectors are memory-mapped: the documents are parsed on the first docstore
+lookup and the FAISS index is built from the vectors on the first query.
+Each mapping is dropped once its contents are in memory, and
+:meth:`SnapshotStore.detach` drops both before the file is rewritten
+(Windows cannot replace a file that is still mapped).
+"""
+
+import json
+import logging
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+
+from . import config
+from .storage import atomic_open
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"BMAISNAP"
+SNAPSHOT_VERSION = 2
+_PREFIX = struct.Struct("<8sIIQQQ")
+_ALIGN = 64
+
+
+def _vectors_offset(sections_len: int) -> int:
+    end = _PREFIX.size + sections_len
+    return -(-end // _ALIGN) * _ALIGN
+
+
+def chrome_fingerprint(path: Path) -> dict:
+    """Cheap change detector for the Chrome Bookmarks file."""
+    st = path.stat()
+    return {"path": str(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+class _SnapshotDocstore:
+    """Minimal read-only docstore mirroring ``InMemoryDocstore.search``.
+
+    *raw* is the documents section (a JSON list in index order); it is
+    parsed on the first lookup.
+    """
+
+    def __init__(self, ids: list[str], raw):
+        self._ids = ids
+        self._raw = raw
+        self._dict: dict[str, Document] | None = None
+        self._lock = threading.Lock()
+
+    def _documents(self) -> dict[str, Document]:
+        with self._lock:
+            if self._dict is None:
+                self._dict = {
+                    doc_id: Document(
+                        id=doc_id, page_content=d["page_content"], metadata=d["metadata"],
+                    )
+                    for doc_id, d in zip(self._ids, json.loads(bytes(self._raw)))
+                }
+                self._raw = None
+        return self._dict
+
+    def search(self, search: str) -> Document | str:
+        return self._documents().get(search, f"ID {search} not found.")
+
+
+class SnapshotStore:
+    """Read-only vector store served from a snapshot.
+
+    Exposes the parts of the LangChain ``FAISS`` interface the app relies on
+    (``index``, ``index_to_docstore_id``, ``docstore``, ``similarity_search``)
+    without importing LangChain's community or OpenAI packages until the
+    first query needs an embedding.  The vectors stay memory-mapped until
+    the first access to ``index`` copies them into a flat FAISS index;
+    ``vectors`` is ``None`` from then on.
+    """
+
+    def __init__(self, vectors: np.ndarray, ids: list[str], documents):
+        self.vectors = vectors
+        self.index_to_docstore_id = dict(enumerate(ids))
+        self.docstore = _SnapshotDocstore(ids, documents)
+        self._index = None
+        self._index_lock = threading.Lock()
+        self._embeddings = None
+
+    @property
+    def index(self) -> faiss.IndexFlatL2:
+        return self._load_index()
+
+    def _load_index(self) -> faiss.IndexFlatL2:
+        with self._index_lock:
+            if self._index is None:
+                index = faiss.IndexFlatL2(self.vectors.shape[1])
+                if len(self.vectors):
+                    index.add(np.ascontiguousarray(self.vectors))
+                self._index = index
+                self.vectors = None  # unmaps the snapshot file
+        return self._index
+
+    def detach(self) -> None:
+        """Load everything still mapped from the snapshot file into memory."""
+        self._load_index()
+        self.docstore._documents()
+
+    @property
+    def embedding_function(self):
+        if self._embeddings is None:
+            from langchain_openai import OpenAIEmbeddings
+
+            self._embeddings = OpenAIEmbeddings(model=config.EMBEDDING_MODEL)
+        return self._embeddings
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> list[Document]:
+        vector = np.asarray([self.embedding_function.embed_query(query)], dtype=np.float32)
+        _, indices = self.index.search(vector, k)
+        return [
+            self.docstore.search(self.index_to_docstore_id[i])
+            for i in indices[0] if i != -1
+        ]
+
+
+@dataclass
+class Snapshot:
+    """State loaded from a snapshot file."""
+
+    bookmarks: list[dict]
+    folders: list[str]
+    stats: dict
+    vector_store: SnapshotStore
+    chrome: dict
+    embedding_model: str
+    created: float
+    generation: int | None = None
+
+
+def write_snapshot(
+    path: str | Path,
+    bookmarks: list[dict],
+    folders: list[str],
+    stats: dict,
+    vector_store,
+    chrome_path: Path,
+    generation: int | None = None,
+) -> None:
+    """Atomically write the current state to *path*.
+
+    *vector_store* may be a LangChain ``FAISS`` store or a
+    :class:`SnapshotStore`; its vectors are read back from the index.
+    *generation* is the index checkpoint the state was built from (see
+    :func:`snapshot_is_current`).
+    """
+    index = vector_store.index
+    count, dim = index.ntotal, index.d
+    vectors = index.reconstruct_n(0, count) if count else np.empty((0, dim), np.float32)
+    ids, documents = [], []
+    for i in range(count):
+        doc_id = vector_store.index_to_docstore_id[i]
+        doc = vector_store.docstore.search(doc_id)
+        ids.append(doc_id)
+        documents.append({"page_content": doc.page_content, "metadata": doc.metadata})
+    meta = _encode({
+        "created": time.time(),
+        "embedding_model": config.EMBEDDING_MODEL,
+        "chrome": chrome_fingerprint(chrome_path),
+        "generation": generation,
+        "count": count,
+        "dim": dim,
+    })
+    state = _encode({"bookmarks": bookmarks, "folders": folders, "stats": stats, "ids": ids})
+    docs = _encode(documents)
+
+    sections = meta + state + docs
+    offset = _vectors_offset(len(sections))
+    with atomic_open(path, "wb") as f:
+        f.write(_PREFIX.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(meta), len(state), len(docs),
+        ))
+        f.write(sections)
+        f.write(b"\0" * (offset - _PREFIX.size - len(sections)))
+        f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+    logger.info("Wrote snapshot %s (%d documents)", path, count)
+
+
+def _encode(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+def _read_prefix(f, path: Path) -> tuple[int, int, int]:
+    prefix = f.read(_PREFIX.size)
+    if len(prefix) != _PREFIX.size:
+        raise ValueError(f"{path} is not a Bookmark AI snapshot")
+    magic, version, _, meta_len, state_len, docs_len = _PREFIX.unpack(prefix)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError(f"{path} is not a Bookmark AI snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {version} in {path}")
+    return meta_len, state_len, docs_len
+
+
+def read_snapshot_meta(path: str | Path) -> dict:
+    """Read only the small meta section of the snapshot at *path*.
+
+    Raises ``ValueError`` if the file is not a snapshot of this version.
+    """
+    path = Path(path)
+    with path.open("rb") as f:
+        meta_len, _, _ = _read_prefix(f, path)
+        return json.loads(f.read(meta_len))
+
+
+def snapshot_is_current(
+    path: str | Path, generation: int | None, chrome_path: Path,
+) -> bool:
+    """Whether the snapshot at *path* already holds index *generation*.
+
+    Every change to the indexed documents writes a new index checkpoint, so
+    a snapshot of the same generation, embedding model and Chrome file needs
+    no rewrite.  Without a *generation* the snapshot is never current.
+    """
+    if generation is None:
+        return False
+    try:
+        meta = read_snapshot_meta(path)
+    except (OSError, ValueError):
+        return False
+    return (
+        meta.get("generation") == generation
+        and meta["embedding_model"] == config.EMBEDDING_MODEL
+        and meta["chrome"] == chrome_fingerprint(chrome_path)
+    )
+
+
+def read_snapshot(path: str | Path) -> Snapshot:
+    """Load a snapshot written by :func:`write_snapshot`.
+
+    Raises ``ValueError`` if the file is not a snapshot of this version.
+    """
+    path = Path(path)
+    with path.open("rb") as f:
+        meta_len, state_len, docs_len = _read_prefix(f, path)
+        meta = json.loads(f.read(meta_len))
+        state = json.loads(f.read(state_len))
+
+    docs_offset = _PREFIX.size + meta_len + state_len
+    documents = np.memmap(path, dtype=np.uint8, mode="r", offset=docs_offset, shape=(docs_len,))
+    count, dim = meta["count"], meta["dim"]
+    if count:
+        vectors = np.memmap(
+            path, dtype=np.float32, mode="r",
+            offset=_vectors_offset(meta_len + state_len + docs_len), shape=(count, dim),
+        )
+    else:
+        vectors = np.empty((0, dim), dtype=np.float32)
+    return Snapshot(
+        bookmarks=state["bookmarks"],
+        folders=state["folders"],
+        stats=state["stats"],
+        vector_store=SnapshotStore(vectors, state["ids"], documents),
+        chrome=meta["chrome"],
+        embedding_model=meta["embedding_model"],
+        created=meta["created"],
+        generation=meta["generation"],
+    )
@@ -0,0 +1,85 @@
+"""Crash-safe file writes (write to a temp file, fsync, then rename).
+
+Also reads the index checkpoint manifest, so modules that only need the
+index generation do not have to import the vector store stack.
+"""
+
+import json
+import logging
+import os
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Any
+
+logger = logging.getLogger(__name__)
+
+INDEX_MANIFEST_FILE = "index_manifest.json"
+INDEX_MANIFEST_VERSION = 3
+
+
+@contextmanager
+def atomic_open(path: str | Path, mode: str = "w", **kwargs) -> Iterator[IO]:
+    """Open a temporary file that atomically replaces *path* on success.
+
+    Readers see either the old file or the complete new one, never a partial
+    write.  If the block raises, *path* is left untouched.
+    """
+    path = Path(path)
+    if "b" not in mode:
+        kwargs.setdefault("encoding", "utf-8")
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def atomic_write_json(path: str | Path, data: Any, **kwargs) -> None:
+    """Serialize *data* to *path* as JSON, atomically."""
+    with atomic_open(path, "w") as f:
+        json.dump(data, f, **kwargs)
+
+
+def load_index_manifest(store_path: Path) -> dict | None:
+    """Load the checkpoint manifest of the index at *store_path*.
+
+    The manifest names the index shards and files of the last committed
+    checkpoint and maps each indexed document id to its content hash.
+    Returns ``None`` when there is no usable manifest, in which case the
+    index cannot be updated incrementally.
+    """
+    sidecar = Path(store_path) / INDEX_MANIFEST_FILE
+    if not sidecar.exists():
+        return None
+    try:
+        with sidecar.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        logger.warning("Ignoring unreadable index manifest %s", sidecar)
+        return None
+    if data.get("version") == 1:
+        # Written before checkpoints existed: fixed file name, no sizes.
+        data.update(generation=0, index_name="index", files={}, complete=True)
+    if data.get("version") in (1, 2):
+        # Written before sharding: one index file per checkpoint.
+        data["shards"] = [[data.pop("index_name"), len(data["documents"])]]
+    elif data.get("version") != INDEX_MANIFEST_VERSION:
+        return None
+    return data
+
+
+def index_generation(store_path: Path) -> int | None:
+    """Return the generation of the committed index at *store_path*, if any.
+
+    The generation changes with every checkpoint, so it can key anything
+    derived from the index contents.
+    """
+    manifest = load_index_manifest(store_path)
+    return None if manifest is None else manifest["generation"]
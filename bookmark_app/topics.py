@@ -0,0 +1,329 @@
+"""Topic clusters over the stored vectors, for browsing without a query.
+
+Documents are grouped with spherical k-means (``faiss.Kmeans``) over the
+embeddings already in the index, and each cluster is labelled with the terms
+that best distinguish its names and descriptions from the rest of the
+collection.  The model is saved next to the index as a single ``.npz`` file.
+On refresh, new and re-embedded documents are assigned to their nearest
+centroid and removed ones dropped.  The model is retrained only when the
+collection has changed by more than ``RETRAIN_FRACTION`` since it was trained.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from . import config
+from .storage import atomic_open, index_generation
+
+logger = logging.getLogger(__name__)
+
+MAX_TOPICS = 100
+LABEL_TERMS = 3
+RETRAIN_FRACTION = 0.5
+KMEANS_ITERATIONS = 20
+TRAIN_POINTS_PER_TOPIC = 256  # k-means trains on a sample of this size per topic
+ASSIGN_CHUNK = 8192
+
+_TOPICS_FILE = "topics.npz"
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9+#]{2,}")
+_STOPWORDS = frozenset("""
+    about after all also and any are because been but can com could does for
+    from has have how html http https into its just like more most not off
+    only org other our out over page site such than that the their them then
+    there these they this use used uses using via was web website what when
+    where which while who why will with www you your
+""".split())
+
+
+@dataclass
+class Topic:
+    """One cluster of documents."""
+
+    id: int
+    label: str
+    terms: list[str]
+    size: int
+
+
+@dataclass
+class TopicModel:
+    """Centroids plus the topic (and centroid distance) of every document.
+
+    *content* holds a fingerprint of the text each assignment was computed
+    from, so a re-embedded document is reassigned on refresh.
+    """
+
+    centroids: np.ndarray
+    assignments: dict[str, tuple[int, float]]
+    topics: list[Topic] = field(default_factory=list)
+    generation: int | None = None
+    trained_size: int = 0
+    changed_since_training: int = 0
+    content: dict[str, int] = field(default_factory=dict)
+    _members: dict[int, list[str]] = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self):
+        self.index_members()
+
+    def index_members(self) -> None:
+        """Rebuild the topic -> members index after *assignments* changed."""
+        found: dict[int, list[tuple[float, str]]] = {}
+        for doc_id, (topic, distance) in self.assignments.items():
+            found.setdefault(topic, []).append((distance, doc_id))
+        self._members = {
+            topic: [doc_id for _, doc_id in sorted(pairs)] for topic, pairs in found.items()
+        }
+
+    def members(self, topic_id: int) -> list[str]:
+        """Document ids in *topic_id*, closest to the centroid first."""
+        return self._members.get(topic_id, [])
+
+
+# ---------------------------------------------------------------------------
+# Clustering and labelling
+# ---------------------------------------------------------------------------
+
+
+def default_topic_count(n: int) -> int:
+    """``TOPIC_COUNT`` if set, else about ``sqrt(n / 2)`` topics."""
+    k = config.TOPIC_COUNT or round(math.sqrt(n / 2))
+    return max(1, min(k, MAX_TOPICS, n))
+
+
+def _content_key(vector_store, doc_id: str) -> int:
+    """64-bit fingerprint of the text *doc_id* was embedded from."""
+    text = getattr(vector_store.docstore.search(doc_id), "page_content", "")
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _rows_of(vector_store, doc_ids: list[str]) -> np.ndarray:
+    row_of = {doc_id: row for row, doc_id in vector_store.index_to_docstore_id.items()}
+    return np.asarray([row_of[doc_id] for doc_id in doc_ids], dtype=np.int64)
+
+
+def _unit_vectors(vector_store, rows: np.ndarray) -> np.ndarray:
+    vectors = vector_store.index.reconstruct_batch(rows) if len(rows) else np.empty(
+        (0, vector_store.index.d), dtype=np.float32,
+    )
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def _assign(
+    centroids: np.ndarray, vector_store, rows: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Nearest centroid and cosine distance for *rows*, in bounded chunks."""
+    index = faiss.IndexFlatIP(centroids.shape[1])
+    index.add(centroids)
+    topics = np.empty(len(rows), dtype=np.int64)
+    distances = np.empty(len(rows), dtype=np.float32)
+    for start in range(0, len(rows), ASSIGN_CHUNK):
+        chunk = _unit_vectors(vector_store, rows[start:start + ASSIGN_CHUNK])
+        similarity, nearest = index.search(chunk, 1)
+        topics[start:start + len(chunk)] = nearest[:, 0]
+        distances[start:start + len(chunk)] = 1 - similarity[:, 0]
+    return topics, distances
+
+
+def _tokens(page_content: str) -> set[str]:
+    # Skip the "Folder: ..." line: folder names describe the user's filing,
+    # not the page.
+    lines = page_content.split("\n")
+    text = " ".join([lines[0], *lines[2:]]).lower()
+    return {t for t in _TOKEN_RE.findall(text) if t not in _STOPWORDS}
+
+
+def _label_topics(vector_store, model: TopicModel) -> list[Topic]:
+    """Label each topic with its most distinctive terms (cluster TF x IDF)."""
+    k = len(model.centroids)
+    doc_freq: Counter = Counter()
+    topic_freq = [Counter() for _ in range(k)]
+    sizes = [0] * k
+    for doc_id, (topic, _) in model.assignments.items():
+        doc = vector_store.docstore.search(doc_id)
+        terms = _tokens(getattr(doc, "page_content", ""))
+        doc_freq.update(terms)
+        topic_freq[topic].update(terms)
+        sizes[topic] += 1
+
+    total = max(len(model.assignments), 1)
+    topics = []
+    for topic_id in range(k):
+        min_count = 2 if sizes[topic_id] > 1 else 1
+        scored = sorted(
+            (
+                (-count / sizes[topic_id] * math.log(total / doc_freq[term]), term)
+                for term, count in topic_freq[topic_id].items()
+                if count >= min_count
+            ),
+        )
+        terms = [term for _, term in scored[:LABEL_TERMS]]
+        label = " / ".join(terms) if terms else f"Topic {topic_id}"
+        topics.append(Topic(topic_id, label, terms, sizes[topic_id]))
+    return topics
+
+
+def build_topics(vector_store, n_topics: int | None = None) -> TopicModel | None:
+    """Cluster every document of *vector_store*; ``None`` if it is empty."""
+    doc_ids = list(vector_store.index_to_docstore_id.values())
+    if not doc_ids:
+        return None
+    k = n_topics or default_topic_count(len(doc_ids))
+    rows = _rows_of(vector_store, doc_ids)
+    sample = rows
+    if len(rows) > k * TRAIN_POINTS_PER_TOPIC:
+        rng = np.random.default_rng(1)
+        sample = np.sort(rng.choice(rows, k * TRAIN_POINTS_PER_TOPIC, replace=False))
+    kmeans = faiss.Kmeans(
+        vector_store.index.d, k, niter=KMEANS_ITERATIONS, spherical=True, seed=1,
+        max_points_per_centroid=TRAIN_POINTS_PER_TOPIC,
+    )
+    kmeans.train(_unit_vectors(vector_store, sample))
+    topics, distances = _assign(kmeans.centroids, vector_store, rows)
+    model = TopicModel(
+        centroids=kmeans.centroids,
+        assignments={
+            doc_id: (int(t), float(d)) for doc_id, t, d in zip(doc_ids, topics, distances)
+        },
+        trained_size=len(doc_ids),
+        content={doc_id: _content_key(vector_store, doc_id) for doc_id in doc_ids},
+    )
+    model.topics = _label_topics(vector_store, model)
+    logger.info("Clustered %d documents into %d topics", len(doc_ids), k)
+    return model
+
+
+def update_topics(model: TopicModel, vector_store) -> bool:
+    """Bring *model* in line with *vector_store* without retraining.
+
+    New documents, and documents whose text (and so vector) changed, are
+    assigned to their nearest centroid; removed ones are dropped.  Labels
+    are recomputed if anything changed.  Returns whether the model changed.
+    """
+    current = {
+        doc_id: _content_key(vector_store, doc_id)
+        for doc_id in vector_store.index_to_docstore_id.values()
+    }
+    removed = [doc_id for doc_id in model.assignments if doc_id not in current]
+    changed = [
+        doc_id for doc_id, key in current.items()
+        if doc_id not in model.assignments or model.content.get(doc_id) != key
+    ]
+    for doc_id in removed:
+        del model.assignments[doc_id]
+        model.content.pop(doc_id, None)
+    if changed:
+        topics, distances = _assign(
+            model.centroids, vector_store, _rows_of(vector_store, changed),
+        )
+        for doc_id, t, d in zip(changed, topics, distances):
+            model.assignments[doc_id] = (int(t), float(d))
+            model.content[doc_id] = current[doc_id]
+    if not (changed or removed):
+        return False
+    model.changed_since_training += len(changed) + len(removed)
+    model.index_members()
+    model.topics = _label_topics(vector_store, model)
+    logger.info(
+        "Updated topics: %d documents assigned, %d removed", len(changed), len(removed),
+    )
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Persistence
+# ---------------------------------------------------------------------------
+
+
+def save_topics(model: TopicModel, store_path: Path) -> None:
+    """Atomically write *model* to ``topics.npz`` in *store_path*."""
+    doc_ids = list(model.assignments)
+    meta = {
+        "generation": model.generation,
+        "trained_size": model.trained_size,
+        "changed_since_training": model.changed_since_training,
+        "topics": [
+            {"id": t.id, "label": t.label, "terms": t.terms, "size": t.size}
+            for t in model.topics
+        ],
+    }
+    with atomic_open(store_path / _TOPICS_FILE, "wb") as f:
+        np.savez(
+            f,
+            centroids=model.centroids,
+            ids=np.asarray(doc_ids, dtype=np.str_),
+            topic=np.asarray([model.assignments[i][0] for i in doc_ids], dtype=np.int32),
+            distance=np.asarray([model.assignments[i][1] for i in doc_ids], dtype=np.float32),
+            content=np.asarray([model.content.get(i, 0) for i in doc_ids], dtype=np.uint64),
+            meta=np.asarray(json.dumps(meta)),
+        )
+
+
+def load_topics(store_path: Path) -> TopicModel | None:
+    """Load the model saved in *store_path*, or ``None`` if there is none."""
+    path = store_path / _TOPICS_FILE
+    if not path.exists():
+        return None
+    try:
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            doc_ids = data["ids"].tolist()
+            assignments = {
+                doc_id: (int(t), float(d))
+                for doc_id, t, d in zip(doc_ids, data["topic"], data["distance"])
+            }
+            # Models saved before fingerprints were kept get reassigned once.
+            content = (
+                dict(zip(doc_ids, data["content"].tolist())) if "content" in data else {}
+            )
+            centroids = data["centroids"]
+    except (OSError, ValueError, KeyError):
+        logger.warning("Ignoring unreadable topic model %s", path, exc_info=True)
+        return None
+    return TopicModel(
+        centroids=centroids,
+        assignments=assignments,
+        topics=[Topic(**t) for t in meta["topics"]],
+        generation=meta["generation"],
+        trained_size=meta["trained_size"],
+        changed_since_training=meta["changed_since_training"],
+        content=content,
+    )
+
+
+def refresh_topics(vector_store, store_path: Path) -> TopicModel | None:
+    """Load, incrementally update or rebuild the topic model for *vector_store*.
+
+    The saved model is reused while the index generation is unchanged.
+    """
+    generation = index_generation(store_path)
+    model = load_topics(store_path)
+    if model is not None and model.centroids.shape[1] != vector_store.index.d:
+        model = None
+    if model is not None and model.generation == generation and generation is not None:
+        return model
+
+    if model is not None:
+        update_topics(model, vector_store)
+        if model.changed_since_training > RETRAIN_FRACTION * model.trained_size:
+            logger.info("Collection changed substantially; retraining topics")
+            model = None
+    if model is None:
+        model = build_topics(vector_store)
+        if model is None:
+            return None
+    model.generation = generation
+    if store_path.exists():
+        save_topics(model, store_path)
+    return model
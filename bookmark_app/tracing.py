@@ -0,0 +1,265 @@
+"""Opt-in latency tracing and the slow-query log.
+
+With ``TRACING`` on, each chat answer and MCP tool call is a *trace*: a root
+timing plus the spans recorded while it ran (agent steps, the ``retrieve``
+tool, query embedding, the FAISS scan, ...), each with its duration and
+payload sizes.  Traces taking at least ``SLOW_QUERY_MS`` are appended to
+``SLOW_QUERY_LOG`` as one JSON line each; with a threshold of 0 every trace
+is logged.  :func:`summarize` aggregates a log into per-span percentiles
+(``python -m bookmark_app.cli traces``).
+
+The active trace is carried in a context variable, so spans opened in
+worker threads started with ``asyncio.to_thread`` land in the right trace.
+With tracing off, :func:`span` costs one context-variable lookup.
+"""
+
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+QUERY_PREVIEW_CHARS = 200
+
+_current: ContextVar["Trace | None"] = ContextVar("bookmark_trace", default=None)
+_log_lock = threading.Lock()
+
+
+def payload_size(value) -> int:
+    """Approximate size in bytes of *value* as it would be sent or shown."""
+    if value is None:
+        return 0
+    if isinstance(value, bytes):
+        return len(value)
+    if not isinstance(value, str):
+        value = json.dumps(value, default=str, ensure_ascii=False)
+    return len(value.encode("utf-8"))
+
+
+class Trace:
+    """Timings of one request; written to the slow-query log when finished."""
+
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.spans: list[dict] = []
+        self._start = time.perf_counter()
+        self._wall = time.time()
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def add(self, name: str, start: float, end: float, **attrs) -> None:
+        """Record a span that ran from *start* to *end* (``perf_counter``)."""
+        self.spans.append({
+            "name": name,
+            "start_ms": round((start - self._start) * 1000, 3),
+            "ms": round((end - start) * 1000, 3),
+            **attrs,
+        })
+
+    def finish(self, **attrs) -> None:
+        """Close the trace and log it if it took ``SLOW_QUERY_MS`` or longer."""
+        elapsed = self.elapsed_ms()
+        self.attrs.update(attrs)
+        if elapsed < config.SLOW_QUERY_MS or not config.SLOW_QUERY_LOG:
+            return
+        record = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self._wall)),
+            "trace": self.name,
+            "ms": round(elapsed, 3),
+            "slow_query_ms": config.SLOW_QUERY_MS,
+            **self.attrs,
+            "spans": self.spans,
+        }
+        line = json.dumps(record, default=str, ensure_ascii=False)
+        try:
+            with _log_lock, open(config.SLOW_QUERY_LOG, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError:
+            logger.warning("Could not write slow-query log %s", config.SLOW_QUERY_LOG,
+                           exc_info=True)
+
+
+def start_trace(name: str, **attrs) -> Trace | None:
+    """Begin a trace, or return ``None`` when tracing is off."""
+    return Trace(name, **attrs) if config.TRACING else None
+
+
+def current_trace() -> Trace | None:
+    return _current.get()
+
+
+@contextmanager
+def activate(trace: Trace | None) -> Iterator[None]:
+    """Make *trace* the target of :func:`span` calls in this context."""
+    if trace is None:
+        yield
+        return
+    token = _current.set(trace)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[dict]:
+    """Time the block as span *name* of the active trace, if any.
+
+    Yields the span's attribute dict so the block can add results such as
+    ``output_bytes``.
+    """
+    trace = _current.get()
+    if trace is None:
+        yield attrs
+        return
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as exc:
+        attrs["error"] = type(exc).__name__
+        raise
+    finally:
+        trace.add(name, start, time.perf_counter(), **attrs)
+
+
+@contextmanager
+def root(name: str, **attrs) -> Iterator[dict]:
+    """Run the block as a new trace named *name* (no-op with tracing off)."""
+    trace = start_trace(name, **attrs)
+    if trace is None:
+        yield attrs
+        return
+    try:
+        with activate(trace):
+            yield trace.attrs
+    except BaseException as exc:
+        trace.attrs["error"] = type(exc).__name__
+        raise
+    finally:
+        trace.finish()
+
+
+def traced(name: str | None = None):
+    """Decorator: trace each call of a (sync or async) handler.
+
+    Records the size of the arguments and of the result.  Arguments that
+    are not plain data (such as an MCP ``Context``) are left out.
+    """
+
+    def decorator(fn):
+        trace_name = name or fn.__name__
+
+        def arguments(args, kwargs):
+            bound = inspect.signature(fn).bind_partial(*args, **kwargs).arguments
+            return {
+                key: value for key, value in bound.items()
+                if value is None or isinstance(value, (str, int, float, bool, list, dict))
+            }
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                if not config.TRACING:
+                    return await fn(*args, **kwargs)
+                with root(trace_name, input_bytes=payload_size(arguments(args, kwargs))) as attrs:
+                    result = await fn(*args, **kwargs)
+                    attrs["output_bytes"] = payload_size(result)
+                    return result
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not config.TRACING:
+                    return fn(*args, **kwargs)
+                with root(trace_name, input_bytes=payload_size(arguments(args, kwargs))) as attrs:
+                    result = fn(*args, **kwargs)
+                    attrs["output_bytes"] = payload_size(result)
+                    return result
+        return wrapper
+
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Log analysis
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class SpanStats:
+    """Latency percentiles of one span name across a log."""
+
+    name: str
+    count: int
+    p50_ms: float
+    p95_ms: float
+    max_ms: float
+    total_ms: float
+    p50_output_bytes: int | None = None
+
+
+def read_log(path: str | Path) -> Iterator[dict]:
+    """Yield the traces in the JSONL log at *path*, skipping corrupt lines."""
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if isinstance(record, dict):
+                yield record
+            else:
+                logger.warning("Skipping unreadable line %d of %s", number, path)
+
+
+def summarize(traces: Iterable[dict]) -> list[SpanStats]:
+    """Aggregate traces into per-span statistics, largest total time first.
+
+    Root traces are reported under their own name alongside their spans.
+    Entries without a duration are skipped, like corrupt lines in
+    :func:`read_log`.
+    """
+    durations: dict[str, list[float]] = defaultdict(list)
+    sizes: dict[str, list[int]] = defaultdict(list)
+    for trace in traces:
+        if not isinstance(trace, dict):
+            continue
+        entries = [{"name": trace.get("trace", "?"), **trace}, *(trace.get("spans") or ())]
+        for entry in entries:
+            ms = entry.get("ms") if isinstance(entry, dict) else None
+            if not isinstance(ms, (int, float)):
+                continue
+            name = entry.get("name", "?")
+            durations[name].append(ms)
+            if isinstance(entry.get("output_bytes"), int):
+                sizes[name].append(entry["output_bytes"])
+    stats = []
+    for name, values in durations.items():
+        p50, p95 = np.percentile(values, [50, 95])
+        size = sizes.get(name)
+        stats.append(SpanStats(
+            name=name,
+            count=len(values),
+            p50_ms=float(p50),
+            p95_ms=float(p95),
+            max_ms=float(max(values)),
+            total_ms=float(sum(values)),
+            p50_output_bytes=int(np.percentile(size, 50)) if size else None,
+        ))
+    return sorted(stats, key=lambda s: s.total_ms, reverse=True)
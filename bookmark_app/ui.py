@@ -1,42 +1,119 @@
 """Gradio UI with streaming and application orchestrator."""
 
 import logging
+import time
+from typing import Callable
 
 import gradio as gr
 from gradio.themes.utils import colors
 from langchain_core.messages import AIMessageChunk
 
 from . import config
-from .agent import create_agent, get_llm, set_retrieval_k
+from .agent import TraceCallbackHandler, create_agent, get_llm
 from .bookmarks import load_cache, load_chrome_bookmarks, merge_bookmarks, save_cache
-from .descriptions import generate_all_descriptions_sync
-from .vectorstore import bookmarks_to_documents, load_or_create_vectorstore
+from .ingest import ingest_bookmarks_sync
+from .tracing import QUERY_PREVIEW_CHARS, payload_size, start_trace
 
 logger = logging.getLogger(__name__)
 
-AGENT_CONFIG = {"configurable": {"thread_id": "default"}}
+DEFAULT_THREAD_ID = "default"  # conversations without a Gradio session
+
+
+# Flush early once this many characters are buffered, even inside the
+# time window, so long bursts still render progressively.
+STREAM_FLUSH_CHARS = 512
+
+
+class _StreamCoalescer:
+    """Batch streamed tokens so the UI re-renders at most once per interval."""
+
+    def __init__(
+        self,
+        interval: float,
+        max_chars: int = STREAM_FLUSH_CHARS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._interval = interval
+        self._max_chars = max_chars
+        self._clock = clock
+        self._parts: list[str] = []
+        self._pending = 0
+        self._last_flush = clock()
+        self.text = ""
+
+    def add(self, token: str) -> bool:
+        """Buffer *token*; return ``True`` when a flush is due."""
+        self._parts.append(token)
+        self._pending += len(token)
+        return (
+            self._pending >= self._max_chars
+            or self._clock() - self._last_flush >= self._interval
+        )
+
+    def flush(self) -> str:
+        """Fold buffered tokens into :attr:`text` and return the full text."""
+        if self._parts:
+            self.text += "".join(self._parts)
+            self._parts.clear()
+        self._pending = 0
+        self._last_flush = self._clock()
+        return self.text
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._parts)
 
 
 def _build_bot_response(agent):
-    """Return a generator-based bot_response function bound to *agent*."""
-
-    def bot_response(message: str, history: list, k: int) -> str:
-        set_retrieval_k(int(k))
-        accumulated = ""
-        for chunk_event in agent.stream(
-            {"messages": [{"role": "user", "content": message}]},
-            config=AGENT_CONFIG,
-            stream_mode="messages",
-        ):
-            chunk, metadata = chunk_event
-            # Only yield AI text content (skip tool calls / tool results)
-            if isinstance(chunk, AIMessageChunk) and chunk.content:
-                accumulated += chunk.content
-                yield accumulated
-
-        # If nothing was streamed (edge case), fall back to empty string
-        if not accumulated:
-            yield ""
+    """Return an async generator bot_response function bound to *agent*."""
+
+    async def bot_response(message: str, history: list, k: int, request: gr.Request = None):
+        coalescer = _StreamCoalescer(config.STREAM_FLUSH_MS / 1000)
+        # Gradio resumes this generator from different tasks, so the trace
+        # is handed to the agent explicitly rather than via a context variable.
+        trace = start_trace(
+            "bot_response",
+            query=message[:QUERY_PREVIEW_CHARS],
+            input_bytes=payload_size(message),
+            k=int(k),
+        )
+        # Each browser session is its own conversation thread, with its own
+        # result count; nothing here is shared between concurrent chats.
+        session = getattr(request, "session_hash", None) or DEFAULT_THREAD_ID
+        run_config = {"configurable": {"thread_id": session, "retrieval_k": int(k)}}
+        if trace is not None:
+            run_config["configurable"]["trace"] = trace
+            run_config["callbacks"] = [TraceCallbackHandler(trace)]
+        waiting = 0.0  # time spent handing updates to Gradio
+        try:
+            async for chunk_event in agent.astream(
+                {"messages": [{"role": "user", "content": message}]},
+                config=run_config,
+                stream_mode="messages",
+            ):
+                chunk, metadata = chunk_event
+                # Only yield AI text content (skip tool calls / tool results)
+                if isinstance(chunk, AIMessageChunk) and chunk.content:
+                    if trace is not None and "first_chunk_ms" not in trace.attrs:
+                        trace.attrs["first_chunk_ms"] = round(trace.elapsed_ms(), 3)
+                    if coalescer.add(chunk.content):
+                        start = time.perf_counter()
+                        yield coalescer.flush()
+                        waiting += time.perf_counter() - start
+
+            # Emit the tail; also covers the edge case where nothing was streamed
+            if coalescer.has_pending or not coalescer.text:
+                yield coalescer.flush()
+        except BaseException as exc:  # includes the client going away
+            if trace is not None:
+                trace.attrs["error"] = type(exc).__name__
+            raise
+        finally:
+            if trace is not None:
+                trace.finish(
+                    output_bytes=payload_size(coalescer.text),
+                    stream_wait_ms=round(waiting * 1000, 3),
+                )
 
     return bot_response
 
@@ -61,16 +138,14 @@ def main() -> None:
     cached_bookmarks = load_cache(config.BOOKMARKS_CACHE_PATH)
     bookmarks = merge_bookmarks(fresh_bookmarks, cached_bookmarks)
 
-    # -- 3. Descriptions --------------------------------------------------
+    # -- 3-4. Descriptions + vector store (pipelined) ---------------------
     def _save_progress():
         save_cache(bookmarks, config.BOOKMARKS_CACHE_PATH)
 
-    bookmarks = generate_all_descriptions_sync(bookmarks, on_progress=_save_progress)
-    save_cache(bookmarks, config.BOOKMARKS_CACHE_PATH)
-
-    # -- 4. Vector store --------------------------------------------------
-    documents = bookmarks_to_documents(bookmarks)
-    vector_store = load_or_create_vectorstore(documents)
+    try:
+        vector_store = ingest_bookmarks_sync(bookmarks, on_progress=_save_progress)
+    finally:
+        save_cache(bookmarks, config.BOOKMARKS_CACHE_PATH)
 
     # -- 5. Agent ---------------------------------------------------------
     llm = get_llm()
@@ -119,4 +194,10 @@ def main() -> None:
         additional_inputs_accordion=gr.Accordion("Settings", open=False),
     )
 
+    # One async worker serves many chats; the limit only caps how many
+    # agent runs are in flight at once.
+    demo.queue(
+        default_concurrency_limit=config.UI_CONCURRENCY_LIMIT,
+        max_size=config.UI_QUEUE_MAX_SIZE,
+    )
     demo.launch(theme=theme)
@@ -1,97 +1,308 @@
 """FAISS vector store management."""
 
-import json
+import hashlib
 import logging
 from pathlib import Path
 
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
 
 from . import config
+from .bookmarks import bookmark_key, chrome_date, group_by_canonical_url
+from .search import invalidate_filter_index
+from .shards import ShardLayout, load_shards, write_shards
+from .storage import (
+    INDEX_MANIFEST_FILE,
+    INDEX_MANIFEST_VERSION,
+    atomic_write_json,
+    load_index_manifest,
+)
 
 logger = logging.getLogger(__name__)
 
-_INDEXED_URLS_FILE = "indexed_urls.json"
-
 
 def get_embeddings() -> OpenAIEmbeddings:
     """Create an ``OpenAIEmbeddings`` instance with the configured model."""
     return OpenAIEmbeddings(model=config.EMBEDDING_MODEL)
 
 
+def group_to_document(bookmarks: list[dict], indices: list[int]) -> Document:
+    """Build the document for one canonical-URL group of *bookmarks*.
+
+    The oldest copy (``indices[0]``) provides the text, the document id and
+    the ``added`` date; every folder the page is filed under is kept in the
+    ``folders`` metadata.
+    """
+    bm = bookmarks[indices[0]]
+    folder = bm.get("folder", "")
+    page_content = f"{bm['name']}\nFolder: {folder}\n\n{bm['description']}"
+    metadata = {"source": bm["url"], "folder": folder}
+    added = chrome_date(bm.get("date_added", ""))
+    if added:
+        metadata["added"] = added
+    if len(indices) > 1:
+        metadata["folders"] = sorted({bookmarks[i].get("folder", "") for i in indices})
+    return Document(id=bookmark_key(bm), page_content=page_content, metadata=metadata)
+
+
 def bookmarks_to_documents(bookmarks: list[dict]) -> list[Document]:
-    """Convert bookmark dicts into LangChain ``Document`` objects."""
-    docs: list[Document] = []
-    for bm in bookmarks:
-        folder = bm.get("folder", "")
-        page_content = f"{bm['name']}\nFolder: {folder}\n\n{bm['description']}"
-        metadata = {"source": bm["url"], "folder": folder}
-        docs.append(Document(page_content=page_content, metadata=metadata))
+    """Convert bookmark dicts into LangChain ``Document`` objects.
+
+    Bookmarks sharing a canonical URL become a single document, so each page
+    is embedded once.  The document id is the stable key of the oldest copy,
+    so the index can be updated in place when bookmarks are renamed, moved
+    or edited.  Adding or removing a newer copy only changes the
+    ``folders`` metadata; removing the oldest copy hands the document to
+    the next copy, under its key and text, which is a remove plus an embed.
+    """
+    docs = [
+        group_to_document(bookmarks, indices)
+        for indices in group_by_canonical_url(bookmarks).values()
+    ]
+    if len(docs) < len(bookmarks):
+        logger.info(
+            "Duplicate URLs share embeddings: %d documents for %d bookmarks",
+            len(docs), len(bookmarks),
+        )
     return docs
 
 
-def _load_indexed_urls(store_path: Path) -> set[str]:
-    """Load the set of indexed URLs from the sidecar file."""
-    sidecar = store_path / _INDEXED_URLS_FILE
-    if sidecar.exists():
-        with sidecar.open("r", encoding="utf-8") as f:
-            return set(json.load(f))
-    return set()
+def _content_hash(doc: Document) -> str:
+    return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
 
 
-def _save_indexed_urls(store_path: Path, urls: set[str]) -> None:
-    """Persist the set of indexed URLs to the sidecar file."""
-    sidecar = store_path / _INDEXED_URLS_FILE
-    with sidecar.open("w", encoding="utf-8") as f:
-        json.dump(sorted(urls), f, ensure_ascii=False, indent=2)
+def _index_files(index_name: str) -> tuple[str, str]:
+    return f"{index_name}.faiss", f"{index_name}.pkl"
 
 
-def load_or_create_vectorstore(
-    documents: list[Document],
-    store_dir: str | None = None,
-) -> FAISS:
-    """Load an existing FAISS index or create one from *documents*.
+def _load_checkpoint(
+    store_path: Path, manifest: dict, embeddings: Embeddings,
+) -> FAISS | None:
+    """Load the index named by *manifest*, or ``None`` if it is inconsistent.
 
-    New documents are added and stale documents (no longer in *documents*)
-    trigger a full rebuild to keep the index in sync with Chrome bookmarks.
+    Shards are merged into a single in-memory index.  Checks that the files
+    have the recorded sizes and that the loaded index holds exactly the
+    documents listed in the manifest.
     """
-    store_dir = store_dir or config.VECTOR_STORE_DIR
-    store_path = Path(store_dir)
-    embeddings = get_embeddings()
+    for name, size in manifest["files"].items():
+        path = store_path / name
+        if not path.exists() or path.stat().st_size != size:
+            logger.warning("Index checkpoint file %s is missing or truncated", path)
+            return None
+    try:
+        vector_store = load_shards(store_path, manifest["shards"], embeddings)
+    except Exception:
+        logger.warning("Could not load index checkpoint", exc_info=True)
+        return None
+    indexed_ids = set(vector_store.index_to_docstore_id.values())
+    if (
+        vector_store.index.ntotal != len(manifest["documents"])
+        or vector_store.index.ntotal != sum(size for _, size in manifest["shards"])
+        or indexed_ids != manifest["documents"].keys()
+    ):
+        logger.warning("Index checkpoint does not match its manifest")
+        return None
+    return vector_store
+
+
+class IndexUpdater:
+    """Apply per-document changes to the FAISS index at *store_path*.
+
+    Documents are reconciled by id against the manifest of indexed content
+    hashes: unchanged documents are skipped, metadata-only changes (such as
+    a new URL) are patched in the docstore, and only new or edited text is
+    embedded.
 
-    current_urls = {d.metadata["source"] for d in documents}
+    Progress is persisted with :meth:`checkpoint`: each checkpoint writes a
+    new generation of index files and then atomically swaps the manifest to
+    point at them, so a crash at any moment leaves the previous checkpoint
+    intact.  Large indexes are split into shards in insertion order (see
+    :mod:`.shards`); a checkpoint rewrites only the shards whose documents
+    changed, several at a time.  On startup the last
+    checkpoint is verified and resumed; an index that fails the check (or
+    predates manifests) is rebuilt.
+    """
 
-    if store_path.exists():
-        indexed_urls = _load_indexed_urls(store_path)
-        stale_urls = indexed_urls - current_urls
-        new_docs = [d for d in documents if d.metadata["source"] not in indexed_urls]
+    def __init__(self, store_path: Path, embeddings: Embeddings):
+        self.store_path = store_path
+        self.embeddings = embeddings
+        self.vector_store: FAISS | None = None
+        self.manifest: dict[str, str] = {}
+        self.generation = 0
+        self.embedded = self.removed = self.patched = 0
+        self._dirty = False
+        self._complete = True
+        self._layout = ShardLayout()
+        self._files: dict[str, int] = {}
 
-        if stale_urls:
+        manifest = load_index_manifest(store_path)
+        if manifest is None:
+            return
+        self.generation = manifest["generation"]
+        self.vector_store = _load_checkpoint(store_path, manifest, embeddings)
+        if self.vector_store is None:
+            logger.warning("Discarding inconsistent vector store; rebuilding")
+            return
+        self.manifest = manifest["documents"]
+        self._complete = manifest["complete"]
+        self._layout = ShardLayout(
+            manifest["shards"], self.vector_store.index_to_docstore_id.values(),
+        )
+        self._files = manifest["files"]
+        if not self._complete:
             logger.info(
-                "Rebuilding vector store: %d stale documents removed", len(stale_urls),
+                "Resuming interrupted ingest from checkpoint %d "
+                "(%d documents already indexed)",
+                self.generation, len(self.manifest),
             )
-            vector_store = FAISS.from_documents(documents, embeddings)
-            vector_store.save_local(store_path)
-            _save_indexed_urls(store_path, current_urls)
-        elif new_docs:
-            logger.info("Adding %d new documents to vector store", len(new_docs))
-            vector_store = FAISS.load_local(
-                store_path, embeddings, allow_dangerous_deserialization=True,
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.embedded or self.removed or self.patched)
+
+    def _mark_dirty(self) -> None:
+        # Changes must reach the next checkpoint and any derived search state.
+        self._dirty = True
+        invalidate_filter_index(self.vector_store)
+
+    def remove_stale(self, current_ids: set[str]) -> None:
+        """Delete indexed documents whose id is not in *current_ids*."""
+        stale = [doc_id for doc_id in self.manifest if doc_id not in current_ids]
+        if stale:
+            self.vector_store.delete(stale)
+            for doc_id in stale:
+                del self.manifest[doc_id]
+            self._layout.remove(stale)
+            self.removed += len(stale)
+            self._mark_dirty()
+
+    def needs_embedding(self, doc: Document) -> bool:
+        """Return ``True`` if *doc* must be embedded; patch metadata otherwise."""
+        if self.manifest.get(doc.id) != _content_hash(doc):
+            return True
+        stored = self.vector_store.docstore.search(doc.id)
+        if isinstance(stored, Document) and stored.metadata != doc.metadata:
+            self.vector_store.docstore.delete([doc.id])
+            self.vector_store.docstore.add({doc.id: doc})
+            self._layout.touch(doc.id)
+            self.patched += 1
+            self._mark_dirty()
+        return False
+
+    def add(self, docs: list[Document], vectors: list[list[float]]) -> None:
+        """Index *docs* with their precomputed *vectors*, replacing old versions."""
+        replaced = [d.id for d in docs if d.id in self.manifest]
+        if replaced:
+            self.vector_store.delete(replaced)
+            self._layout.remove(replaced)
+        text_embeddings = [(d.page_content, v) for d, v in zip(docs, vectors)]
+        metadatas = [d.metadata for d in docs]
+        ids = [d.id for d in docs]
+        if self.vector_store is None:
+            self.vector_store = FAISS.from_embeddings(
+                text_embeddings, self.embeddings, metadatas=metadatas, ids=ids,
             )
-            vector_store.add_documents(new_docs)
-            vector_store.save_local(store_path)
-            _save_indexed_urls(store_path, indexed_urls | {d.metadata["source"] for d in new_docs})
         else:
-            logger.info("Vector store is up to date")
-            vector_store = FAISS.load_local(
-                store_path, embeddings, allow_dangerous_deserialization=True,
+            self.vector_store.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+        for doc in docs:
+            self.manifest[doc.id] = _content_hash(doc)
+        self._layout.append(ids)
+        self.embedded += len(docs)
+        self._mark_dirty()
+
+    def checkpoint(self, complete: bool = False) -> None:
+        """Durably persist the current index state as a new generation."""
+        if self.vector_store is None:
+            return
+        self.generation += 1
+        self.store_path.mkdir(parents=True, exist_ok=True)
+        layout = self._layout
+        if not self.vector_store.index.ntotal:
+            # Everything was deleted: keep one empty index file.
+            layout = self._layout = ShardLayout([(None, 0)])
+        files, plan, shards = {}, {}, []
+        for shard, (name, (start, stop)) in enumerate(zip(layout.names, layout.ranges())):
+            if start == stop and layout.names != [None]:
+                continue  # emptied; dropped from the manifest
+            old = [self._files.get(f) for f in _index_files(name)] if name else [None]
+            if shard in layout.dirty or None in old:
+                suffix = "" if len(layout.sizes) == 1 else f"-{shard}"
+                name = layout.names[shard] = f"index-{self.generation}{suffix}"
+                plan[name] = (start, stop)
+            else:
+                files.update(zip(_index_files(name), old))
+            shards.append([name, stop - start])
+        files.update(write_shards(self.vector_store, self.store_path, plan))
+        atomic_write_json(self.store_path / INDEX_MANIFEST_FILE, {
+            "version": INDEX_MANIFEST_VERSION,
+            "generation": self.generation,
+            "shards": shards,
+            "files": files,
+            "complete": complete,
+            "documents": self.manifest,
+        }, ensure_ascii=False)
+        self._files = files
+        layout.dirty.clear()
+        if len(shards) < len(layout.sizes):
+            self._layout = ShardLayout(shards, self.vector_store.index_to_docstore_id.values())
+        self._dirty = False
+        self._complete = complete
+        for pattern in ("index*.faiss", "index*.pkl"):
+            for path in self.store_path.glob(pattern):
+                if path.name not in files:
+                    path.unlink(missing_ok=True)
+        logger.debug(
+            "Checkpoint %d: %d documents, %d of %d shards written",
+            self.generation, len(self.manifest), len(plan), len(shards),
+        )
+
+    def save(self) -> FAISS:
+        """Write a final checkpoint if anything changed; return the store."""
+        if self.vector_store is None:
+            raise ValueError("No bookmarks to index")
+        if self._dirty or not self._complete:
+            self.checkpoint(complete=True)
+        if self.changed:
+            logger.info(
+                "Updated vector store: %d embedded, %d removed, %d metadata-only",
+                self.embedded, self.removed, self.patched,
             )
-    else:
-        logger.info("Creating new vector store with %d documents", len(documents))
-        store_path.mkdir(parents=True, exist_ok=True)
-        vector_store = FAISS.from_documents(documents, embeddings)
-        vector_store.save_local(store_path)
-        _save_indexed_urls(store_path, current_urls)
+        else:
+            logger.info("Vector store is up to date")
+        return self.vector_store
 
-    return vector_store
+
+def load_vectorstore(
+    store_dir: str | None = None, embeddings: Embeddings | None = None,
+) -> FAISS | None:
+    """Load the committed index read-only, or ``None`` if there is none.
+
+    Without *embeddings* the store can be inspected but not queried by
+    text, which is enough for maintenance commands and needs no API key.
+    """
+    store_path = Path(store_dir or config.VECTOR_STORE_DIR)
+    manifest = load_index_manifest(store_path)
+    if manifest is None:
+        return None
+    return _load_checkpoint(store_path, manifest, embeddings)
+
+
+def load_or_create_vectorstore(
+    documents: list[Document],
+    store_dir: str | None = None,
+) -> FAISS:
+    """Load an existing FAISS index or create one from *documents*.
+
+    Existing indexes are updated incrementally by document id: removed
+    bookmarks are deleted, changed ones re-embedded and new ones added.
+    """
+    updater = IndexUpdater(Path(store_dir or config.VECTOR_STORE_DIR), get_embeddings())
+    updater.remove_stale({d.id for d in documents})
+    to_embed = [d for d in documents if updater.needs_embedding(d)]
+    if to_embed:
+        logger.info("Embedding %d documents", len(to_embed))
+        vectors = updater.embeddings.embed_documents([d.page_content for d in to_embed])
+        updater.add(to_embed, vectors)
+    return updater.save()
@@ -1,6 +1,20 @@
 """Entry point for the Bookmark AI MCP server (stdio transport)."""
 
-from bookmark_app.mcp_server import mcp
+import argparse
+
+from bookmark_app.mcp_server import mcp, use_snapshot
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--snapshot",
+        nargs="?",
+        const="",
+        metavar="PATH",
+        help="start from a prebuilt state snapshot (default: SNAPSHOT_PATH) "
+        "and check it against Chrome in the background",
+    )
+    args = parser.parse_args()
+    if args.snapshot is not None:
+        use_snapshot(args.snapshot or None)
     mcp.run(transport="stdio")
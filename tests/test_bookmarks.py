@@ -0,0 +1,198 @@
+"""Tests for Chrome bookmark extraction."""
+
+import json
+
+import pytest
+
+from bookmark_app.bookmarks import (
+    ChromeBookmark,
+    canonical_url,
+    diff_bookmarks,
+    extract_bookmarks,
+    group_by_canonical_url,
+    iter_bookmarks,
+    iter_chrome_bookmarks,
+    load_chrome_bookmarks,
+    merge_bookmarks,
+)
+
+
+def _url(id_, name, url, **extra):
+    return {
+        "id": id_,
+        "guid": f"guid-{id_}",
+        "date_added": f"1330000000000000{id_}",
+        "date_last_used": "0",
+        "name": name,
+        "type": "url",
+        "url": url,
+        **extra,
+    }
+
+
+CHROME_DATA = {
+    "roots": {
+        "bookmark_bar": {
+            "children": [
+                _url("1", "GitHub", "https://github.com"),
+                {
+                    "children": [
+                        {
+                            "children": [_url("4", "fast.ai", "https://fast.ai")],
+                            "name": "ML",
+                            "type": "folder",
+                        },
+                        _url("5", "Python", "https://python.org"),
+                    ],
+                    "name": "Learning",
+                    "type": "folder",
+                },
+            ],
+            "name": "Bookmarks bar",
+            "type": "folder",
+        },
+        "other": {"children": [_url("7", "Recipes", "https://recipes.example")]},
+        "synced": {"children": []},
+        "workspaces": {"children": [_url("9", "Board", "https://board.example")]},
+    },
+    "version": 1,
+}
+
+
+@pytest.fixture
+def chrome_file(tmp_path):
+    path = tmp_path / "Bookmarks"
+    path.write_text(json.dumps(CHROME_DATA), encoding="utf-8")
+    return path
+
+
+class TestIterBookmarks:
+    def test_document_order_and_folders(self):
+        nodes = CHROME_DATA["roots"]["bookmark_bar"]["children"]
+        result = [(bm.folder, bm.name) for bm in iter_bookmarks(nodes)]
+        assert result == [
+            ("", "GitHub"),
+            ("/Learning/ML", "fast.ai"),
+            ("/Learning", "Python"),
+        ]
+
+    def test_keeps_chrome_metadata(self):
+        nodes = CHROME_DATA["roots"]["bookmark_bar"]["children"]
+        first = next(iter_bookmarks(nodes))
+        assert first == ChromeBookmark(
+            folder="",
+            name="GitHub",
+            url="https://github.com",
+            id="1",
+            guid="guid-1",
+            date_added="13300000000000001",
+            date_last_used="0",
+        )
+
+    def test_deep_nesting_does_not_recurse(self):
+        node = _url("x", "Deep", "https://deep.example")
+        for i in range(5000):
+            node = {"children": [node], "name": f"f{i}", "type": "folder"}
+        (bm,) = iter_bookmarks([node])
+        assert bm.name == "Deep"
+        assert bm.folder.count("/") == 5000
+
+    def test_extract_bookmarks_returns_dicts(self):
+        result = extract_bookmarks([_url("1", "A", "https://a.example")], "/Top")
+        assert result[0]["folder"] == "/Top"
+        assert result[0]["guid"] == "guid-1"
+
+
+class TestLoadChromeBookmarks:
+    def test_includes_workspaces_root(self, chrome_file):
+        names = [bm["name"] for bm in load_chrome_bookmarks(chrome_file)]
+        assert names == ["GitHub", "fast.ai", "Python", "Recipes", "Board"]
+
+    def test_incremental_matches_full_parse(self, chrome_file):
+        pytest.importorskip("ijson")
+        full = list(iter_chrome_bookmarks(chrome_file, incremental=False))
+        streamed = list(iter_chrome_bookmarks(chrome_file, incremental=True))
+        assert streamed == full
+
+
+def _bm(guid, name, url, folder="/Dev", **extra):
+    return {"folder": folder, "name": name, "url": url, "guid": guid, **extra}
+
+
+class TestDiffBookmarks:
+    def test_classifies_changes_by_guid(self):
+        cached = [
+            _bm("a", "GitHub", "https://github.com", description="Code"),
+            _bm("b", "Docs", "https://docs.example", description="Docs"),
+            _bm("c", "Blog", "https://blog.example", description="Blog"),
+            _bm("d", "Gone", "https://gone.example", description="Gone"),
+            _bm("e", "Same", "https://same.example", description="Same"),
+        ]
+        fresh = [
+            _bm("a", "GitHub Home", "https://github.com"),
+            _bm("b", "Docs", "https://docs.example", folder="/Reference"),
+            _bm("c", "Blog", "https://blog.example/new"),
+            _bm("e", "Same", "https://same.example"),
+            _bm("f", "New", "https://new.example"),
+        ]
+        diff = diff_bookmarks(fresh, cached)
+
+        assert [b["guid"] for b in diff.renamed] == ["a"]
+        assert [b["guid"] for b in diff.moved] == ["b"]
+        assert [b["guid"] for b in diff.url_changed] == ["c"]
+        assert [b["guid"] for b in diff.added] == ["f"]
+        assert [b["guid"] for b in diff.removed] == ["d"]
+        assert diff.unchanged == 1
+
+    def test_changed_entries_keep_description_and_take_fresh_fields(self):
+        cached = [_bm("c", "Blog", "https://blog.example", description="Blog")]
+        fresh = [_bm("c", "Blog", "https://blog.example/new", folder="/Read")]
+        (entry,) = merge_bookmarks(fresh, cached)
+        assert entry["description"] == "Blog"
+        assert entry["url"] == "https://blog.example/new"
+        assert entry["folder"] == "/Read"
+
+    def test_legacy_cache_matches_on_url(self):
+        cached = [{"folder": "/Dev", "name": "Old", "url": "https://x.example",
+                   "description": "X"}]
+        fresh = [_bm("x", "Old", "https://x.example")]
+        diff = diff_bookmarks(fresh, cached)
+        assert not diff.added and not diff.removed
+        assert diff.merged[0]["description"] == "X"
+        assert diff.merged[0]["guid"] == "x"
+
+
+class TestCanonicalUrl:
+    @pytest.mark.parametrize("url", [
+        "http://www.example.com/docs/",
+        "https://example.com/docs",
+        "https://EXAMPLE.com:443/docs?utm_source=x&fbclid=y",
+        "http://example.com:80/docs/",
+    ])
+    def test_variants_collapse(self, url):
+        assert canonical_url(url) == "https://example.com/docs"
+
+    def test_keeps_meaningful_query_sorted(self):
+        assert (
+            canonical_url("https://example.com/search?q=a&page=2&utm_medium=m")
+            == "https://example.com/search?page=2&q=a"
+        )
+
+    def test_keeps_non_default_port_and_fragment(self):
+        assert (
+            canonical_url("http://localhost:8080/app/#/route")
+            == "https://localhost:8080/app#/route"
+        )
+
+    def test_non_web_urls_unchanged(self):
+        assert canonical_url("chrome://settings/") == "chrome://settings/"
+
+    def test_group_orders_oldest_first(self):
+        bookmarks = [
+            _bm("b", "Docs", "https://docs.example/", date_added="200"),
+            _bm("a", "Docs", "http://www.docs.example", date_added="100"),
+            _bm("c", "Other", "https://other.example"),
+        ]
+        groups = group_by_canonical_url(bookmarks)
+        assert groups["https://docs.example"] == [1, 0]
+        assert groups["https://other.example"] == [2]
@@ -0,0 +1,111 @@
+"""Tests for description generation."""
+
+import asyncio
+from types import SimpleNamespace
+
+from bookmark_app.descriptions import _generate_all
+from bookmark_app.fetcher import PageContent
+from bookmark_app.llm_cache import LLMResponseCache
+
+
+class FakeLLM:
+    """Records prompts and answers with a canned description."""
+
+    def __init__(self):
+        self.prompts: list[str] = []
+
+    async def ainvoke(self, prompt: str):
+        self.prompts.append(prompt)
+        return SimpleNamespace(content=f"Description {len(self.prompts)}")
+
+
+def _bm(guid, name, url, folder="/Dev", **extra):
+    return {"guid": guid, "name": name, "url": url, "folder": folder, **extra}
+
+
+class TestGenerateAll:
+    def test_duplicates_share_one_call(self):
+        llm = FakeLLM()
+        bookmarks = [
+            _bm("a", "Docs", "https://docs.example/"),
+            _bm("b", "Docs", "http://www.docs.example", folder="/Reference"),
+            _bm("c", "Blog", "https://blog.example"),
+        ]
+        asyncio.run(_generate_all(bookmarks, llm))
+        assert len(llm.prompts) == 2
+        assert bookmarks[0]["description"] == bookmarks[1]["description"]
+
+    def test_new_duplicate_reuses_existing_description(self):
+        llm = FakeLLM()
+        bookmarks = [
+            _bm("a", "Docs", "https://docs.example", description="Known"),
+            _bm("b", "Docs", "https://docs.example/?utm_source=feed"),
+        ]
+        asyncio.run(_generate_all(bookmarks, llm))
+        assert llm.prompts == []
+        assert bookmarks[1]["description"] == "Known"
+
+    def test_response_cache_skips_llm_for_known_prompts(self, tmp_path):
+        with LLMResponseCache(tmp_path / "cache.sqlite3") as cache:
+            asyncio.run(_generate_all(
+                [_bm("a", "Docs", "https://docs.example")], FakeLLM(), cache=cache,
+            ))
+            # A fresh profile with the same bookmark but no JSON cache
+            llm = FakeLLM()
+            bookmarks = [_bm("z", "Docs", "https://docs.example")]
+            asyncio.run(_generate_all(bookmarks, llm, cache=cache))
+        assert llm.prompts == []
+        assert bookmarks[0]["description"] == "Description 1"
+
+    def test_failures_are_not_cached(self, tmp_path):
+        class FailingLLM(FakeLLM):
+            async def ainvoke(self, prompt):
+                raise RuntimeError("boom")
+
+        with LLMResponseCache(tmp_path / "cache.sqlite3") as cache:
+            bookmarks = [_bm("a", "Docs", "https://docs.example")]
+            asyncio.run(_generate_all(bookmarks, FailingLLM(), cache=cache))
+            assert bookmarks[0]["description"] == "Bookmark: Docs"
+            assert len(cache) == 0
+
+
+class FakeFetcher:
+    """Serves canned pages by URL; unknown URLs fail like a real fetch."""
+
+    concurrency = 4
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.fetched: list[str] = []
+
+    async def fetch(self, url):
+        self.fetched.append(url)
+        return self.pages.get(url)
+
+
+class TestPageContent:
+    def test_fetched_page_is_included_in_prompt(self):
+        llm = FakeLLM()
+        fetcher = FakeFetcher({
+            "https://docs.example": PageContent("Docs home", "Official docs", "Install it."),
+        })
+        bookmarks = [
+            _bm("a", "Docs", "https://docs.example"),
+            _bm("b", "Blog", "https://blog.example"),
+        ]
+        asyncio.run(_generate_all(bookmarks, llm, fetcher=fetcher))
+        assert sorted(fetcher.fetched) == ["https://blog.example", "https://docs.example"]
+        by_name = {p.split("Name: ")[1].split("\n")[0]: p for p in llm.prompts}
+        assert "Page title: Docs home" in by_name["Docs"]
+        assert "Install it." in by_name["Docs"]
+        assert "Page title:" not in by_name["Blog"]
+        assert all("description" in bm for bm in bookmarks)
+
+    def test_duplicates_fetch_once(self):
+        fetcher = FakeFetcher({})
+        bookmarks = [
+            _bm("a", "Docs", "https://docs.example/"),
+            _bm("b", "Docs", "https://docs.example/?utm_source=feed"),
+        ]
+        asyncio.run(_generate_all(bookmarks, FakeLLM(), fetcher=fetcher))
+        assert len(fetcher.fetched) == 1
@@ -0,0 +1,147 @@
+"""Tests for embedding-based near-duplicate detection."""
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from bookmark_app import cli, config, duplicates
+from bookmark_app.duplicates import find_duplicates
+from bookmark_app.mcp_server import AppContext, _find_duplicate_bookmarks_logic
+from bookmark_app.vectorstore import IndexUpdater
+
+DIM = 32
+
+
+def _docs_and_vectors(n=300, seed=0):
+    """*n* random unit vectors with planted near-duplicates.
+
+    Rows 1 and 2 copy row 0, and row 11 copies row 10, each with small noise.
+    """
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+    for dup, src in ((1, 0), (2, 0), (11, 10)):
+        vectors[dup] = vectors[src] + 0.05 * rng.standard_normal(DIM)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    docs = [
+        Document(id=f"d{i}", page_content=f"Page {i}\nFolder: /F\n\nAbout {i}",
+                 metadata={"source": f"https://example.com/{i}", "folder": "/F"})
+        for i in range(n)
+    ]
+    return docs, vectors.tolist()
+
+
+@pytest.fixture
+def indexed(tmp_path):
+    updater = IndexUpdater(tmp_path, DeterministicFakeEmbedding(size=DIM))
+    docs, vectors = _docs_and_vectors()
+    updater.add(docs, vectors)
+    return updater.save(), tmp_path, updater
+
+
+def _groups(clusters):
+    return sorted(sorted(c.ids) for c in clusters)
+
+
+class TestFindDuplicates:
+    def test_finds_planted_clusters(self, indexed):
+        store, _, _ = indexed
+        clusters = find_duplicates(store, 0.95)
+        assert _groups(clusters) == [["d0", "d1", "d2"], ["d10", "d11"]]
+        assert len(clusters[0].ids) == 3  # largest first
+        assert all(0.95 <= c.similarity <= 1.0 for c in clusters)
+
+    def test_approximate_join_matches_exact(self, indexed):
+        store, _, _ = indexed
+        exact = find_duplicates(store, 0.95)
+        approximate = find_duplicates(store, 0.95, exact_limit=0)
+        assert _groups(approximate) == _groups(exact)
+
+    def test_approximate_pairs_are_verified_per_tile(self, monkeypatch):
+        monkeypatch.setattr(duplicates, "TILE_SIZE", 16)
+        monkeypatch.setattr(duplicates, "VERIFY_BATCH", 32)
+        _, vectors = _docs_and_vectors()
+        vectors = np.asarray(vectors, dtype=np.float32)
+        inv = np.ones(len(vectors), dtype=np.float32)
+        a, b, sims = duplicates._approximate_pairs(vectors, inv, 0.8)
+        pairs = list(zip(a.tolist(), b.tolist()))
+        assert len(pairs) == len(set(pairs)) and all(x < y for x, y in pairs)
+        assert (sims >= 0.8).all()
+        ea, eb, _ = duplicates._exact_pairs(vectors, inv, 0.8)
+        exact = set(zip(ea.tolist(), eb.tolist()))
+        assert {(0, 1), (0, 2), (1, 2), (10, 11)} <= set(pairs) <= exact
+
+    def test_exact_join_spans_tiles(self, indexed, monkeypatch):
+        store, _, _ = indexed
+        monkeypatch.setattr(duplicates, "TILE_SIZE", 4)
+        assert _groups(find_duplicates(store, 0.95)) == [["d0", "d1", "d2"], ["d10", "d11"]]
+
+    @pytest.mark.parametrize("threshold", [1.5, 0.5])
+    def test_rejects_bad_threshold(self, indexed, threshold):
+        with pytest.raises(ValueError):
+            find_duplicates(indexed[0], threshold)
+
+    def test_cached_until_generation_changes(self, indexed, monkeypatch):
+        store, path, updater = indexed
+        first = find_duplicates(store, 0.95, path)
+        assert (path / "duplicates.json").exists()
+
+        def fail(*args):
+            raise AssertionError("should have used the cache")
+
+        monkeypatch.setattr(duplicates, "_exact_pairs", fail)
+        assert find_duplicates(store, 0.95, path) == first
+
+        monkeypatch.undo()
+        docs, vectors = _docs_and_vectors(n=301, seed=0)
+        updater.add(docs[300:], vectors[300:])
+        updater.save()
+        monkeypatch.setattr(duplicates, "_exact_pairs", fail)
+        with pytest.raises(AssertionError):
+            find_duplicates(store, 0.95, path)
+
+    def test_cache_is_per_threshold(self, indexed):
+        store, path, _ = indexed
+        find_duplicates(store, 0.95, path)
+        assert _groups(find_duplicates(store, 0.999, path)) == []
+
+
+class TestDuplicateReporting:
+    def test_mcp_logic_lists_clusters(self, indexed, monkeypatch):
+        store, path, _ = indexed
+        monkeypatch.setattr(config, "VECTOR_STORE_DIR", str(path))
+        result = _find_duplicate_bookmarks_logic(AppContext(vector_store=store), 0.95)
+        assert result.startswith("2 groups")
+        assert "[Page 0](https://example.com/0)" in result
+
+    def test_mcp_logic_reports_invalid_threshold(self, indexed, monkeypatch):
+        store, path, _ = indexed
+        monkeypatch.setattr(config, "VECTOR_STORE_DIR", str(path))
+        assert _find_duplicate_bookmarks_logic(
+            AppContext(vector_store=store), 0,
+        ).startswith("Invalid threshold")
+
+    def test_cli_reads_committed_index(self, indexed, monkeypatch, capsys):
+        _, path, _ = indexed
+        monkeypatch.setattr(config, "load_env", lambda: None)
+        monkeypatch.setattr(config, "VECTOR_STORE_DIR", str(path))
+        assert cli.main(["duplicates", "--threshold", "0.95"]) == 0
+        out = capsys.readouterr().out
+        assert "https://example.com/11" in out
+        assert "2 duplicate groups among 300 pages" in out
+
+    @pytest.mark.parametrize("value", ["1.5", "0", "0.5", "high"])
+    def test_cli_rejects_bad_threshold(self, value, monkeypatch, capsys):
+        monkeypatch.setattr(config, "load_env", lambda: None)
+        with pytest.raises(SystemExit) as exc:
+            cli.main(["duplicates", "--threshold", value])
+        assert exc.value.code == 2
+        assert "--threshold" in capsys.readouterr().err
+
+    def test_cli_reports_bad_default_threshold(self, indexed, monkeypatch, capsys):
+        _, path, _ = indexed
+        monkeypatch.setattr(config, "load_env", lambda: None)
+        monkeypatch.setattr(config, "VECTOR_STORE_DIR", str(path))
+        monkeypatch.setattr(config, "DUPLICATE_THRESHOLD", 2.0)
+        assert cli.main(["duplicates"]) == 2
+        assert capsys.readouterr().err.startswith("Invalid threshold")
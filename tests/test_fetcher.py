@@ -0,0 +1,244 @@
+"""Tests for the page fetcher, against a local HTTP server."""
+
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from bookmark_app import fetcher as fetcher_module
+from bookmark_app.fetcher import PageCache, PageFetcher, PageText
+
+ARTICLE = b"""<!doctype html>
+<html><head>
+<title>Async &amp; You</title>
+<meta name="description" content="A guide to async Python.">
+<script>var tracking = "should not appear";</script>
+<style>body { color: red }</style>
+</head><body>
+<nav><a href="/">Home</a> <a href="/about">Navigation link</a></nav>
+<header>Site banner</header>
+<main><h1>Async and you</h1>
+<p>Event loops schedule coroutines cooperatively.</p>
+<p>""" + b"Tasks yield at await points. " * 20 + b"""</p></main>
+<footer>Copyright footer</footer>
+</body></html>"""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "Stand-in"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body: bytes, content_type="text/html; charset=utf-8", **headers):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name.replace("_", "-"), value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        state = self.server.state
+        state["requests"].append(self.path)
+        if self.path == "/article":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self._send(ARTICLE, ETag='"v1"')
+        elif self.path == "/dated":
+            stamp = "Wed, 01 Jan 2025 00:00:00 GMT"
+            if self.headers.get("If-Modified-Since") == stamp:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self._send(b"<title>Dated</title><p>Old news.</p>", Last_Modified=stamp)
+        elif self.path == "/latin1":
+            self._send("<title>Café</title>".encode("latin-1"),
+                       content_type="text/html; charset=iso-8859-1")
+        elif self.path == "/pdf":
+            self._send(b"%PDF-1.4", content_type="application/pdf")
+        elif self.path == "/missing":
+            self.send_error(404)
+        elif self.path == "/slow":
+            time.sleep(1.0)
+            self._send(b"<title>Late</title>")
+        elif self.path == "/huge":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.end_headers()
+            chunk = b"<div>" + b"x" * 1000 + b"</div>"
+            try:
+                for _ in range(50_000):  # ~50 MB if read to the end
+                    self.wfile.write(chunk)
+                    state["huge_sent"] += len(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+        elif self.path.startswith("/busy"):
+            with state["lock"]:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.15)
+            with state["lock"]:
+                state["active"] -= 1
+            self._send(b"<title>Busy</title>")
+        else:
+            self.send_error(404)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    httpd.state = {
+        "requests": [], "huge_sent": 0, "active": 0, "peak": 0,
+        "lock": threading.Lock(),
+    }
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _fetch(urls, cache=None, **kwargs):
+    async def run():
+        async with PageFetcher(cache, **kwargs) as f:
+            return await asyncio.gather(*(f.fetch(u) for u in urls))
+
+    return asyncio.run(run())
+
+
+class TestPageText:
+    def test_prefers_main_and_skips_chrome(self):
+        parser = PageText()
+        parser.feed(ARTICLE.decode())
+        page = parser.result()
+        assert page.title == "Async & You"
+        assert page.description == "A guide to async Python."
+        assert page.text.startswith("Async and you Event loops")
+        for noise in ("tracking", "color", "Navigation", "banner", "footer"):
+            assert noise not in page.text
+
+    def test_falls_back_to_body_without_main(self):
+        parser = PageText()
+        parser.feed("<body><nav>menu</nav><p>Plain</p><p>page</p></body>")
+        assert parser.result().text == "Plain page"
+
+    def test_chunked_input_matches_whole(self):
+        whole, chunked = PageText(), PageText()
+        whole.feed(ARTICLE.decode())
+        for i in range(0, len(ARTICLE), 7):
+            chunked.feed(ARTICLE[i:i + 7].decode())
+        assert chunked.result() == whole.result()
+
+    def test_text_is_bounded(self):
+        parser = PageText(max_chars=100)
+        parser.feed("<p>" + "word " * 1000 + "</p>")
+        assert parser.full
+        assert len(parser.result().text) <= 100
+
+
+class TestPageFetcher:
+    def test_extracts_title_and_text(self, server):
+        _, base = server
+        (page,) = _fetch([f"{base}/article"])
+        assert page.title == "Async & You"
+        assert "Event loops" in page.text
+
+    def test_uses_declared_charset(self, server):
+        _, base = server
+        (page,) = _fetch([f"{base}/latin1"])
+        assert page.title == "Café"
+
+    def test_failures_return_none(self, server):
+        _, base = server
+        results = _fetch(
+            [f"{base}/pdf", f"{base}/missing", f"{base}/slow", "ftp://example.com/x"],
+            timeout=0.3,
+        )
+        assert results == [None, None, None, None]
+
+    def test_invalid_urls_return_none(self):
+        assert _fetch(["http://a\x01b.com/", "http://[::1/"]) == [None, None]
+
+    def test_size_cap_stops_download(self, server):
+        httpd, base = server
+        start = time.perf_counter()
+        (page,) = _fetch([f"{base}/huge"], max_bytes=64 * 1024)
+        assert time.perf_counter() - start < 5
+        assert page is not None and len(page.text) <= fetcher_module.MAX_TEXT_CHARS
+        time.sleep(0.2)
+        assert httpd.state["huge_sent"] < 10_000_000
+
+    def test_per_host_limit(self, server):
+        httpd, base = server
+        _fetch([f"{base}/busy{i}" for i in range(6)], per_host=2, concurrency=10)
+        assert httpd.state["peak"] <= 2
+
+    def test_busy_host_does_not_hold_global_slots(self, server):
+        httpd, base = server
+        other = base.replace("127.0.0.1", "localhost")
+        urls = [f"{base}/busy{i}" for i in range(4)] + [f"{other}/busy"]
+
+        async def run():
+            async with PageFetcher(per_host=1, concurrency=2) as f:
+                tasks = [asyncio.create_task(f.fetch(u)) for u in urls]
+                await tasks[-1]
+                done = sum(t.done() for t in tasks[:-1])
+                await asyncio.gather(*tasks)
+                return done
+
+        # The other host gets the free global slot instead of queueing
+        # behind every request to the busy one.
+        assert asyncio.run(run()) <= 2
+
+    def test_concurrent_across_slots(self, server):
+        httpd, base = server
+        _fetch([f"{base}/busy{i}" for i in range(6)], per_host=6, concurrency=10)
+        assert httpd.state["peak"] > 2
+
+
+class TestPageCache:
+    def test_fresh_entries_skip_the_network(self, server, tmp_path):
+        httpd, base = server
+        with PageCache(tmp_path / "pages.sqlite3") as cache:
+            _fetch([f"{base}/article"], cache)
+            (page,) = _fetch([f"{base}/article"], cache)
+        assert httpd.state["requests"] == ["/article"]
+        assert page.title == "Async & You"
+
+    def test_revalidates_with_etag(self, server, tmp_path, monkeypatch):
+        httpd, base = server
+        monkeypatch.setattr(fetcher_module, "REVALIDATE_AFTER", 0)
+        with PageCache(tmp_path / "pages.sqlite3") as cache:
+            _fetch([f"{base}/article"], cache)
+
+            async def run():
+                async with PageFetcher(cache) as f:
+                    return await f.fetch(f"{base}/article"), f.stats
+
+            page, stats = asyncio.run(run())
+        assert stats["not_modified"] == 1
+        assert "Event loops" in page.text
+
+    def test_revalidates_with_last_modified(self, server, tmp_path, monkeypatch):
+        httpd, base = server
+        monkeypatch.setattr(fetcher_module, "REVALIDATE_AFTER", 0)
+        with PageCache(tmp_path / "pages.sqlite3") as cache:
+            _fetch([f"{base}/dated"], cache)
+            (page,) = _fetch([f"{base}/dated"], cache)
+        assert page.title == "Dated"
+        assert len(httpd.state["requests"]) == 2
+
+    def test_failed_refetch_serves_stale_copy(self, server, tmp_path, monkeypatch):
+        _, base = server
+        monkeypatch.setattr(fetcher_module, "REVALIDATE_AFTER", 0)
+        with PageCache(tmp_path / "pages.sqlite3") as cache:
+            cache.put(f"{base}/missing", fetcher_module.PageContent("Old", "", "Kept"))
+            (page,) = _fetch([f"{base}/missing"], cache)
+        assert page.text == "Kept"
@@ -0,0 +1,151 @@
+"""Tests for the pipelined ingest."""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+
+from bookmark_app import ingest as ingest_module
+from bookmark_app.ingest import ingest, ingest_bookmarks_sync
+from bookmark_app.vectorstore import IndexUpdater
+
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, prompt: str):
+        self.calls += 1
+        await asyncio.sleep(0.002)
+        return SimpleNamespace(content=f"About: {prompt.splitlines()[2]}")
+
+
+class RecordingEmbeddings(Embeddings):
+    """Fake async embeddings that record batch sizes and LLM progress."""
+
+    def __init__(self, llm: FakeLLM | None = None):
+        self._fake = DeterministicFakeEmbedding(size=8)
+        self.llm = llm
+        self.batches: list[int] = []
+        self.calls_at_embed: list[int] = []
+
+    def embed_documents(self, texts):
+        return self._fake.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self._fake.embed_query(text)
+
+    async def aembed_documents(self, texts):
+        self.batches.append(len(texts))
+        self.calls_at_embed.append(self.llm.calls if self.llm else 0)
+        return self.embed_documents(texts)
+
+
+def _bm(guid, name, url, folder="/Dev"):
+    return {"guid": guid, "name": name, "url": url, "folder": folder}
+
+
+def _bookmarks(n):
+    return [_bm(str(i), f"Page {i}", f"https://example.com/{i}") for i in range(n)]
+
+
+@pytest.fixture
+def embeddings(monkeypatch):
+    monkeypatch.setattr(ingest_module, "open_default_cache", lambda: None)
+    return RecordingEmbeddings()
+
+
+class TestIngest:
+    def test_describes_and_indexes_everything(self, tmp_path, embeddings):
+        bookmarks = _bookmarks(20) + [_bm("dup", "Page 0", "http://www.example.com/0/")]
+        llm = FakeLLM()
+        store = ingest_bookmarks_sync(
+            bookmarks, store_dir=str(tmp_path), llm=llm, embeddings=embeddings,
+        )
+        assert llm.calls == 20
+        assert all("description" in bm for bm in bookmarks)
+        assert store.index.ntotal == 20
+        assert sum(embeddings.batches) == 20
+
+    def test_second_run_embeds_nothing(self, tmp_path, embeddings):
+        bookmarks = _bookmarks(5)
+        ingest_bookmarks_sync(bookmarks, store_dir=str(tmp_path), llm=FakeLLM(),
+                              embeddings=embeddings)
+        embeddings.batches.clear()
+        llm = FakeLLM()
+        store = ingest_bookmarks_sync(bookmarks, store_dir=str(tmp_path), llm=llm,
+                                      embeddings=embeddings)
+        assert llm.calls == 0
+        assert embeddings.batches == []
+        assert store.index.ntotal == 5
+
+    def test_embedding_overlaps_description(self, tmp_path, embeddings, monkeypatch):
+        monkeypatch.setattr(ingest_module, "EMBED_BATCH_SIZE", 4)
+        llm = FakeLLM()
+        embeddings.llm = llm
+        updater = IndexUpdater(tmp_path, embeddings)
+        asyncio.run(ingest(_bookmarks(40), llm, updater))
+        assert updater.vector_store.index.ntotal == 40
+        # The first batch was embedded long before the LLM finished
+        assert embeddings.calls_at_embed[0] < 40
+        assert max(embeddings.batches) <= 4
+
+    def test_resumes_from_checkpoint_after_crash(self, tmp_path, embeddings, monkeypatch):
+        monkeypatch.setattr(ingest_module, "EMBED_BATCH_SIZE", 5)
+        monkeypatch.setattr(ingest_module, "EMBED_CONCURRENCY", 1)
+        monkeypatch.setattr(ingest_module, "CHECKPOINT_EVERY", 10)
+
+        class CrashingEmbeddings(RecordingEmbeddings):
+            async def aembed_documents(self, texts):
+                if len(self.batches) == 4:
+                    raise KeyboardInterrupt
+                return await super().aembed_documents(texts)
+
+        bookmarks = _bookmarks(40)
+        with pytest.raises(KeyboardInterrupt):
+            ingest_bookmarks_sync(bookmarks, store_dir=str(tmp_path), llm=FakeLLM(),
+                                  embeddings=CrashingEmbeddings())
+
+        store = ingest_bookmarks_sync(bookmarks, store_dir=str(tmp_path), llm=FakeLLM(),
+                                      embeddings=embeddings)
+        assert store.index.ntotal == 40
+        # The 20 documents checkpointed before the crash are not embedded again
+        assert sum(embeddings.batches) == 20
+
+    def test_checkpoints_off_the_event_loop(self, tmp_path, embeddings, monkeypatch):
+        monkeypatch.setattr(ingest_module, "EMBED_BATCH_SIZE", 5)
+        monkeypatch.setattr(ingest_module, "CHECKPOINT_EVERY", 10)
+        updater = IndexUpdater(tmp_path, embeddings)
+        checkpoint, needs_embedding = updater.checkpoint, updater.needs_embedding
+        writing = threading.Event()
+        threads, overlaps = [], []
+
+        def slow_checkpoint(*args, **kwargs):
+            threads.append(threading.current_thread())
+            writing.set()
+            time.sleep(0.05)
+            checkpoint(*args, **kwargs)
+            writing.clear()
+
+        def guarded_needs_embedding(doc):
+            overlaps.append(writing.is_set())
+            return needs_embedding(doc)
+
+        monkeypatch.setattr(updater, "checkpoint", slow_checkpoint)
+        monkeypatch.setattr(updater, "needs_embedding", guarded_needs_embedding)
+        asyncio.run(ingest(_bookmarks(40), FakeLLM(), updater))
+        assert threads and threading.main_thread() not in threads
+        assert len(overlaps) == 40 and not any(overlaps)
+        assert updater.save().index.ntotal == 40
+
+    @pytest.mark.parametrize("interval, saves", [(0, 4), (60, 0)])
+    def test_progress_saves_are_throttled(self, tmp_path, embeddings, monkeypatch,
+                                          interval, saves):
+        monkeypatch.setattr(ingest_module, "PROGRESS_INTERVAL", interval)
+        calls = []
+        updater = IndexUpdater(tmp_path, embeddings)
+        asyncio.run(ingest(_bookmarks(40), FakeLLM(), updater, lambda: calls.append(1)))
+        assert len(calls) == saves
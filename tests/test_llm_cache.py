@@ -0,0 +1,65 @@
+"""Tests for the persistent LLM response cache."""
+
+import pytest
+
+from bookmark_app.llm_cache import LLMResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with LLMResponseCache(tmp_path / "cache.sqlite3", max_entries=3) as c:
+        yield c
+
+
+class TestLLMResponseCache:
+    def test_key_depends_on_model_version_and_prompt(self):
+        base = LLMResponseCache.make_key("gpt-4.1", 1, "prompt")
+        assert base == LLMResponseCache.make_key("gpt-4.1", 1, "prompt")
+        assert base != LLMResponseCache.make_key("gpt-4.1-mini", 1, "prompt")
+        assert base != LLMResponseCache.make_key("gpt-4.1", 2, "prompt")
+        assert base != LLMResponseCache.make_key("gpt-4.1", 1, "prompt!")
+
+    def test_put_and_get(self, cache):
+        assert cache.get("k") is None
+        cache.put("k", "m", "response")
+        assert cache.get("k") == "response"
+        assert len(cache) == 1
+
+    def test_evicts_least_recently_used(self, cache):
+        for key in ("a", "b", "c"):
+            cache.put(key, "m", key.upper())
+        cache.get("a")
+        cache.put("d", "m", "D")
+        assert len(cache) == 3
+        assert cache.get("b") is None
+        assert cache.get("a") == "A"
+
+    def test_export_import_roundtrip(self, cache, tmp_path):
+        cache.put("a", "m", "A")
+        cache.put("b", "m", "B")
+        exported = tmp_path / "export.jsonl"
+        assert cache.export_entries(exported) == 2
+
+        with LLMResponseCache(tmp_path / "other.sqlite3") as other:
+            other.put("a", "m", "kept")
+            assert other.import_entries(exported) == 1
+            assert other.get("a") == "kept"
+            assert other.get("b") == "B"
+
+    def test_malformed_import_rolls_back(self, cache, tmp_path):
+        cache.put("a", "m", "A")
+        bad = tmp_path / "bad.jsonl"
+        bad.write_text('{"key": "b", "model": "m", "response": "B"}\nnot json\n')
+        with pytest.raises(ValueError):
+            cache.import_entries(bad)
+        assert cache.get("b") is None
+        assert len(cache) == 1
+        cache.put("c", "m", "C")  # no transaction left open
+        assert cache.get("c") == "C"
+
+    def test_persists_across_instances(self, tmp_path):
+        path = tmp_path / "cache.sqlite3"
+        with LLMResponseCache(path) as first:
+            first.put("k", "m", "v")
+        with LLMResponseCache(path) as second:
+            assert second.get("k") == "v"
@@ -1,9 +1,15 @@
 """Tests for MCP server tool logic."""
 
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
 from unittest.mock import MagicMock
 
+import numpy as np
 import pytest
 
+from bookmark_app import mcp_server, snapshot
 from bookmark_app.mcp_server import (
     AppContext,
     _get_bookmark_stats_logic,
@@ -77,41 +83,89 @@ class TestGetBookmarkStats:
         assert "/Tools/Dev: 2" in result
 
 
+def _mock_store(docs):
+    """A vector store mock whose FAISS index returns *docs* in order."""
+    mock_vs = MagicMock()
+    mock_vs.embedding_function.embed_query.return_value = [0.0, 0.0]
+    mock_vs.index.search.return_value = (
+        np.zeros((1, len(docs))), np.arange(len(docs)).reshape(1, -1),
+    )
+    mock_vs.index_to_docstore_id = dict(enumerate(docs))
+    mock_vs.docstore.search.side_effect = lambda doc: doc
+    return mock_vs
+
+
 class TestSearchBookmarks:
     def test_search_returns_results(self, app_ctx):
         mock_doc = MagicMock()
         mock_doc.page_content = "GitHub\nFolder: /Tools/Dev\n\nCode hosting platform."
         mock_doc.metadata = {"source": "https://github.com", "folder": "/Tools/Dev"}
 
-        mock_vs = MagicMock()
-        mock_vs.similarity_search.return_value = [mock_doc]
+        mock_vs = _mock_store([mock_doc])
         app_ctx.vector_store = mock_vs
 
         result = _search_bookmarks_logic(app_ctx, query="code hosting", k=5)
         assert "GitHub" in result
         assert "github.com" in result
-        mock_vs.similarity_search.assert_called_once_with("code hosting", k=5)
+        mock_vs.embedding_function.embed_query.assert_called_once_with("code hosting")
+        assert mock_vs.index.search.call_args.args[1] == 5
 
     def test_search_no_results(self, app_ctx):
-        mock_vs = MagicMock()
-        mock_vs.similarity_search.return_value = []
-        app_ctx.vector_store = mock_vs
+        app_ctx.vector_store = _mock_store([])
 
         result = _search_bookmarks_logic(app_ctx, query="nonexistent", k=5)
         assert "No bookmarks found" in result
 
     def test_search_clamps_k(self, app_ctx):
-        mock_vs = MagicMock()
-        mock_vs.similarity_search.return_value = []
+        mock_vs = _mock_store([])
         app_ctx.vector_store = mock_vs
 
         _search_bookmarks_logic(app_ctx, query="test", k=50)
-        mock_vs.similarity_search.assert_called_once_with("test", k=30)
+        assert mock_vs.index.search.call_args.args[1] == 30
 
     def test_search_clamps_k_minimum(self, app_ctx):
-        mock_vs = MagicMock()
-        mock_vs.similarity_search.return_value = []
+        mock_vs = _mock_store([])
         app_ctx.vector_store = mock_vs
 
         _search_bookmarks_logic(app_ctx, query="test", k=-5)
-        mock_vs.similarity_search.assert_called_once_with("test", k=1)
+        assert mock_vs.index.search.call_args.args[1] == 1
+
+
+class TestRefresh:
+    def test_background_and_requested_refreshes_do_not_overlap(self, monkeypatch):
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0, "builds": 0}
+
+        def build():
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.05)
+            with lock:
+                state["active"] -= 1
+                state["builds"] += 1
+            return AppContext(bookmarks=list(SAMPLE_BOOKMARKS), vector_store=MagicMock())
+
+        monkeypatch.setattr(mcp_server, "_build_app_state", build)
+        monkeypatch.setattr(mcp_server, "_build_lock", asyncio.Lock())
+        monkeypatch.setattr(mcp_server.config, "get_bookmarks_path", lambda: "Bookmarks")
+        monkeypatch.setattr(snapshot, "chrome_fingerprint", lambda path: {"changed": True})
+        app = AppContext()
+        ctx = SimpleNamespace(request_context=SimpleNamespace(lifespan_context=app))
+
+        async def run():
+            stale = SimpleNamespace(chrome={})
+            await asyncio.gather(
+                mcp_server._refresh_if_stale(app, stale), mcp_server.refresh_bookmarks(ctx),
+            )
+
+        asyncio.run(run())
+        assert state["builds"] == 2 and state["peak"] == 1
+        assert len(app.bookmarks) == 3
+
+    def test_refresh_detaches_the_snapshot_store(self, monkeypatch):
+        store = MagicMock(spec=snapshot.SnapshotStore)
+        monkeypatch.setattr(mcp_server, "_build_app_state", AppContext)
+        app = AppContext(vector_store=store)
+        asyncio.run(mcp_server._rebuild_app_state(app))
+        store.detach.assert_called_once_with()
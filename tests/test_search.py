@@ -0,0 +1,207 @@
+"""Tests for prefiltered and diversity-reranked search."""
+
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+
+from bookmark_app.bookmarks import chrome_date
+from bookmark_app.mcp_server import AppContext, _search_bookmarks_logic
+from bookmark_app.search import (
+    SearchFilters,
+    diverse_search,
+    filtered_search,
+    get_filter_index,
+    mmr_rerank,
+)
+from bookmark_app.vectorstore import IndexUpdater, bookmarks_to_documents
+
+
+def _chrome_ts(day: str) -> str:
+    dt = datetime.fromisoformat(day).replace(tzinfo=timezone.utc)
+    return str((int(dt.timestamp()) + 11_644_473_600) * 1_000_000)
+
+
+BOOKMARKS = [
+    {"guid": "a", "name": "GitHub", "url": "https://github.com/", "folder": "/Bar/Dev",
+     "description": "Code hosting.", "date_added": _chrome_ts("2021-03-01")},
+    {"guid": "b", "name": "Gist", "url": "https://gist.github.com/x", "folder": "/Bar/Dev/Snippets",
+     "description": "Code snippets.", "date_added": _chrome_ts("2023-07-15")},
+    {"guid": "c", "name": "fast.ai", "url": "https://www.fast.ai/", "folder": "/Bar/ML",
+     "description": "Deep learning courses.", "date_added": _chrome_ts("2022-01-10")},
+    {"guid": "d", "name": "arXiv", "url": "https://arxiv.org/", "folder": "/Other",
+     "description": "Preprints.", "date_added": "0"},
+]
+
+
+@pytest.fixture
+def store():
+    return FAISS.from_documents(
+        bookmarks_to_documents(BOOKMARKS), DeterministicFakeEmbedding(size=16),
+    )
+
+
+class _CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.fake = DeterministicFakeEmbedding(size=16)
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return self.fake.embed_documents(texts)
+
+    def embed_query(self, text):
+        self.calls.append([text])
+        return self.fake.embed_query(text)
+
+
+def _ids(docs):
+    return sorted(d.id for d in docs)
+
+
+class TestChromeDate:
+    def test_converts_chrome_timestamp(self):
+        assert chrome_date(_chrome_ts("2022-06-18")) == "2022-06-18"
+
+    def test_missing_is_empty(self):
+        assert chrome_date("") == ""
+        assert chrome_date("0") == ""
+
+
+class TestFilteredSearch:
+    def test_folder_matches_subtree_case_insensitively(self, store):
+        docs = filtered_search(store, "code", 10, SearchFilters(folder="/bar/dev/"))
+        assert _ids(docs) == ["a", "b"]
+
+    def test_folder_does_not_match_name_prefix(self, store):
+        assert filtered_search(store, "code", 10, SearchFilters(folder="/Bar/De")) == []
+
+    def test_domain_matches_subdomains_and_strips_www(self, store):
+        assert _ids(filtered_search(store, "q", 10, SearchFilters(domain="github.com"))) == ["a", "b"]
+        assert _ids(filtered_search(store, "q", 10, SearchFilters(domain="www.fast.ai"))) == ["c"]
+
+    def test_date_range_is_half_open(self, store):
+        filters = SearchFilters(added_after="2021-03-01", added_before="2023-07-15")
+        assert _ids(filtered_search(store, "q", 10, filters)) == ["a", "c"]
+
+    def test_undated_bookmarks_excluded_from_date_filters(self, store):
+        docs = filtered_search(store, "q", 10, SearchFilters(added_after="1990-01-01"))
+        assert "d" not in _ids(docs)
+
+    def test_filters_combine(self, store):
+        filters = SearchFilters(folder="/Bar", domain="github.com", added_after="2022-01-01")
+        assert _ids(filtered_search(store, "q", 10, filters)) == ["b"]
+
+    def test_k_is_respected_within_filter(self, store):
+        docs = filtered_search(store, "code", 1, SearchFilters(folder="/Bar"))
+        assert len(docs) == 1
+        expected = filtered_search(store, "code", 3, SearchFilters(folder="/Bar"))[0]
+        assert docs[0].id == expected.id
+
+    def test_ranking_matches_unfiltered_order(self, store):
+        unfiltered = [d.id for d in store.similarity_search("code", k=4) if d.id != "d"]
+        filtered = filtered_search(store, "code", 4, SearchFilters(added_after="2000-01-01"))
+        assert [d.id for d in filtered] == unfiltered
+
+    def test_invalid_date_raises(self, store):
+        with pytest.raises(ValueError, match="added_after"):
+            filtered_search(store, "q", 5, SearchFilters(added_after="last week"))
+
+    def test_filter_index_is_cached_until_index_changes(self, store):
+        first = get_filter_index(store)
+        assert get_filter_index(store) is first
+        store.add_documents(bookmarks_to_documents([
+            {"guid": "e", "name": "Docs", "url": "https://docs.python.org", "folder": "/Other",
+             "description": "Python docs."},
+        ]))
+        rebuilt = get_filter_index(store)
+        assert rebuilt is not first
+        assert list(rebuilt.domains["python.org"]) == [4]
+
+    def test_updater_changes_invalidate_the_filter_index(self, tmp_path):
+        embeddings = DeterministicFakeEmbedding(size=16)
+        updater = IndexUpdater(tmp_path, embeddings)
+        docs = bookmarks_to_documents(BOOKMARKS)
+        updater.add(docs, embeddings.embed_documents([d.page_content for d in docs]))
+        store = updater.vector_store
+        assert _ids(filtered_search(store, "q", 5, SearchFilters(domain="arxiv.org"))) == ["d"]
+
+        # URL change: same text, so only the docstore metadata is patched
+        metadata = {**docs[3].metadata, "source": "https://biorxiv.org/"}
+        moved = docs[3].model_copy(update={"metadata": metadata})
+        assert not updater.needs_embedding(moved)
+        assert filtered_search(store, "q", 5, SearchFilters(domain="arxiv.org")) == []
+        assert _ids(filtered_search(store, "q", 5, SearchFilters(domain="biorxiv.org"))) == ["d"]
+
+        # Delete plus add keeps the size but moves the rows
+        updater.remove_stale({"a", "b", "c"})
+        [new] = bookmarks_to_documents([
+            {"guid": "e", "name": "Docs", "url": "https://docs.python.org", "folder": "/Other",
+             "description": "Python docs."},
+        ])
+        updater.add([new], embeddings.embed_documents([new.page_content]))
+        assert store.index.ntotal == 4
+        assert _ids(filtered_search(store, "q", 5, SearchFilters(folder="/Other"))) == ["e"]
+
+
+class TestMMR:
+    def test_skips_near_duplicates(self):
+        query = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+        candidates = np.array([
+            [1.0, 0.10, 0.0],   # most relevant
+            [1.0, 0.11, 0.0],   # near-duplicate of the first
+            [1.0, 0.0, 0.6],    # less relevant, different direction
+        ], dtype=np.float32)
+        assert mmr_rerank(query, candidates, 2, 0.5) == [0, 2]
+
+    def test_lambda_one_is_pure_relevance(self):
+        rng = np.random.default_rng(0)
+        query = rng.standard_normal(8).astype(np.float32)
+        candidates = rng.standard_normal((20, 8)).astype(np.float32)
+        normed = candidates / np.linalg.norm(candidates, axis=1, keepdims=True)
+        expected = list(np.argsort(-(normed @ query))[:5])
+        assert mmr_rerank(query, candidates, 5, 1.0) == expected
+
+    def test_returns_each_candidate_once(self):
+        candidates = np.ones((3, 4), dtype=np.float32)
+        assert sorted(mmr_rerank(np.ones(4, np.float32), candidates, 10, 0.5)) == [0, 1, 2]
+
+    def test_empty_pool(self):
+        assert mmr_rerank(np.ones(4, np.float32), np.empty((0, 4), np.float32), 3, 0.5) == []
+
+    def test_diverse_search_respects_filters(self, store):
+        docs = diverse_search(store, "code", 5, SearchFilters(domain="github.com"))
+        assert _ids(docs) == ["a", "b"]
+
+    def test_diverse_search_without_reembedding(self):
+        embeddings = _CountingEmbeddings()
+        store = FAISS.from_documents(bookmarks_to_documents(BOOKMARKS), embeddings)
+        embeddings.calls.clear()
+        assert len(diverse_search(store, "code", 3, pool_size=4)) == 3
+        assert embeddings.calls == [["code"]]
+
+
+class TestSearchToolFilters:
+    def test_filters_reach_search(self, store):
+        app = AppContext(bookmarks=BOOKMARKS, vector_store=store)
+        result = _search_bookmarks_logic(app, "courses", folder="/Bar/ML")
+        assert "fast.ai" in result
+        assert "GitHub" not in result
+
+    def test_no_match_mentions_filters(self, store):
+        app = AppContext(bookmarks=BOOKMARKS, vector_store=store)
+        result = _search_bookmarks_logic(app, "q", domain="example.com")
+        assert "filters" in result
+
+    def test_invalid_filter_is_reported(self, store):
+        app = AppContext(bookmarks=BOOKMARKS, vector_store=store)
+        assert _search_bookmarks_logic(app, "q", added_before="2024-13-01").startswith(
+            "Invalid filter"
+        )
+
+    def test_diverse_mode(self, store):
+        app = AppContext(bookmarks=BOOKMARKS, vector_store=store)
+        result = _search_bookmarks_logic(app, "code", k=4, diverse=True)
+        assert result.count("](") == 4
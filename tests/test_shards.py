@@ -0,0 +1,186 @@
+"""Tests for sharded index checkpoints."""
+
+import json
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from bookmark_app import config, shards
+from bookmark_app.shards import ShardLayout
+from bookmark_app.vectorstore import IndexUpdater, load_vectorstore
+
+DIM = 8
+
+
+def _docs(count, start=0, text="About page"):
+    docs = [
+        Document(id=f"doc-{i}", page_content=f"{text} {i}", metadata={"source": f"https://x/{i}"})
+        for i in range(start, start + count)
+    ]
+    vectors = [
+        np.random.default_rng(i).standard_normal(DIM).tolist()
+        for i in range(start, start + count)
+    ]
+    return docs, vectors
+
+
+@pytest.fixture(autouse=True)
+def small_shards(monkeypatch):
+    monkeypatch.setattr(shards, "SHARD_SIZE", 10)
+
+
+def _updater(path):
+    return IndexUpdater(path, DeterministicFakeEmbedding(size=DIM))
+
+
+def _shard_files(path):
+    return sorted(p.stem for p in path.glob("index-*.faiss"))
+
+
+def _vectors_by_id(store):
+    vectors = shards.stored_vectors(store.index)
+    return {doc_id: vectors[row].tolist() for row, doc_id in store.index_to_docstore_id.items()}
+
+
+class TestShardLayout:
+    def test_appends_fill_the_last_shard(self):
+        layout = ShardLayout()
+        layout.append(f"doc-{i}" for i in range(25))
+        assert layout.sizes == [10, 10, 5]
+        assert layout.ranges() == [(0, 10), (10, 20), (20, 25)]
+        assert layout.dirty == {0, 1, 2}
+
+    def test_edits_dirty_old_and_last_shard(self):
+        layout = ShardLayout([("a", 10), ("b", 4)], (f"doc-{i}" for i in range(14)))
+        layout.remove(["doc-3"])
+        layout.append(["doc-3"])
+        layout.touch("doc-12")
+        assert layout.sizes == [9, 5]
+        assert layout.dirty == {0, 1}
+
+
+class TestShardedCheckpoints:
+    def test_roundtrip_merges_shards(self, tmp_path):
+        updater = _updater(tmp_path)
+        updater.add(*_docs(40))
+        saved = updater.save()
+        assert len(_shard_files(tmp_path)) == 4
+
+        loaded = load_vectorstore(str(tmp_path))
+        assert loaded.index.ntotal == 40
+        assert _vectors_by_id(loaded) == _vectors_by_id(saved)
+        assert loaded.docstore.search("doc-7").page_content == "About page 7"
+
+    def test_only_changed_shards_are_rewritten(self, tmp_path):
+        updater = _updater(tmp_path)
+        updater.add(*_docs(40))
+        updater.save()
+        assert _shard_files(tmp_path) == [f"index-1-{s}" for s in range(4)]
+
+        updater = _updater(tmp_path)
+        updater.add(*_docs(1, start=5, text="Edited page"))
+        updater.save()
+        # doc-5 leaves the first shard and joins a new fifth one
+        assert _shard_files(tmp_path) == [
+            "index-1-1", "index-1-2", "index-1-3", "index-2-0", "index-2-4",
+        ]
+        loaded = load_vectorstore(str(tmp_path))
+        assert loaded.docstore.search("doc-5").page_content == "Edited page 5"
+        assert loaded.index.ntotal == 40
+
+    def test_metadata_patch_rewrites_its_shard(self, tmp_path):
+        updater = _updater(tmp_path)
+        docs, vectors = _docs(40)
+        updater.add(docs, vectors)
+        updater.save()
+
+        updater = _updater(tmp_path)
+        moved = docs[25].model_copy(update={"metadata": {"source": "https://moved/25"}})
+        assert not updater.needs_embedding(moved)
+        updater.save()
+        assert "index-2-2" in _shard_files(tmp_path)
+        assert len(_shard_files(tmp_path)) == 4
+        assert load_vectorstore(str(tmp_path)).docstore.search("doc-25").metadata == {
+            "source": "https://moved/25",
+        }
+
+    def test_removal_marks_shard_dirty(self, tmp_path):
+        updater = _updater(tmp_path)
+        updater.add(*_docs(40))
+        updater.save()
+
+        updater = _updater(tmp_path)
+        updater.remove_stale({f"doc-{i}" for i in range(40) if i != 3})
+        updater.save()
+        loaded = load_vectorstore(str(tmp_path))
+        assert loaded.index.ntotal == 39
+        assert "doc-3" not in loaded.index_to_docstore_id.values()
+        assert _shard_files(tmp_path) == ["index-1-1", "index-1-2", "index-1-3", "index-2-0"]
+
+    def test_emptied_shard_is_dropped(self, tmp_path):
+        updater = _updater(tmp_path)
+        updater.add(*_docs(20))
+        updater.save()
+
+        updater = _updater(tmp_path)
+        updater.remove_stale({f"doc-{i}" for i in range(10, 20)})
+        updater.save()
+        assert _shard_files(tmp_path) == ["index-1-1"]
+        assert _updater(tmp_path).vector_store.index.ntotal == 10
+
+    def test_removing_everything_keeps_an_empty_index(self, tmp_path):
+        updater = _updater(tmp_path)
+        updater.add(*_docs(20))
+        updater.save()
+
+        updater = _updater(tmp_path)
+        updater.remove_stale(set())
+        updater.save()
+        assert _shard_files(tmp_path) == ["index-2"]
+        assert load_vectorstore(str(tmp_path)).index.ntotal == 0
+
+    def test_growth_adds_shards(self, tmp_path):
+        updater = _updater(tmp_path)
+        updater.add(*_docs(5))
+        updater.save()
+        assert _shard_files(tmp_path) == ["index-1"]
+
+        updater = _updater(tmp_path)
+        updater.add(*_docs(35, start=5))
+        updater.save()
+        assert _shard_files(tmp_path) == [f"index-2-{s}" for s in range(4)]
+        assert load_vectorstore(str(tmp_path)).index.ntotal == 40
+
+    def test_parallel_write_matches_serial(self, tmp_path, monkeypatch):
+        docs, vectors = _docs(40)
+        monkeypatch.setattr(config, "INDEX_WORKERS", 1)
+        serial = _updater(tmp_path / "serial")
+        serial.add(docs, vectors)
+        serial.save()
+        monkeypatch.setattr(config, "INDEX_WORKERS", 3)
+        parallel = _updater(tmp_path / "parallel")
+        parallel.add(docs, vectors)
+        parallel.save()
+
+        for name in _shard_files(tmp_path / "serial"):
+            for suffix in (".faiss", ".pkl"):
+                assert (tmp_path / "serial" / f"{name}{suffix}").read_bytes() == (
+                    tmp_path / "parallel" / f"{name}{suffix}"
+                ).read_bytes()
+
+    def test_reads_unsharded_manifest(self, tmp_path):
+        updater = _updater(tmp_path)
+        updater.add(*_docs(5))
+        updater.save()
+        manifest_path = tmp_path / "index_manifest.json"
+        manifest = json.loads(manifest_path.read_text())
+        manifest.update(version=2, index_name=manifest.pop("shards")[0][0])
+        manifest_path.write_text(json.dumps(manifest))
+
+        updater = _updater(tmp_path)
+        assert updater.vector_store.index.ntotal == 5
+        updater.add(*_docs(1, start=5))
+        updater.save()
+        assert load_vectorstore(str(tmp_path)).index.ntotal == 6
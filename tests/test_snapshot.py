@@ -0,0 +1,136 @@
+"""Tests for the prebuilt state snapshot."""
+
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import numpy as np
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from bookmark_app.snapshot import (
+    chrome_fingerprint,
+    read_snapshot,
+    snapshot_is_current,
+    write_snapshot,
+)
+from bookmark_app.topics import build_topics, save_topics
+from bookmark_app.vectorstore import bookmarks_to_documents
+
+BOOKMARKS = [
+    {"guid": "a", "name": "GitHub", "url": "https://github.com", "folder": "/Dev",
+     "description": "Code hosting."},
+    {"guid": "b", "name": "fast.ai", "url": "https://fast.ai", "folder": "/ML",
+     "description": "Deep learning courses."},
+]
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=16)
+    store = FAISS.from_documents(bookmarks_to_documents(BOOKMARKS), embeddings)
+    chrome = tmp_path / "Bookmarks"
+    chrome.write_text("{}")
+    path = tmp_path / "state.snapshot"
+    stats = {"total": 2}
+    write_snapshot(path, BOOKMARKS, ["/Dev", "/ML"], stats, store, chrome)
+    return path, store, embeddings, chrome
+
+
+class TestSnapshot:
+    def test_roundtrip(self, snapshot_path):
+        path, store, _, chrome = snapshot_path
+        snap = read_snapshot(path)
+        assert snap.bookmarks == BOOKMARKS
+        assert snap.folders == ["/Dev", "/ML"]
+        assert snap.stats == {"total": 2}
+        assert snap.chrome == chrome_fingerprint(chrome)
+        np.testing.assert_array_equal(
+            snap.vector_store.vectors, store.index.reconstruct_n(0, 2),
+        )
+        assert snap.vector_store.index_to_docstore_id == store.index_to_docstore_id
+
+    def test_vectors_are_aligned_and_memory_mapped(self, snapshot_path):
+        snap = read_snapshot(snapshot_path[0])
+        assert isinstance(snap.vector_store.vectors, np.memmap)
+        assert snap.vector_store.vectors.offset % 64 == 0
+
+    def test_documents_and_index_load_on_first_use(self, snapshot_path):
+        snap_store = read_snapshot(snapshot_path[0]).vector_store
+        assert snap_store._index is None and snap_store.docstore._dict is None
+        assert snap_store.docstore.search("b").page_content.startswith("fast.ai")
+        assert snap_store.index.ntotal == 2
+        assert snap_store.index is snap_store.index
+        assert snap_store.vectors is None  # no longer mapped
+
+    def test_detached_store_can_rewrite_its_own_file(self, snapshot_path):
+        path, store, embeddings, chrome = snapshot_path
+        snap_store = read_snapshot(path).vector_store
+        snap_store.detach()
+        assert snap_store.vectors is None and snap_store.docstore._raw is None
+        write_snapshot(path, BOOKMARKS, [], {}, snap_store, chrome, generation=5)
+        again = read_snapshot(path)
+        assert again.generation == 5
+        np.testing.assert_array_equal(again.vector_store.vectors, store.index.reconstruct_n(0, 2))
+
+    def test_similarity_search_matches_faiss(self, snapshot_path):
+        path, store, embeddings, _ = snapshot_path
+        snap_store = read_snapshot(path).vector_store
+        snap_store._embeddings = embeddings
+        expected = [d.id for d in store.similarity_search("deep learning", k=2)]
+        assert [d.id for d in snap_store.similarity_search("deep learning", k=2)] == expected
+
+    def test_current_only_for_same_generation_and_chrome_file(self, snapshot_path):
+        path, store, _, chrome = snapshot_path
+        assert not snapshot_is_current(path, 3, chrome)  # written without a generation
+        write_snapshot(path, BOOKMARKS, [], {}, store, chrome, generation=3)
+        assert read_snapshot(path).generation == 3
+        assert snapshot_is_current(path, 3, chrome)
+        assert not snapshot_is_current(path, 4, chrome)
+        assert not snapshot_is_current(path, None, chrome)
+        chrome.write_text('{"roots": {}}')
+        assert not snapshot_is_current(path, 3, chrome)
+
+    def test_rejects_other_files(self, tmp_path):
+        path = tmp_path / "not.snapshot"
+        path.write_bytes(b"hello world, definitely not a snapshot")
+        with pytest.raises(ValueError):
+            read_snapshot(path)
+
+
+class TestSnapshotStartup:
+    def test_snapshot_start_does_not_load_openai_stack(self, snapshot_path, tmp_path):
+        path, store, _, chrome = snapshot_path
+        store_dir = tmp_path / "vector_store"
+        store_dir.mkdir()
+        save_topics(build_topics(store, n_topics=1), store_dir)
+        script = textwrap.dedent(f"""
+            import asyncio, sys
+            from bookmark_app import mcp_server
+
+            async def main():
+                mcp_server.use_snapshot({str(path)!r})
+                async with mcp_server.app_lifespan(mcp_server.mcp) as app:
+                    assert app.topics is not None
+                    heavy = ("langchain_openai", "openai", "langchain_community")
+                    print(",".join(m for m in heavy if m in sys.modules))
+
+            asyncio.run(main())
+        """)
+        env = {
+            **os.environ,
+            "PYTHONPATH": str(Path(__file__).resolve().parents[1]),
+            "OPENAI_API_KEY": "sk-test",
+            "BOOKMARKS_PATH": str(chrome),
+            "VECTOR_STORE_DIR": str(store_dir),
+            "LOG_LEVEL": "WARNING",
+        }
+        result = subprocess.run(
+            [sys.executable, "-c", script], cwd=tmp_path, env=env,
+            capture_output=True, text=True, timeout=120,
+        )
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == ""
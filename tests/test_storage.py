@@ -0,0 +1,26 @@
+"""Tests for crash-safe file writes."""
+
+import json
+
+import pytest
+
+from bookmark_app.storage import atomic_open, atomic_write_json
+
+
+class TestAtomicWrites:
+    def test_replaces_file(self, tmp_path):
+        path = tmp_path / "data.json"
+        path.write_text("old")
+        atomic_write_json(path, {"a": 1})
+        assert json.loads(path.read_text()) == {"a": 1}
+        assert list(tmp_path.iterdir()) == [path]
+
+    def test_failure_leaves_original_untouched(self, tmp_path):
+        path = tmp_path / "data.json"
+        path.write_text("old")
+        with pytest.raises(RuntimeError):
+            with atomic_open(path) as f:
+                f.write("half-written")
+                raise RuntimeError("crash")
+        assert path.read_text() == "old"
+        assert list(tmp_path.iterdir()) == [path]
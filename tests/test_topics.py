@@ -0,0 +1,173 @@
+"""Tests for precomputed topic clusters."""
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from bookmark_app import topics as topics_module
+from bookmark_app.mcp_server import AppContext, _list_topic_logic, _list_topics_logic
+from bookmark_app.topics import (
+    build_topics,
+    load_topics,
+    refresh_topics,
+    save_topics,
+    update_topics,
+)
+from bookmark_app.vectorstore import IndexUpdater
+
+DIM = 16
+THEMES = {
+    "python": ["python", "django", "pandas"],
+    "cooking": ["recipe", "pasta", "baking"],
+    "travel": ["hotel", "flights", "itinerary"],
+}
+
+
+def _docs(theme_index: int, theme: str, count: int, start: int = 0, seed: int = 0):
+    rng = np.random.default_rng(seed + theme_index)
+    center = np.zeros(DIM, dtype=np.float32)
+    center[theme_index] = 1.0
+    words = THEMES[theme]
+    docs, vectors = [], []
+    for i in range(start, start + count):
+        docs.append(Document(
+            id=f"{theme}-{i}",
+            page_content=f"{words[i % 3].title()} guide {i}\nFolder: /Misc\n\n"
+                         f"All about {words[0]} and {words[1 + i % 2]}.",
+            metadata={"source": f"https://{theme}.example/{i}", "folder": "/Misc"},
+        ))
+        vectors.append((center + 0.05 * rng.standard_normal(DIM)).tolist())
+    return docs, vectors
+
+
+@pytest.fixture
+def updater(tmp_path):
+    updater = IndexUpdater(tmp_path, DeterministicFakeEmbedding(size=DIM))
+    for i, theme in enumerate(THEMES):
+        updater.add(*_docs(i, theme, 10))
+    updater.save()
+    return updater
+
+
+def _topic_of(model, doc_id):
+    return model.assignments[doc_id][0]
+
+
+class TestBuildTopics:
+    def test_clusters_follow_vectors(self, updater):
+        model = build_topics(updater.vector_store, n_topics=3)
+        for theme in THEMES:
+            assert len({_topic_of(model, f"{theme}-{i}") for i in range(10)}) == 1
+        assert sorted(t.size for t in model.topics) == [10, 10, 10]
+
+    def test_labels_use_distinctive_terms(self, updater):
+        model = build_topics(updater.vector_store, n_topics=3)
+        label = model.topics[_topic_of(model, "python-0")].label
+        assert "python" in label
+        assert "guide" not in label  # in every document, so not distinctive
+        assert "misc" not in label  # folder names are ignored
+
+    def test_members_closest_first(self, updater):
+        model = build_topics(updater.vector_store, n_topics=3)
+        topic = _topic_of(model, "cooking-0")
+        members = model.members(topic)
+        distances = [model.assignments[m][1] for m in members]
+        assert len(members) == 10 and distances == sorted(distances)
+
+    def test_empty_store(self):
+        class Empty:
+            index_to_docstore_id = {}
+
+        assert build_topics(Empty()) is None
+
+
+class TestIncrementalTopics:
+    def test_new_documents_join_nearest_topic(self, updater):
+        model = build_topics(updater.vector_store, n_topics=3)
+        updater.add(*_docs(2, "travel", 2, start=10, seed=7))
+        assert update_topics(model, updater.vector_store)
+        assert _topic_of(model, "travel-10") == _topic_of(model, "travel-0")
+        assert model.topics[_topic_of(model, "travel-0")].size == 12
+
+    def test_removed_documents_are_dropped(self, updater):
+        model = build_topics(updater.vector_store, n_topics=3)
+        updater.remove_stale({d for d in model.assignments if d != "python-3"})
+        update_topics(model, updater.vector_store)
+        assert "python-3" not in model.assignments
+
+    def test_reembedded_documents_are_reassigned(self, updater):
+        model = build_topics(updater.vector_store, n_topics=3)
+        [travel], vectors = _docs(2, "travel", 1, start=20, seed=9)
+        updater.add([travel.model_copy(update={"id": "python-0"})], vectors)
+        assert update_topics(model, updater.vector_store)
+        travel_topic = _topic_of(model, "travel-0")
+        assert _topic_of(model, "python-0") == travel_topic
+        assert "python-0" in model.members(travel_topic)
+        assert "python-0" not in model.members(_topic_of(model, "python-1"))
+        assert not update_topics(model, updater.vector_store)
+
+    def test_unchanged_store_is_a_no_op(self, updater):
+        model = build_topics(updater.vector_store, n_topics=3)
+        assert not update_topics(model, updater.vector_store)
+
+    def test_save_and_load_roundtrip(self, updater, tmp_path):
+        model = build_topics(updater.vector_store, n_topics=3)
+        save_topics(model, tmp_path)
+        loaded = load_topics(tmp_path)
+        np.testing.assert_array_equal(loaded.centroids, model.centroids)
+        assert loaded.assignments.keys() == model.assignments.keys()
+        assert loaded.topics == model.topics
+        assert loaded.content == model.content
+        assert loaded.members(0) == model.members(0)
+        assert not update_topics(loaded, updater.vector_store)
+
+
+class TestRefreshTopics:
+    def test_reuses_model_for_same_generation(self, updater, tmp_path, monkeypatch):
+        first = refresh_topics(updater.vector_store, tmp_path)
+        monkeypatch.setattr(topics_module, "build_topics", lambda *a: pytest.fail("rebuilt"))
+        again = refresh_topics(updater.vector_store, tmp_path)
+        assert again.assignments == first.assignments
+
+    def test_small_change_updates_incrementally(self, updater, tmp_path, monkeypatch):
+        refresh_topics(updater.vector_store, tmp_path)
+        updater.add(*_docs(0, "python", 3, start=10, seed=3))
+        updater.save()
+        monkeypatch.setattr(topics_module, "build_topics", lambda *a: pytest.fail("rebuilt"))
+        model = refresh_topics(updater.vector_store, tmp_path)
+        assert "python-12" in model.assignments
+        assert load_topics(tmp_path).generation == model.generation
+
+    def test_large_change_retrains(self, updater, tmp_path):
+        first = refresh_topics(updater.vector_store, tmp_path)
+        updater.add(*_docs(1, "cooking", 20, start=10, seed=5))
+        updater.save()
+        model = refresh_topics(updater.vector_store, tmp_path)
+        assert model.trained_size == 50 > first.trained_size
+        assert model.changed_since_training == 0
+
+
+class TestTopicTools:
+    def test_resource_lists_topics(self, updater):
+        app = AppContext(vector_store=updater.vector_store,
+                         topics=build_topics(updater.vector_store, n_topics=3))
+        lines = _list_topics_logic(app).splitlines()
+        assert len(lines) == 3
+        assert all("(10 bookmarks)" in line for line in lines)
+
+    def test_list_topic_answers_from_assignments(self, updater):
+        model = build_topics(updater.vector_store, n_topics=3)
+        app = AppContext(vector_store=updater.vector_store, topics=model)
+        result = _list_topic_logic(app, _topic_of(model, "travel-0"), limit=5)
+        assert "travel.example" in result
+        assert "python.example" not in result
+        assert result.count("](") == 5
+
+    def test_unknown_topic(self, updater):
+        app = AppContext(vector_store=updater.vector_store,
+                         topics=build_topics(updater.vector_store, n_topics=3))
+        assert _list_topic_logic(app, 99).startswith("Unknown topic")
+
+    def test_no_topics_yet(self):
+        assert _list_topics_logic(AppContext()) == "No topics available yet."
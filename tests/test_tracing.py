@@ -0,0 +1,239 @@
+"""Tests for tracing spans, the slow-query log and its analyzer."""
+
+import asyncio
+import inspect
+import json
+from types import SimpleNamespace
+
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage
+
+from bookmark_app import cli, config, tracing
+from bookmark_app.agent import create_agent
+from bookmark_app.search import filtered_search
+from bookmark_app.tracing import Trace, activate, root, span, summarize, traced
+from bookmark_app.ui import _build_bot_response
+
+
+@pytest.fixture
+def log_path(tmp_path, monkeypatch):
+    path = tmp_path / "slow.jsonl"
+    monkeypatch.setattr(config, "TRACING", True)
+    monkeypatch.setattr(config, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(config, "SLOW_QUERY_LOG", str(path))
+    return path
+
+
+def _records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class ToolCallingFake(FakeMessagesListChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+class TestSpans:
+    def test_spans_are_recorded_in_the_active_trace(self, log_path):
+        with root("request", input_bytes=3):
+            with span("outer") as attrs:
+                with span("inner", k=5):
+                    pass
+                attrs["output_bytes"] = 10
+        [record] = _records(log_path)
+        assert record["trace"] == "request"
+        assert record["input_bytes"] == 3
+        assert [s["name"] for s in record["spans"]] == ["inner", "outer"]
+        assert record["spans"][0]["k"] == 5
+        assert record["spans"][1]["output_bytes"] == 10
+
+    def test_span_without_trace_is_a_no_op(self, log_path):
+        with span("orphan") as attrs:
+            attrs["x"] = 1
+        assert not log_path.exists()
+
+    def test_errors_are_recorded(self, log_path):
+        with pytest.raises(KeyError), root("request"), span("lookup"):
+            raise KeyError("missing")
+        [record] = _records(log_path)
+        assert record["error"] == "KeyError"
+        assert record["spans"][0]["error"] == "KeyError"
+
+    def test_fast_traces_are_not_logged(self, log_path, monkeypatch):
+        monkeypatch.setattr(config, "SLOW_QUERY_MS", 60_000)
+        with root("request"):
+            pass
+        assert not log_path.exists()
+
+    def test_disabled_tracing_starts_no_trace(self, log_path, monkeypatch):
+        monkeypatch.setattr(config, "TRACING", False)
+        assert tracing.start_trace("request") is None
+        with root("request"), span("inner"):
+            pass
+        assert not log_path.exists()
+
+    def test_spans_follow_the_trace_into_threads(self, log_path):
+        async def handler():
+            with root("request"):
+                await asyncio.to_thread(self._timed_span)
+
+        asyncio.run(handler())
+        [record] = _records(log_path)
+        assert [s["name"] for s in record["spans"]] == ["threaded"]
+
+    @staticmethod
+    def _timed_span():
+        with span("threaded"):
+            pass
+
+
+class TestTraced:
+    def test_sync_handler(self, log_path):
+        @traced("tool")
+        def handler(query: str, ctx: object = None) -> str:
+            return query * 2
+
+        assert handler("ab", ctx=object()) == "abab"
+        assert inspect.signature(handler) == inspect.signature(handler.__wrapped__)
+        [record] = _records(log_path)
+        assert record["trace"] == "tool"
+        assert record["input_bytes"] == len(json.dumps({"query": "ab"}))
+        assert record["output_bytes"] == 4
+
+    def test_async_handler_stays_async(self, log_path):
+        @traced()
+        async def handler(limit: int = 3) -> str:
+            return "x" * limit
+
+        assert inspect.iscoroutinefunction(handler)
+        assert asyncio.run(handler(limit=5)) == "xxxxx"
+        assert _records(log_path)[0]["trace"] == "handler"
+
+    def test_mcp_tools_keep_their_schema(self):
+        from bookmark_app.mcp_server import mcp
+
+        tools = {t.name: t for t in asyncio.run(mcp.list_tools())}
+        assert set(tools["search_bookmarks"].inputSchema["properties"]) == {
+            "query", "k", "folder", "domain", "added_after", "added_before", "diverse",
+        }
+        assert mcp._tool_manager.get_tool("search_bookmarks").context_kwarg == "ctx"
+
+    def test_mcp_tool_call_is_logged(self, log_path):
+        from bookmark_app.mcp_server import AppContext, mcp
+
+        app = AppContext(bookmarks=[{"name": "A", "url": "https://a", "folder": "/x"}])
+        ctx = SimpleNamespace(request_context=SimpleNamespace(lifespan_context=app))
+        tool = mcp._tool_manager.get_tool("list_bookmarks")
+        result = asyncio.run(tool.run({"folder": "/x"}, context=ctx))
+        [record] = _records(log_path)
+        assert record["trace"] == "list_bookmarks"
+        assert record["output_bytes"] == len(result)
+
+
+class TestAgentTracing:
+    def test_bot_response_records_agent_steps_and_search(self, log_path):
+        store = FAISS.from_documents(
+            [Document(page_content=f"Page {i}", metadata={"source": f"https://x/{i}"})
+             for i in range(5)],
+            DeterministicFakeEmbedding(size=8),
+        )
+        llm = ToolCallingFake(responses=[
+            AIMessage(content="", tool_calls=[
+                {"name": "retrieve", "args": {"query": "pages", "domain": "x"}, "id": "1"},
+            ]),
+            AIMessage(content="Here you go"),
+        ])
+        agent = create_agent(llm, store)
+
+        async def run():
+            return [text async for text in _build_bot_response(agent)("find pages", [], 3)]
+
+        asyncio.run(run())
+        [record] = _records(log_path)
+        assert record["trace"] == "bot_response"
+        assert record["query"] == "find pages"
+        names = [s["name"] for s in record["spans"]]
+        assert names.count("llm") == 2
+        assert {"step.agent", "step.tools", "retrieve", "similarity_search",
+                "embed_query", "faiss_search", "format"} <= set(names)
+        retrieve = next(s for s in record["spans"] if s["name"] == "retrieve")
+        assert retrieve["output_bytes"] > 0
+        search = next(s for s in record["spans"] if s["name"] == "similarity_search")
+        assert search["results"] == 3
+        assert retrieve["start_ms"] <= search["start_ms"]
+
+
+class TestSearchTracing:
+    def test_unfiltered_search_records_embedding_and_scan(self, log_path):
+        store = FAISS.from_documents(
+            [Document(page_content=f"Page {i}") for i in range(5)],
+            DeterministicFakeEmbedding(size=8),
+        )
+        with root("request"):
+            assert len(filtered_search(store, "pages", 3)) == 3
+        [record] = _records(log_path)
+        spans = {s["name"]: s for s in record["spans"]}
+        assert spans["faiss_search"]["candidates"] == 5
+        assert {"embed_query", "similarity_search"} <= set(spans)
+
+
+class TestSummarize:
+    def test_percentiles_per_span(self):
+        traces = [
+            {"trace": "bot_response", "ms": float(ms), "spans": [
+                {"name": "llm", "ms": ms / 2, "output_bytes": ms},
+            ]}
+            for ms in range(1, 101)
+        ]
+        stats = {s.name: s for s in summarize(traces)}
+        assert stats["bot_response"].count == 100
+        assert stats["bot_response"].p50_ms == pytest.approx(50.5)
+        assert stats["bot_response"].p95_ms == pytest.approx(95.05)
+        assert stats["llm"].max_ms == 50
+        assert stats["llm"].p50_output_bytes == 50
+        assert stats["bot_response"].p50_output_bytes is None
+        assert summarize(traces)[0].name == "bot_response"  # most total time
+
+    def test_entries_without_duration_are_skipped(self):
+        traces = [
+            {"trace": "search_bookmarks", "spans": [{"name": "embed_query"}]},
+            {"trace": "search_bookmarks", "ms": 5.0, "spans": [{"ms": 1.0}, "junk"]},
+        ]
+        stats = {s.name: s for s in summarize(traces)}
+        assert stats["search_bookmarks"].count == 1
+        assert "embed_query" not in stats
+
+    def test_cli_prints_table(self, tmp_path, capsys, monkeypatch):
+        monkeypatch.setattr(config, "load_env", lambda: None)
+        path = tmp_path / "slow.jsonl"
+        trace = Trace("search_bookmarks")
+        with activate(trace), span("embed_query"):
+            pass
+        monkeypatch.setattr(config, "SLOW_QUERY_LOG", str(path))
+        monkeypatch.setattr(config, "SLOW_QUERY_MS", 0)
+        trace.finish()
+        with path.open("a") as f:
+            f.write("not json\n[1, 2]\n")
+            f.write(json.dumps({"trace": "search_bookmarks", "slow_query_ms": 0}) + "\n")
+
+        assert cli.main(["traces", str(path)]) == 0
+        out = capsys.readouterr().out
+        assert "2 traces" in out
+        assert "every request was logged" in out
+        assert "search_bookmarks" in out and "embed_query" in out
+
+    def test_cli_labels_slow_query_percentiles(self, tmp_path, capsys, monkeypatch):
+        monkeypatch.setattr(config, "load_env", lambda: None)
+        path = tmp_path / "slow.jsonl"
+        path.write_text(json.dumps({"trace": "bot_response", "ms": 1500.0,
+                                    "slow_query_ms": 1000}) + "\n")
+        assert cli.main(["traces", str(path)]) == 0
+        assert "slow requests only" in capsys.readouterr().out
+
+    def test_cli_without_log(self, tmp_path, capsys, monkeypatch):
+        monkeypatch.setattr(config, "load_env", lambda: None)
+        assert cli.main(["traces", str(tmp_path / "missing.jsonl")]) == 1
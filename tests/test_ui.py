@@ -0,0 +1,124 @@
+"""Tests for the streaming chat response."""
+
+import asyncio
+from types import SimpleNamespace
+
+from gradio.helpers import special_args
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+
+from bookmark_app import config
+from bookmark_app.agent import create_agent, create_retrieve_tool
+from bookmark_app.ui import _build_bot_response, _StreamCoalescer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeAgent:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.configs = []
+
+    async def astream(self, *args, config=None, **kwargs):
+        self.configs.append(config)
+        for chunk in self.chunks:
+            yield chunk, {}
+
+
+class ToolCallingFake(FakeMessagesListChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def _collect(agent, k=5, session=None) -> list[str]:
+    request = SimpleNamespace(session_hash=session) if session else None
+
+    async def run():
+        return [text async for text in _build_bot_response(agent)("hi", [], k, request)]
+
+    return asyncio.run(run())
+
+
+def _store(count=20):
+    return FAISS.from_documents(
+        [Document(page_content=f"Page {i}", metadata={"source": f"https://x/{i}"})
+         for i in range(count)],
+        DeterministicFakeEmbedding(size=8),
+    )
+
+
+class TestStreamCoalescer:
+    def test_flushes_after_interval(self):
+        clock = FakeClock()
+        coalescer = _StreamCoalescer(0.05, max_chars=1000, clock=clock)
+        assert not coalescer.add("a")
+        clock.now = 0.06
+        assert coalescer.add("b")
+        assert coalescer.flush() == "ab"
+        assert not coalescer.has_pending
+
+    def test_flushes_on_size(self):
+        coalescer = _StreamCoalescer(10.0, max_chars=4, clock=FakeClock())
+        assert not coalescer.add("ab")
+        assert coalescer.add("cd")
+        assert coalescer.flush() == "abcd"
+
+
+class TestBotResponse:
+    def test_coalesces_tokens_and_emits_tail(self):
+        agent = FakeAgent([AIMessageChunk(content=t) for t in ("Hel", "lo", "!")])
+        updates = _collect(agent)
+        assert updates[-1] == "Hello!"
+        assert len(updates) < 3
+
+    def test_skips_tool_messages(self):
+        agent = FakeAgent([
+            ToolMessage(content="raw tool output", tool_call_id="1"),
+            AIMessageChunk(content="Answer"),
+        ])
+        assert _collect(agent)[-1] == "Answer"
+
+    def test_empty_stream_yields_empty_string(self):
+        assert _collect(FakeAgent([])) == [""]
+
+
+class TestSessions:
+    def test_each_session_gets_its_own_thread_and_k(self):
+        agent = FakeAgent([AIMessageChunk(content="ok")])
+        _collect(agent, k=3, session="alice")
+        _collect(agent, k=12, session="bob")
+        assert [c["configurable"]["thread_id"] for c in agent.configs] == ["alice", "bob"]
+        assert [c["configurable"]["retrieval_k"] for c in agent.configs] == [3, 12]
+
+    def test_gradio_injects_the_request(self):
+        bot_response = _build_bot_response(FakeAgent([]))
+        request = object()
+        inputs, *_ = special_args(bot_response, ["hi", [], 5], request=request)
+        assert inputs == ["hi", [], 5, request]
+
+    def test_retrieve_uses_the_k_of_its_run(self):
+        retrieve = create_retrieve_tool(_store())
+
+        def results(run_config=None):
+            call = {"type": "tool_call", "id": "1", "name": "retrieve", "args": {"query": "page"}}
+            return len(retrieve.invoke(call, config=run_config).artifact)
+
+        assert results({"configurable": {"retrieval_k": 2}}) == 2
+        assert results() == config.RETRIEVAL_K
+
+    def test_sessions_do_not_share_conversation_history(self):
+        agent = create_agent(ToolCallingFake(responses=[AIMessage(content="Hello")]), _store())
+        _collect(agent, session="alice")
+        _collect(agent, session="bob")
+        for session in ("alice", "bob"):
+            state = agent.get_state({"configurable": {"thread_id": session}})
+            assert [m.type for m in state.values["messages"]] == ["human", "ai"]
@@ -0,0 +1,147 @@
+"""Tests for incremental FAISS vector store updates."""
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from bookmark_app import vectorstore
+from bookmark_app.vectorstore import bookmarks_to_documents, load_or_create_vectorstore
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Deterministic fake embeddings that record which texts were embedded."""
+
+    embedded: list = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def embeddings(monkeypatch):
+    emb = CountingEmbeddings(size=8)
+    emb.embedded = []
+    monkeypatch.setattr(vectorstore, "get_embeddings", lambda: emb)
+    return emb
+
+
+def _bm(guid, name, url, folder="/Dev"):
+    return {"guid": guid, "name": name, "url": url, "folder": folder,
+            "description": f"About {name}"}
+
+
+BOOKMARKS = [
+    _bm("a", "GitHub", "https://github.com"),
+    _bm("b", "Docs", "https://docs.example"),
+    _bm("c", "Blog", "https://blog.example"),
+]
+
+
+def _sources(store):
+    return sorted(d.metadata["source"] for d in store.docstore._dict.values())
+
+
+class TestLoadOrCreateVectorstore:
+    def test_unchanged_store_embeds_nothing(self, tmp_path, embeddings):
+        load_or_create_vectorstore(bookmarks_to_documents(BOOKMARKS), str(tmp_path))
+        embeddings.embedded.clear()
+        store = load_or_create_vectorstore(
+            bookmarks_to_documents(BOOKMARKS), str(tmp_path),
+        )
+        assert embeddings.embedded == []
+        assert store.index.ntotal == 3
+
+    def test_url_change_patches_metadata_without_embedding(self, tmp_path, embeddings):
+        load_or_create_vectorstore(bookmarks_to_documents(BOOKMARKS), str(tmp_path))
+        embeddings.embedded.clear()
+        changed = [dict(BOOKMARKS[0], url="https://github.com/home"), *BOOKMARKS[1:]]
+        store = load_or_create_vectorstore(
+            bookmarks_to_documents(changed), str(tmp_path),
+        )
+        assert embeddings.embedded == []
+        assert "https://github.com/home" in _sources(store)
+
+    def test_rename_and_removal_are_incremental(self, tmp_path, embeddings):
+        load_or_create_vectorstore(bookmarks_to_documents(BOOKMARKS), str(tmp_path))
+        embeddings.embedded.clear()
+        changed = [dict(BOOKMARKS[0], name="GitHub Home"), BOOKMARKS[1]]
+        store = load_or_create_vectorstore(
+            bookmarks_to_documents(changed), str(tmp_path),
+        )
+        assert len(embeddings.embedded) == 1
+        assert embeddings.embedded[0].startswith("GitHub Home")
+        assert store.index.ntotal == 2
+        assert _sources(store) == ["https://docs.example", "https://github.com"]
+
+
+class TestBookmarksToDocuments:
+    def test_duplicates_become_one_document_with_all_folders(self):
+        bookmarks = [
+            _bm("a", "Docs", "https://docs.example", folder="/Dev"),
+            _bm("b", "Docs", "http://www.docs.example/", folder="/Reference"),
+        ]
+        (doc,) = bookmarks_to_documents(bookmarks)
+        assert doc.metadata["folders"] == ["/Dev", "/Reference"]
+        assert doc.metadata["source"] == "https://docs.example"
+
+
+class TestDuplicateCopies:
+    OLDEST = dict(_bm("a", "Docs", "https://docs.example"), date_added="100")
+    NEWER = dict(_bm("d", "Docs mirror", "http://www.docs.example/", folder="/Ref"),
+                 date_added="200")
+
+    def test_newer_copy_is_metadata_only(self, tmp_path, embeddings):
+        load_or_create_vectorstore(bookmarks_to_documents([self.OLDEST]), str(tmp_path))
+        embeddings.embedded.clear()
+        store = load_or_create_vectorstore(
+            bookmarks_to_documents([self.OLDEST, self.NEWER]), str(tmp_path),
+        )
+        assert embeddings.embedded == []
+        assert store.docstore.search("a").metadata["folders"] == ["/Dev", "/Ref"]
+        store = load_or_create_vectorstore(
+            bookmarks_to_documents([self.OLDEST]), str(tmp_path),
+        )
+        assert embeddings.embedded == []
+        assert "folders" not in store.docstore.search("a").metadata
+
+    def test_removing_oldest_copy_reembeds_under_next_key(self, tmp_path, embeddings):
+        load_or_create_vectorstore(
+            bookmarks_to_documents([self.OLDEST, self.NEWER]), str(tmp_path),
+        )
+        embeddings.embedded.clear()
+        store = load_or_create_vectorstore(
+            bookmarks_to_documents([self.NEWER]), str(tmp_path),
+        )
+        assert [text.split("\n")[0] for text in embeddings.embedded] == ["Docs mirror"]
+        assert list(store.index_to_docstore_id.values()) == ["d"]
+
+
+class TestCheckpoints:
+    def test_uncommitted_generation_is_ignored(self, tmp_path, embeddings):
+        load_or_create_vectorstore(bookmarks_to_documents(BOOKMARKS), str(tmp_path))
+        # A crash after writing new index files but before the manifest swap
+        (tmp_path / "index-2.faiss").write_bytes(b"partial")
+        embeddings.embedded.clear()
+        store = load_or_create_vectorstore(
+            bookmarks_to_documents(BOOKMARKS), str(tmp_path),
+        )
+        assert embeddings.embedded == []
+        assert store.index.ntotal == 3
+
+    def test_truncated_index_is_rebuilt(self, tmp_path, embeddings):
+        load_or_create_vectorstore(bookmarks_to_documents(BOOKMARKS), str(tmp_path))
+        (index_file,) = tmp_path.glob("index-*.faiss")
+        index_file.write_bytes(index_file.read_bytes()[:10])
+        embeddings.embedded.clear()
+        store = load_or_create_vectorstore(
+            bookmarks_to_documents(BOOKMARKS), str(tmp_path),
+        )
+        assert len(embeddings.embedded) == 3
+        assert store.index.ntotal == 3
+
+    def test_old_generations_are_removed(self, tmp_path, embeddings):
+        load_or_create_vectorstore(bookmarks_to_documents(BOOKMARKS), str(tmp_path))
+        load_or_create_vectorstore(bookmarks_to_documents(BOOKMARKS[:2]), str(tmp_path))
+        assert sorted(p.name for p in tmp_path.glob("index-*")) == [
+            "index-2.faiss", "index-2.pkl",
+        ]